@@ -0,0 +1,76 @@
+"""
+Benchmark of deleting a place with 10k reviews as the other reviews
+grow, the cascade against a scan of the reviews for orphans
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_cascade_delete [sizes...]
+
+The cascade finds the reviews of the place through the `place_id`
+index, its latency should stay flat as the other reviews grow.
+"""
+
+import sys
+import time
+
+from src.models.city import City
+from src.models.place import Place
+from src.models.review import Review
+from src.models.user import User
+from src.persistence import repo
+
+SIZES = [100_000, 1_000_000]
+DEPENDENTS = 10_000
+
+
+def make_place(host: User, city: City, reviews: int) -> Place:
+    """Stores a place with `reviews` reviews"""
+    place = Place(
+        data={"name": "Place", "host_id": host.id, "city_id": city.id}
+    )
+    repo.save(place)
+    repo.save_many(
+        [Review(place.id, host.id, "Nice", 4) for _ in range(reviews)]
+    )
+
+    return place
+
+
+def scan_delete(place: Place) -> None:
+    """The deletion before the cascade, the orphans are found by a scan"""
+    repo.delete(place)
+    repo.delete_many(
+        [r for r in Review.get_all() if r.place_id == place.id]
+    )
+
+
+def main() -> None:
+    """Prints one row per number of other reviews"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    host = User.create(
+        {"email": "host@example.com", "first_name": "Ann", "last_name": "Lee"}
+    )
+    city = City.create({"name": "City", "country_code": "UY"})
+    stored = 0
+
+    print(f"{'reviews':>10} {'cascade':>10} {'scan':>10}")
+    for size in sizes:
+        make_place(host, city, size - stored)
+        stored = size
+
+        place = make_place(host, city, DEPENDENTS)
+        start = time.perf_counter()
+        assert Place.delete(place.id)
+        cascade = time.perf_counter() - start
+
+        place = make_place(host, city, DEPENDENTS)
+        start = time.perf_counter()
+        scan_delete(place)
+        scan = time.perf_counter() - start
+
+        print(f"{size:>10} {cascade * 1000:>8.1f}ms {scan * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
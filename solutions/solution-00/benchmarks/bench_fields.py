@@ -0,0 +1,104 @@
+"""
+Benchmark of the size and the CPU time of `GET /places` and
+`GET /reviews` with `?fields=` against the full objects
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_fields [size]
+
+The lists are served by endpoints registered by the benchmark that skip
+the list cache, so every request encodes its body. The full lists are
+measured twice: joining the encodings the objects cache, and cold, with
+these encodings dropped before every request. The projections are never
+cached per object.
+"""
+
+import sys
+import time
+
+from src import create_app
+from src.controllers.responses import json_list
+from src.models.place import Place
+from src.models.review import Review
+from src.persistence import repo
+
+SIZE = 100_000
+CALLS = 5
+
+QUERIES = {
+    Place: ["id,name,price_per_night", "id"],
+    Review: ["id,rating", "id"],
+}
+
+
+def measure(client, url: str, objs=()) -> tuple[float, int]:
+    """
+    Returns the mean milliseconds and the bytes of a request, the
+    cached encodings of the `objs` are dropped before every request
+    """
+    size = len(client.get(url).data)
+    seconds = 0.0
+
+    for _ in range(CALLS):
+        for obj in objs:
+            del obj._json
+        start = time.perf_counter()
+        client.get(url)
+        seconds += time.perf_counter() - start
+
+    return seconds / CALLS * 1000, size
+
+
+def main() -> None:
+    """Prints one row per endpoint and fields"""
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZE
+
+    repo.save_many(
+        [
+            Place(
+                data={
+                    "name": f"Place {i}",
+                    "description": "A quiet flat close to the old town",
+                    "address": f"{i} Main Street",
+                    "host_id": "host",
+                    "city_id": "city",
+                    "latitude": 48.85,
+                    "longitude": 2.35,
+                    "price_per_night": 80 + i % 200,
+                    "max_guests": 1 + i % 6,
+                }
+            )
+            for i in range(size)
+        ]
+    )
+    repo.save_many(
+        [
+            Review("place", "user", f"Review {i}", 1 + i % 5)
+            for i in range(size)
+        ]
+    )
+
+    app = create_app()
+    for model in QUERIES:
+        app.add_url_rule(
+            f"/uncached/{model.__name__.lower()}s",
+            f"uncached_{model.__name__.lower()}s",
+            lambda model=model: json_list(model, model.get_all()),
+        )
+    client = app.test_client()
+
+    print(f"{size} objects, mean of {CALLS} requests")
+    print(f"{'endpoint':>10} {'fields':>26} {'MB':>7} {'time':>10}")
+    for model, queries in QUERIES.items():
+        name = f"{model.__name__.lower()}s"
+        url = f"/uncached/{name}"
+        rows = [("(all)", url, ()), ("(all, cold)", url, model.get_all())]
+        rows += [(fields, f"{url}?fields={fields}", ()) for fields in queries]
+
+        for label, row_url, cold in rows:
+            ms, body = measure(client, row_url, cold)
+            print(f"{name:>10} {label:>26} {body / 1e6:>7.1f} {ms:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark of the FileRepository startup in eager and lazy modes
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_file_reload [megabytes]
+
+It writes a data.json of about the given size (mostly reviews) and
+reports the time to build the repository and the peak resident memory
+of a fresh process in each mode.
+"""
+
+from datetime import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+RELOAD = """
+import resource
+import sys
+import time
+from src.persistence.file import FileRepository
+
+start = time.perf_counter()
+FileRepository(sys.argv[1], journal=False, lazy=sys.argv[2] == "lazy")
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(f"{elapsed:.2f} {rss:.0f}")
+"""
+
+
+def write_snapshot(filename: str, megabytes: int) -> int:
+    """Writes a snapshot of about `megabytes`, returns the reviews count"""
+    now = datetime.now().isoformat()
+    users = [
+        {"id": str(uuid.uuid4()), "email": f"user{i}@example.com",
+         "first_name": "Test", "last_name": "User",
+         "created_at": now, "updated_at": now}
+        for i in range(1000)
+    ]
+    review = {
+        "place_id": str(uuid.uuid4()), "user_id": users[0]["id"],
+        "comment": "A nice place to stay, would come back again",
+        "rating": 4, "created_at": now, "updated_at": now,
+    }
+    count = megabytes * 1024 * 1024 // (len(json.dumps(review)) + 50)
+
+    with open(filename, "w") as file:
+        file.write(f'{{"user": {json.dumps(users)}, "review": [')
+        for i in range(count):
+            review["id"] = str(uuid.uuid4())
+            file.write(("," if i else "") + json.dumps(review))
+        file.write("]}")
+
+    return count
+
+
+def reload(filename: str, mode: str) -> tuple[float, float]:
+    """Returns the reload time and the peak RSS in MB of a process"""
+    output = subprocess.run(
+        [sys.executable, "-c", RELOAD, filename, mode],
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split("\n")[-2]
+
+    elapsed, rss = output.split()
+    return float(elapsed), float(rss)
+
+
+def main() -> None:
+    """Prints one row per mode"""
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.json")
+        count = write_snapshot(filename, megabytes)
+        size = os.path.getsize(filename) / 1024 / 1024
+
+        print(f"data.json: {size:.0f} MB, {count} reviews")
+        print(f"{'mode':>6} {'startup':>9} {'peak rss':>10}")
+        for mode in ("eager", "lazy"):
+            elapsed, rss = reload(filename, mode)
+            print(f"{mode:>6} {elapsed:>8.2f}s {rss:>7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
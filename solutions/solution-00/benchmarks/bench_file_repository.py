@@ -0,0 +1,57 @@
+"""
+Benchmark of the FileRepository write latency with and without journal
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_file_repository [sizes...]
+
+Without journal every write rewrites the whole snapshot so its cost
+grows with the dataset, with journal it only appends the changed object.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from src.models.review import Review
+from src.persistence.file import FileRepository
+
+SIZES = [1_000, 10_000, 100_000]
+WRITES = 50
+
+
+def make_review() -> Review:
+    """Builds a review that is not stored anywhere"""
+    return Review(place_id="place", user_id="user", comment="ok", rating=5)
+
+
+def bench(size: int, journal: bool) -> float:
+    """Returns the mean latency in milliseconds of a save"""
+    with tempfile.TemporaryDirectory() as directory:
+        repo = FileRepository(os.path.join(directory, "data.json"), journal)
+        for _ in range(size):
+            repo.save(make_review(), save_to_file=False)
+        repo.compact()
+
+        reviews = [make_review() for _ in range(WRITES)]
+
+        start = time.perf_counter()
+        for review in reviews:
+            repo.save(review)
+        return (time.perf_counter() - start) / WRITES * 1000
+
+
+def main() -> None:
+    """Prints one row per dataset size"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    print(f"{'size':>10} {'rewrite':>10} {'journal':>10}")
+    for size in sizes:
+        rewrite = bench(size, journal=False)
+        journal = bench(size, journal=True)
+        print(f"{size:>10} {rewrite:>8.3f}ms {journal:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of the flush policies of the file and pickle repositories
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_flush_policy [file|pickle] [requests]
+
+It sends a burst of POST /places/<id>/reviews through the Flask test
+client with every policy and reports the time and the number of
+writes that reached the disk.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+POLICIES = {
+    "immediate": {},
+    "every 100ms": {"FLUSH_INTERVAL_MS": "100"},
+    "every 250 mutations": {"FLUSH_EVERY": "250"},
+}
+
+BURST = """
+import sys
+import time
+from src import create_app
+from src.persistence import repo
+
+client = create_app().test_client()
+user = client.post(
+    "/users", json={"email": "a@b.c", "first_name": "a", "last_name": "b"}
+).json
+city = client.post("/cities", json={"name": "c", "country_code": "UY"}).json
+place = client.post(
+    "/places",
+    json={"name": "p", "host_id": user["id"], "city_id": city["id"]},
+).json
+repo.flush()
+before = repo.writes
+
+start = time.perf_counter()
+for _ in range(int(sys.argv[1])):
+    client.post(
+        f"/places/{place['id']}/reviews",
+        json={"user_id": user["id"], "comment": "ok", "rating": 5},
+    )
+elapsed = time.perf_counter() - start
+
+repo.flush()
+print(f"{elapsed:.3f} {repo.writes - before}")
+"""
+
+
+def run(backend: str, count: int, policy: dict) -> tuple[float, int]:
+    """Runs the burst in a fresh process and data directory"""
+    env = os.environ | {"REPOSITORY": backend} | policy
+    env["PYTHONPATH"] = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run(
+            [sys.executable, "-c", BURST, str(count)],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split("\n")[-2]
+
+    elapsed, writes = output.split()
+    return float(elapsed), int(writes)
+
+
+def main() -> None:
+    """Prints one row per policy"""
+    backend = sys.argv[1] if len(sys.argv) > 1 else "file"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+
+    print(f"{count} POST /reviews on the {backend} repository")
+    print(f"{'policy':>20} {'time':>8} {'writes':>7}")
+    for name, policy in POLICIES.items():
+        elapsed, writes = run(backend, count, policy)
+        print(f"{name:>20} {elapsed:>7.2f}s {writes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of the peak memory of loading a snapshot with json.load
+against the streaming loader used by FileRepository.reload
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_json_stream [megabytes]
+
+Both loaders build every model instance, the difference is that
+json.load keeps the whole decoded document alive until the end.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_file_reload import write_snapshot
+
+LOAD = """
+import json
+import resource
+import sys
+import time
+from src.models import from_dict, get_models
+from src.persistence.json_stream import iter_records
+
+models = get_models()
+objects = []
+
+start = time.perf_counter()
+with open(sys.argv[1]) as file:
+    if sys.argv[2] == "json.load":
+        for model, items in json.load(file).items():
+            for item in items:
+                objects.append(from_dict(models[model], item))
+    else:
+        for model, item in iter_records(file):
+            objects.append(from_dict(models[model], item))
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(f"{elapsed:.2f} {rss:.0f}")
+"""
+
+
+def load(filename: str, loader: str) -> tuple[float, float]:
+    """Returns the load time and the peak RSS in MB of a process"""
+    output = subprocess.run(
+        [sys.executable, "-c", LOAD, filename, loader],
+        env=os.environ | {"PYTHONPATH": os.getcwd()},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split("\n")[-2]
+
+    elapsed, rss = output.split()
+    return float(elapsed), float(rss)
+
+
+def main() -> None:
+    """Prints one row per loader"""
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.json")
+        count = write_snapshot(filename, megabytes)
+        size = os.path.getsize(filename) / 1024 / 1024
+
+        print(f"data.json: {size:.0f} MB, {count} reviews")
+        print(f"{'loader':>10} {'time':>8} {'peak rss':>10}")
+        for loader in ("json.load", "stream"):
+            elapsed, rss = load(filename, loader)
+            print(f"{loader:>10} {elapsed:>7.2f}s {rss:>7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of the list endpoints: a poll answered 304 with the ETag,
+the list body cached per generation of the model, the list joined from
+the cached JSON encodings of the objects and the list serialized from
+their dicts on every request
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_list_endpoints [sizes...]
+
+The requests go through the Flask test client, the endpoints without
+the list cache are registered by the benchmark, the last one answers
+like the list endpoints did before, with the `to_dict` of every object.
+"""
+
+import sys
+import time
+
+from src import create_app
+from src.controllers.responses import json_list
+from src.models.place import Place
+from src.models.review import Review
+from src.persistence import repo
+
+SIZES = [1_000, 10_000, 100_000]
+SECONDS = 2.0
+
+
+def requests_per_second(client, url: str, headers=None) -> float:
+    """Sends GET requests to `url` for a while, returns their rate"""
+    client.get(url, headers=headers)
+    count = 0
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < SECONDS:
+        client.get(url, headers=headers)
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Prints one row per dataset size and endpoint"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    app = create_app()
+    for model in (Place, Review):
+        name = model.__name__.lower()
+        app.add_url_rule(
+            f"/joined/{name}s",
+            f"joined_{name}s",
+            lambda model=model: json_list(model, model.get_all()),
+        )
+        app.add_url_rule(
+            f"/uncached/{name}s",
+            f"uncached_{name}s",
+            lambda model=model: [obj.to_dict() for obj in model.get_all()],
+        )
+    client = app.test_client()
+
+    print(
+        f"{'size':>8} {'endpoint':>10} {'304':>12} {'list':>12} "
+        f"{'objects':>12} {'to_dict':>12}"
+    )
+    stored = 0
+    for size in sizes:
+        repo.save_many(
+            [
+                Place(
+                    data={
+                        "name": f"Place {i}",
+                        "description": "A quiet place by the sea",
+                        "host_id": "host",
+                        "city_id": "city",
+                        "price_per_night": i % 500,
+                    }
+                )
+                for i in range(stored, size)
+            ]
+            + [
+                Review("place", "user", f"Review {i}", 4)
+                for i in range(stored, size)
+            ]
+        )
+        stored = size
+
+        for name in ("places", "reviews"):
+            etag = client.get(f"/{name}").headers["ETag"]
+            rates = [
+                requests_per_second(
+                    client, f"/{name}", {"If-None-Match": etag}
+                ),
+                requests_per_second(client, f"/{name}"),
+                requests_per_second(client, f"/joined/{name}"),
+                requests_per_second(client, f"/uncached/{name}"),
+            ]
+            print(
+                f"{size:>8} {name:>10}"
+                + "".join(f" {rate:>10.1f}/s" for rate in rates)
+            )
+
+
+if __name__ == "__main__":
+    main()
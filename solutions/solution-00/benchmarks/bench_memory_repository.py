@@ -0,0 +1,71 @@
+"""
+Benchmark of the MemoryRepository operations as the dataset grows
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_memory_repository [sizes...]
+
+The latency of get, update, save and delete should stay flat from 1k
+to 1M stored reviews.
+"""
+
+import random
+import sys
+import time
+
+from src.models.review import Review
+from src.persistence.memory import MemoryRepository
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SAMPLES = 10_000
+
+
+def make_reviews(count: int) -> list[Review]:
+    """Builds `count` reviews that are not stored anywhere"""
+    return [
+        Review(place_id="place", user_id="user", comment="ok", rating=5)
+        for _ in range(count)
+    ]
+
+
+def measure(operation, args: list) -> float:
+    """Returns the mean latency of `operation` in microseconds"""
+    start = time.perf_counter()
+    for arg in args:
+        operation(arg)
+    return (time.perf_counter() - start) / len(args) * 1_000_000
+
+
+def bench(size: int) -> dict:
+    """Runs every operation against a repository holding `size` reviews"""
+    repo = MemoryRepository()
+    reviews = make_reviews(size)
+    for review in reviews:
+        repo.save(review)
+
+    sample = random.sample(reviews, min(SAMPLES, size))
+    extra = make_reviews(len(sample))
+
+    return {
+        "get": measure(lambda r: repo.get("review", r.id), sample),
+        "update": measure(repo.update, sample),
+        "save": measure(repo.save, extra),
+        "delete": measure(repo.delete, sample),
+    }
+
+
+def main() -> None:
+    """Prints one row per dataset size"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    print(f"{'size':>10} {'get':>8} {'update':>8} {'save':>8} {'delete':>8}")
+    for size in sizes:
+        result = bench(size)
+        print(
+            f"{size:>10} "
+            + " ".join(f"{result[op]:>6.2f}us" for op in result)
+        )
+
+
+if __name__ == "__main__":
+    main()
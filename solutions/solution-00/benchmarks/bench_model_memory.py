@@ -0,0 +1,85 @@
+"""
+Benchmark of the memory used by one instance of every model
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_model_memory [count]
+
+The memory is measured with tracemalloc over `count` instances and
+includes the instance, its attribute storage and its field values.
+"""
+
+from datetime import datetime
+import sys
+import tracemalloc
+import uuid
+
+from src.models.amenity import Amenity, PlaceAmenity
+from src.models.city import City
+from src.models.country import Country
+from src.models.place import Place
+from src.models.review import Review
+from src.models.user import User
+
+
+def new_id() -> str:
+    """Returns a fresh id"""
+    return str(uuid.uuid4())
+
+
+FACTORIES = {
+    "User": lambda: User(
+        email=f"{new_id()}@example.com", first_name="John", last_name="Doe"
+    ),
+    "Place": lambda: Place(
+        data={
+            "name": "Cozy Cottage",
+            "description": "A cozy cottage in the countryside.",
+            "address": "123 Country Lane",
+            "latitude": 34.052235,
+            "longitude": -118.243683,
+            "host_id": new_id(),
+            "city_id": new_id(),
+            "price_per_night": 100,
+            "number_of_rooms": 2,
+            "number_of_bathrooms": 1,
+            "max_guests": 4,
+        }
+    ),
+    "Review": lambda: Review(
+        place_id=new_id(), user_id=new_id(), comment="Great!", rating=5
+    ),
+    "City": lambda: City(name="Montevideo", country_code="UY"),
+    "Amenity": lambda: Amenity(name="Wifi"),
+    "PlaceAmenity": lambda: PlaceAmenity(
+        place_id=new_id(), amenity_id=new_id()
+    ),
+    "Country": lambda: Country(name="Uruguay", code="UY"),
+}
+
+
+def measure(factory, count: int) -> float:
+    """Returns the bytes allocated per instance built by `factory`"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del instances
+
+    # The list holding the instances is not part of the entity
+    return (after - before) / count - 8
+
+
+def main() -> None:
+    """Prints one row per model"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print(f"{'model':>13} {'bytes':>7}")
+    for name, factory in FACTORIES.items():
+        print(f"{name:>13} {measure(factory, count):>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of the keyset pages of the reviews against slicing a page
+out of the whole list at an offset
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_pagination [reviews]
+
+The reviews are stored in the repository selected by the REPOSITORY
+environment variable, the in-memory one by default. The ordered index
+is built by the first page, its build time is printed apart.
+"""
+
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+
+from src.models.review import Review
+from src.persistence import repo
+
+REVIEWS = 1_000_000
+LIMIT = 100
+SAMPLES = 200
+
+
+def timed(function, calls: int) -> float:
+    """Returns the mean latency of `function()` in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main() -> None:
+    """Prints the latency of a page at several depths"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else REVIEWS
+
+    start = datetime(2024, 1, 1)
+    reviews = [
+        Review(f"place-{i % 1000}", f"user-{i % 5000}", "Nice", 4)
+        for i in range(count)
+    ]
+    for review in reviews:
+        review.created_at = start + timedelta(
+            seconds=random.randrange(count)
+        )
+    repo.save_many(reviews)
+
+    build = time.perf_counter()
+    Review.page(None, LIMIT)
+    build = time.perf_counter() - build
+
+    ordered = sorted(reviews, key=lambda r: (r.created_at, r.id))
+
+    def offset_page(offset: int) -> list:
+        """A page sliced out of the sorted list of every review"""
+        return sorted(
+            Review.get_all(), key=lambda r: (r.created_at, r.id)
+        )[offset:offset + LIMIT]
+
+    print(f"{count} reviews, ordered index built in {build:.2f}s")
+    print(f"{'depth':>10} {'keyset':>12} {'offset':>12}")
+    for depth in (0.0, 0.5, 0.99):
+        offset = int(count * depth)
+        previous = ordered[offset - 1] if offset else None
+        after = (
+            (previous.created_at.isoformat(), previous.id)
+            if previous
+            else None
+        )
+
+        assert [r.id for r in Review.page(after, LIMIT)] == [
+            r.id for r in offset_page(offset)
+        ]
+
+        keyset_ms = timed(lambda: Review.page(after, LIMIT), SAMPLES)
+        offset_ms = timed(lambda: offset_page(offset), 2)
+        print(f"{offset:>10} {keyset_ms:>10.3f}ms {offset_ms:>10.1f}ms")
+
+    print(f"{'count':>10} {timed(Review.count, SAMPLES):>10.4f}ms")
+
+
+if __name__ == "__main__":
+    main()
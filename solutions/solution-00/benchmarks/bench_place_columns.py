@@ -0,0 +1,132 @@
+"""
+Benchmark of the numeric filters over places, a loop over the Place
+objects against the columnar store
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_place_columns [sizes...]
+
+The query asks for places for 4+ guests with 2 to 3 rooms under 150
+per night, inside a latitude band.
+
+The second table is the choice of `Place.search` for a price range
+holding a growing share of the places: the range of the sorted index
+with the other filter checked place by place, against the columnar
+store applying both, `COLUMN_SCAN` is where they cross.
+"""
+
+import random
+import sys
+import time
+
+from src.models.place import Place
+from src.persistence import repo
+from src.persistence.columns import numpy
+
+SIZES = [100_000, 500_000]
+QUERY = {
+    "max_guests": (4, None),
+    "number_of_rooms": (2, 3),
+    "price_per_night": (None, 150),
+    "latitude": (-40.0, 0.0),
+}
+SHARES = [1 / 1024, 1 / 256, 1 / 64, 1 / 16, 1 / 4]
+
+
+def make_places(count: int) -> list[Place]:
+    """Builds `count` random places"""
+    return [
+        Place(
+            data={
+                "name": "Place",
+                "host_id": "host",
+                "city_id": "city",
+                "latitude": random.uniform(-90, 90),
+                "longitude": random.uniform(-180, 180),
+                "price_per_night": random.randint(1, 1_000_000),
+                "number_of_rooms": random.randint(1, 6),
+                "number_of_bathrooms": random.randint(1, 3),
+                "max_guests": random.randint(1, 10),
+            }
+        )
+        for _ in range(count)
+    ]
+
+
+def loop(places: list[Place]) -> list[str]:
+    """The query written as a loop over the objects"""
+    return [
+        place.id
+        for place in places
+        if place.max_guests >= 4
+        and 2 <= place.number_of_rooms <= 3
+        and place.price_per_night <= 150_000
+        and -40.0 <= place.latitude <= 0.0
+    ]
+
+
+def by_index(high: int) -> list[Place]:
+    """Places under a price for 4+ guests, from the sorted index"""
+    return [
+        place
+        for place in map(
+            Place.get, Place.sorted_index("price_per_night").range(None, high)
+        )
+        if place and place.max_guests >= 4
+    ]
+
+
+def timed(function, *args) -> tuple[float, list]:
+    """Returns the best time in milliseconds of 5 runs and the result"""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main() -> None:
+    """Prints one row per dataset size, then per share of the places"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    query = {**QUERY, "price_per_night": (None, 150_000)}
+
+    print(f"NumPy: {'yes' if numpy is not None else 'no'}")
+    print(f"{'size':>10} {'matches':>8} {'loop':>10} {'columns':>10}")
+    for size in sizes:
+        repo.save_many(make_places(size - len(Place.get_all())))
+        places = Place.get_all()
+        store = Place.columns()
+
+        loop_ms, expected = timed(loop, places)
+        store_ms, found = timed(lambda: store.filter(**query))
+
+        assert sorted(found) == sorted(expected)
+
+        print(
+            f"{size:>10} {len(found):>8} "
+            f"{loop_ms:>8.1f}ms {store_ms:>8.1f}ms"
+        )
+
+    print()
+    print(f"{'size':>10} {'share':>8} {'index':>10} {'columns':>10}")
+    for share in SHARES:
+        high = int(1_000_000 * share)
+
+        index_ms, expected = timed(by_index, high)
+        store_ms, found = timed(
+            lambda: Place.filter(
+                price_per_night=(None, high), max_guests=(4, None)
+            )
+        )
+
+        assert sorted(p.id for p in found) == sorted(p.id for p in expected)
+
+        print(
+            f"{len(places):>10} {f'1/{round(1 / share)}':>8} "
+            f"{index_ms:>8.1f}ms {store_ms:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the radius and k-nearest queries of the spatial index
+against a brute-force scan of every place
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_place_nearby [sizes...]
+
+The places are spread uniformly over the land latitudes.
+"""
+
+import random
+import sys
+import time
+
+from src.models.place import Place
+from src.persistence.spatial import GeoGrid, distance_km
+
+SIZES = [100_000, 1_000_000]
+SAMPLES = 100
+RADIUS_KM = 50
+K = 10
+
+
+def make_places(count: int) -> list[Place]:
+    """Builds `count` places with random coordinates"""
+    return [
+        Place(
+            data={
+                "name": "Place",
+                "host_id": "host",
+                "city_id": "city",
+                "latitude": random.uniform(-60, 70),
+                "longitude": random.uniform(-180, 180),
+            }
+        )
+        for _ in range(count)
+    ]
+
+
+def brute_within(places: list[Place], lat: float, lon: float) -> list:
+    """The radius query answered by a scan"""
+    found = [
+        (distance_km(lat, lon, place.latitude, place.longitude), place.id)
+        for place in places
+    ]
+    return sorted(d for d in found if d[0] <= RADIUS_KM)
+
+
+def brute_nearest(places: list[Place], lat: float, lon: float) -> list:
+    """The k-nearest query answered by a scan"""
+    return sorted(
+        (distance_km(lat, lon, place.latitude, place.longitude), place.id)
+        for place in places
+    )[:K]
+
+
+def measure(function, points: list) -> float:
+    """Returns the mean latency of `function` in milliseconds"""
+    start = time.perf_counter()
+    for point in points:
+        function(*point)
+    return (time.perf_counter() - start) / len(points) * 1000
+
+
+def main() -> None:
+    """Prints one row per dataset size and query"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    print(f"{'size':>10} {'query':>14} {'index':>10} {'scan':>10}")
+    for size in sizes:
+        places = make_places(size)
+        index = GeoGrid(objs=places)
+        points = [
+            (random.uniform(-60, 70), random.uniform(-180, 180))
+            for _ in range(SAMPLES)
+        ]
+
+        for lat, lon in points[:3]:
+            assert index.within(lat, lon, RADIUS_KM) == brute_within(
+                places, lat, lon
+            )
+            assert index.nearest(lat, lon, K) == brute_nearest(
+                places, lat, lon
+            )
+
+        rows = {
+            f"{RADIUS_KM}km radius": (
+                lambda lat, lon: index.within(lat, lon, RADIUS_KM),
+                lambda lat, lon: brute_within(places, lat, lon),
+            ),
+            f"{K} nearest": (
+                lambda lat, lon: index.nearest(lat, lon, K),
+                lambda lat, lon: brute_nearest(places, lat, lon),
+            ),
+        }
+        for name, (indexed, brute) in rows.items():
+            print(
+                f"{size:>10} {name:>14} "
+                f"{measure(indexed, points):>8.3f}ms "
+                f"{measure(brute, points[:3]):>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
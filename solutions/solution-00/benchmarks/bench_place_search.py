@@ -0,0 +1,128 @@
+"""
+Benchmark of Place.search as the number of places grows, against a
+full scan of the places
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_place_search [sizes...]
+
+The places are stored in the MemoryRepository. The queries are
+selective, they return a few dozen places at most, so their latency
+should grow much slower than the dataset while the scan grows with it.
+"""
+
+import random
+import sys
+import time
+
+from src.models.place import Place
+from src.persistence import repo
+
+SIZES = [100_000, 1_000_000]
+CITIES = 10_000
+HOSTS = 100_000
+SAMPLES = 200
+
+
+def make_places(count: int) -> list[Place]:
+    """Builds `count` random places"""
+    return [
+        Place(
+            data={
+                "name": "Place",
+                "host_id": f"host-{random.randrange(HOSTS)}",
+                "city_id": f"city-{random.randrange(CITIES)}",
+                "price_per_night": random.randint(20, 500),
+                "number_of_rooms": random.randint(1, 6),
+                "number_of_bathrooms": random.randint(1, 3),
+                "max_guests": random.randint(1, 10),
+            }
+        )
+        for _ in range(count)
+    ]
+
+
+QUERIES = {
+    "city + guests": lambda: {
+        "city_id": f"city-{random.randrange(CITIES)}",
+        "min_guests": 4,
+    },
+    "host": lambda: {"host_id": f"host-{random.randrange(HOSTS)}"},
+    "price range, limit 20": lambda: {
+        "min_price": (low := random.randint(20, 480)),
+        "max_price": low + 20,
+        "min_rooms": 3,
+        "sort": "price_per_night",
+        "limit": 20,
+    },
+    "top 10 by price": lambda: {"sort": "-price_per_night", "limit": 10},
+}
+
+
+def scan(places: list[Place], query: dict) -> list[Place]:
+    """The query answered by a loop over every place"""
+    def keep(place: Place) -> bool:
+        """Checks every filter of the query"""
+        return (
+            query.get("city_id", place.city_id) == place.city_id
+            and query.get("host_id", place.host_id) == place.host_id
+            and place.price_per_night >= query.get("min_price", 0)
+            and place.price_per_night <= query.get("max_price", 1 << 62)
+            and place.max_guests >= query.get("min_guests", 0)
+            and place.number_of_rooms >= query.get("min_rooms", 0)
+        )
+
+    found = [place for place in places if keep(place)]
+    sort = query.get("sort")
+    if sort:
+        field = sort.removeprefix("-")
+        found.sort(
+            key=lambda place: (getattr(place, field), place.id),
+            reverse=sort.startswith("-"),
+        )
+
+    return found[:query.get("limit")]
+
+
+def measure(function, queries: list[dict]) -> float:
+    """Returns the mean latency of `function` in milliseconds"""
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    """Prints one row per dataset size and query"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    print(f"{'size':>10} {'query':>22} {'search':>10} {'scan':>10}")
+    for size in sizes:
+        repo.save_many(make_places(size - len(Place.get_all())))
+        places = Place.get_all()
+
+        # The sorted indexes are rebuilt from the repository
+        for store in Place._sorted.values():
+            store.reset()
+        for field in Place.sorted_indexes:
+            Place.sorted_index(field)
+
+        for name, make_query in QUERIES.items():
+            queries = [make_query() for _ in range(SAMPLES)]
+
+            for query in queries[:5]:
+                expected = [place.id for place in scan(places, query)]
+                found = [place.id for place in Place.search(**query)]
+                assert sorted(found) == sorted(expected)
+
+            search_ms = measure(lambda q: Place.search(**q), queries)
+            scan_ms = measure(lambda q: scan(places, q), queries[:5])
+
+            print(
+                f"{size:>10} {name:>22} "
+                f"{search_ms:>8.3f}ms {scan_ms:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark of the top-k places of the leaderboards against a full sort
+of the places on every request
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_place_top [places] [reviews]
+
+The reviews are fed to the rating aggregates directly, building the
+Review objects of 10M reviews is not what is being measured.
+"""
+
+import random
+import sys
+import time
+from itertools import islice
+
+from src.models.place import Place
+from src.persistence.aggregates import RatingAggregates
+from src.persistence.leaderboard import Leaderboard
+
+PLACES = 1_000_000
+REVIEWS = 10_000_000
+CITIES = 1_000
+K = 10
+SAMPLES = 200
+
+
+def make_places(count: int) -> list[Place]:
+    """Builds `count` random places"""
+    return [
+        Place(
+            data={
+                "name": "Place",
+                "host_id": "host",
+                "city_id": f"city-{random.randrange(CITIES)}",
+                "price_per_night": random.randint(20, 500),
+                "max_guests": random.randint(1, 10),
+            }
+        )
+        for _ in range(count)
+    ]
+
+
+def timed(function, calls: int) -> float:
+    """Returns the mean latency of `function()` in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main() -> None:
+    """Prints the latency of every top-k query"""
+    places_count = int(sys.argv[1]) if len(sys.argv) > 1 else PLACES
+    reviews_count = int(sys.argv[2]) if len(sys.argv) > 2 else REVIEWS
+
+    places = make_places(places_count)
+    ratings = RatingAggregates()
+    for _ in range(reviews_count):
+        ratings.add(random.choice(places).id, random.randint(1, 5))
+
+    def rating_score(place: Place) -> tuple | None:
+        """Same score as Place._rating_score"""
+        rating = ratings.get(place.id)
+        if not rating["count"]:
+            return None
+        return (-rating["mean"], -rating["count"])
+
+    start = time.perf_counter()
+    by_rating = Leaderboard(rating_score, "city_id", places)
+    by_price = Leaderboard(Place._price_score, "city_id", places)
+    build = time.perf_counter() - start
+
+    by_id = {place.id: place for place in places}
+    city = places[0].city_id
+
+    def top_rated(board_city=None) -> list[str]:
+        """Top k from the leaderboard"""
+        return list(islice(by_rating.ranked(board_city), K))
+
+    def cheapest(board_city, min_guests: int) -> list[str]:
+        """Top k cheapest from the leaderboard with enough guests"""
+        ids = (
+            obj_id
+            for obj_id in by_price.ranked(board_city)
+            if by_id[obj_id].max_guests >= min_guests
+        )
+        return list(islice(ids, K))
+
+    def sort_rated(board_city=None) -> list[str]:
+        """Top k by sorting every place"""
+        scored = [
+            (score, place.id)
+            for place in places
+            if board_city is None or place.city_id == board_city
+            if (score := rating_score(place)) is not None
+        ]
+        return [obj_id for _, obj_id in sorted(scored)[:K]]
+
+    def sort_cheapest(board_city, min_guests: int) -> list[str]:
+        """Top k cheapest by sorting every place"""
+        scored = [
+            (place.price_per_night, place.id)
+            for place in places
+            if place.city_id == board_city and place.max_guests >= min_guests
+        ]
+        return [obj_id for _, obj_id in sorted(scored)[:K]]
+
+    assert top_rated() == sort_rated()
+    assert top_rated(city) == sort_rated(city)
+    assert cheapest(city, 4) == sort_cheapest(city, 4)
+
+    def review_added() -> None:
+        """One more review, the aggregates and the leaderboard move"""
+        place = random.choice(places)
+        ratings.add(place.id, random.randint(1, 5))
+        by_rating.update(place)
+
+    print(f"{places_count} places, {reviews_count} reviews")
+    print(f"leaderboards built in {build:.1f}s")
+    print(f"{'query':>28} {'leaderboard':>12} {'full sort':>12}")
+    rows = {
+        "best rated": (top_rated, sort_rated, ()),
+        "best rated in a city": (top_rated, sort_rated, (city,)),
+        "cheapest in a city, 4+": (cheapest, sort_cheapest, (city, 4)),
+    }
+    for name, (board, full, args) in rows.items():
+        board_ms = timed(lambda: board(*args), SAMPLES)
+        full_ms = timed(lambda: full(*args), 2)
+        print(f"{name:>28} {board_ms:>10.3f}ms {full_ms:>10.1f}ms")
+    print(f"{'new review':>28} {timed(review_added, SAMPLES):>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the peak memory of `GET /reviews` streamed as NDJSON
+against the whole list encoded in one body
+
+Run it from the solution root:
+
+    REPOSITORY=db python -m benchmarks.bench_stream [sizes...]
+
+The peak is measured with tracemalloc while the response is read
+through the Flask test client, so it is the memory allocated by the
+request on top of what the repository already holds: with the in-memory
+repositories the objects are always in memory, with SQLite they are
+only built for the request. Both endpoints are called once before they
+are measured, so the cached encodings of the objects and the ordered
+index of the pages are already built. The list is served by an
+endpoint registered by the benchmark that skips the list cache.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from src import create_app
+from src.controllers.responses import json_list
+from src.models.review import Review
+from src.persistence import repo
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def measure(client, url: str, headers=None) -> tuple[float, float, int]:
+    """Returns the peak MB, the seconds and the bytes of a request"""
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    response = client.get(url, headers=headers, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    return peak, seconds, size
+
+
+def main() -> None:
+    """Prints one row per dataset size"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+
+    app = create_app()
+    app.add_url_rule(
+        "/uncached/reviews",
+        "uncached_reviews",
+        lambda: json_list(Review, Review.get_all()),
+    )
+    client = app.test_client()
+    ndjson = {"Accept": "application/x-ndjson"}
+
+    print(f"{'size':>9} {'body MB':>10} {'stream':>18} {'list':>18}")
+    stored = 0
+    for size in sizes:
+        for start in range(stored, size, 100_000):
+            repo.save_many(
+                [
+                    Review("place", "user", f"Review {i}", 4)
+                    for i in range(start, min(size, start + 100_000))
+                ]
+            )
+        stored = size
+
+        client.get("/reviews", headers=ndjson)
+        client.get("/uncached/reviews")
+
+        streamed = measure(client, "/reviews", ndjson)
+        listed = measure(client, "/uncached/reviews")
+
+        print(
+            f"{size:>9} {streamed[2] / 1e6:>10.1f}"
+            f" {streamed[0]:>8.1f}MB {streamed[1]:>6.2f}s"
+            f" {listed[0]:>8.1f}MB {listed[1]:>6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
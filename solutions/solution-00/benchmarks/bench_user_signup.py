@@ -0,0 +1,74 @@
+"""
+Benchmark of the signup throughput of `User.create` with the unique
+email index against the previous scan of every user
+
+Run it from the solution root:
+
+    python -m benchmarks.bench_user_signup [users]
+
+The users are stored in the repository selected by the REPOSITORY
+environment variable, the in-memory one by default.
+"""
+
+import sys
+import time
+import uuid
+
+from src.models.user import User
+from src.persistence import repo
+
+USERS = 1_000_000
+SIGNUPS = 20_000
+SCAN_SIGNUPS = 5
+
+
+def signup_data() -> dict:
+    """Returns the payload of a signup with a new email"""
+    return {
+        "email": f"{uuid.uuid4().hex}@example.com",
+        "first_name": "John",
+        "last_name": "Doe",
+    }
+
+
+def scan_create(data: dict) -> User:
+    """The signup before the index, every user is compared"""
+    for user in User.get_all():
+        if user.email == data["email"]:
+            raise ValueError("User already exists")
+
+    user = User(**data)
+    repo.save(user)
+
+    return user
+
+
+def throughput(create, count: int) -> float:
+    """Returns how many signups per second `create` handles"""
+    payloads = [signup_data() for _ in range(count)]
+
+    start = time.perf_counter()
+    for data in payloads:
+        create(data)
+
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Prints the signups per second with and without the index"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+
+    start = time.perf_counter()
+    repo.save_many([User(**signup_data()) for _ in range(count)])
+    build = time.perf_counter() - start
+
+    print(f"{count} users saved with their emails indexed in {build:.2f}s")
+    indexed = throughput(User.create, SIGNUPS)
+    scanned = throughput(scan_create, SCAN_SIGNUPS)
+
+    print(f"{'index':>8} {indexed:>12,.0f} signups/s")
+    print(f"{'scan':>8} {scanned:>12,.1f} signups/s")
+
+
+if __name__ == "__main__":
+    main()
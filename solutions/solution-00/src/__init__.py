@@ -39,6 +39,7 @@ def register_routes(app: Flask) -> None:
     from src.routes.places import places_bp
     from src.routes.amenities import amenities_bp
     from src.routes.reviews import reviews_bp
+    from src.routes.search import search_bp
 
     # Register the blueprints in the app
     app.register_blueprint(users_bp)
@@ -47,6 +48,7 @@ def register_routes(app: Flask) -> None:
     app.register_blueprint(places_bp)
     app.register_blueprint(reviews_bp)
     app.register_blueprint(amenities_bp)
+    app.register_blueprint(search_bp)
 
 
 def register_handlers(app: Flask) -> None:
@@ -3,24 +3,42 @@ Amenity controller module
 """
 
 from flask import abort, request
+from src.controllers.responses import (
+    cached_list,
+    entity,
+    if_match,
+    page,
+    paginated,
+    stream,
+    streamed,
+    updated,
+)
 from src.models.amenity import Amenity
 
 
 def get_amenities():
-    """Returns all amenities"""
-    amenities: list[Amenity] = Amenity.get_all()
+    """Returns all amenities, a page or a stream of them"""
+    if streamed():
+        return stream(Amenity)
 
-    return [amenity.to_dict() for amenity in amenities]
+    if paginated():
+        return page(Amenity)
+
+    return cached_list("amenity", Amenity.get_all)
 
 
 def create_amenity():
     """Creates a new amenity"""
+    from src.persistence.repository import DuplicateIdError
+
     data = request.get_json()
 
     try:
         amenity = Amenity.create(data)
     except KeyError as e:
         abort(400, f"Missing field: {e}")
+    except DuplicateIdError as e:
+        abort(409, str(e))
     except ValueError as e:
         abort(400, str(e))
 
@@ -34,19 +52,20 @@ def get_amenity_by_id(amenity_id: str):
     if not amenity:
         abort(404, f"Amenity with ID {amenity_id} not found")
 
-    return amenity.to_dict()
+    return entity(amenity)
 
 
 def update_amenity(amenity_id: str):
     """Updates a amenity by ID"""
     data = request.get_json()
 
-    updated_amenity: Amenity | None = Amenity.update(amenity_id, data)
+    with if_match(Amenity, amenity_id):
+        updated_amenity: Amenity | None = Amenity.update(amenity_id, data)
 
     if not updated_amenity:
         abort(404, f"Amenity with ID {amenity_id} not found")
 
-    return updated_amenity.to_dict()
+    return updated(updated_amenity)
 
 
 def delete_amenity(amenity_id: str):
@@ -0,0 +1,43 @@
+"""
+Helpers shared by the batch endpoints
+"""
+
+from flask import abort, request
+
+
+def get_batch() -> list:
+    """Returns the list of items sent to a batch endpoint"""
+    data = request.get_json()
+
+    if not isinstance(data, list):
+        abort(400, "Expected a list of objects")
+
+    return data
+
+
+def batch_response(results: list) -> tuple[list, int]:
+    """
+    Builds the response of a batch endpoint from the results of a
+    `create_many`, one entry per item in the order they were sent
+
+    The status is 201 if every item was created, 207 otherwise
+    """
+    items = []
+
+    for index, result in enumerate(results):
+        if isinstance(result, KeyError):
+            items.append(
+                {"index": index, "status": 400,
+                 "error": f"Missing field: {result}"}
+            )
+        elif isinstance(result, Exception):
+            items.append({"index": index, "status": 400, "error": str(result)})
+        else:
+            items.append(
+                {"index": index, "status": 201, "data": result.to_dict()}
+            )
+
+    if all(item["status"] == 201 for item in items):
+        return items, 201
+
+    return items, 207
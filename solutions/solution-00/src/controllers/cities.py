@@ -3,24 +3,42 @@ Cities controller module
 """
 
 from flask import request, abort
+from src.controllers.responses import (
+    cached_list,
+    entity,
+    if_match,
+    page,
+    paginated,
+    stream,
+    streamed,
+    updated,
+)
 from src.models.city import City
 
 
 def get_cities():
-    """Returns all cities"""
-    cities: list[City] = City.get_all()
+    """Returns all cities, a page or a stream of them"""
+    if streamed():
+        return stream(City)
 
-    return [city.to_dict() for city in cities]
+    if paginated():
+        return page(City)
+
+    return cached_list("city", City.get_all)
 
 
 def create_city():
     """Creates a new city"""
+    from src.persistence.repository import DuplicateIdError
+
     data = request.get_json()
 
     try:
         city = City.create(data)
     except KeyError as e:
         abort(400, f"Missing field: {e}")
+    except DuplicateIdError as e:
+        abort(409, str(e))
     except ValueError as e:
         abort(400, str(e))
 
@@ -34,7 +52,7 @@ def get_city_by_id(city_id: str):
     if not city:
         abort(404, f"City with ID {city_id} not found")
 
-    return city.to_dict()
+    return entity(city)
 
 
 def update_city(city_id: str):
@@ -42,19 +60,25 @@ def update_city(city_id: str):
     data = request.get_json()
 
     try:
-        city: City | None = City.update(city_id, data)
+        with if_match(City, city_id):
+            city: City | None = City.update(city_id, data)
     except ValueError as e:
         abort(400, str(e))
 
     if not city:
         abort(404, f"City with ID {city_id} not found")
 
-    return city.to_dict()
+    return updated(city)
 
 
 def delete_city(city_id: str):
-    """Deletes a city by ID"""
-    if not City.delete(city_id):
+    """Deletes a city by ID, refused while places are in the city"""
+    try:
+        deleted = City.delete(city_id)
+    except ValueError as e:
+        abort(400, str(e))
+
+    if not deleted:
         abort(404, f"City with ID {city_id} not found")
 
     return "", 204
@@ -2,39 +2,103 @@
 Countries controller module
 """
 
-from flask import abort
+from functools import cache
+import hashlib
+from flask import abort, current_app
+from src.controllers.responses import (
+    cached_list,
+    conditional,
+    page,
+    paginated,
+    requested_fields,
+    stream,
+    streamed,
+    tagged,
+)
 from src.models.city import City
-from src.models.country import Country
+from src.models.country import COUNTRIES, Country
+
+
+@cache
+def serialized() -> dict[str | None, str]:
+    """
+    The JSON bodies of every country by code, and of the list of
+    every country with None, the table never changes so they are
+    serialized once
+    """
+    dumps = current_app.json.dumps
+    bodies: dict[str | None, str] = {
+        code: dumps(country.to_dict()) for code, country in COUNTRIES.items()
+    }
+    bodies[None] = dumps([country.to_dict() for country in COUNTRIES.values()])
+
+    return bodies
+
+
+@cache
+def etag(code: str | None = None) -> str:
+    """
+    The ETag of a country, or of the list of every country with None,
+    a hash of its body
+    """
+    return hashlib.sha1(serialized()[code].encode()).hexdigest()[:20]
+
+
+def projected(code: str | None = None) -> tuple[str, object]:
+    """
+    The ETag and the body of a country, or of the list of every country
+    with None, with only the fields asked with `?fields=`
+    """
+    fields = requested_fields()
+
+    if fields is None:
+        return etag(code), lambda: serialized()[code]
+
+    unknown = set(fields) - {"code", "name"}
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    def body() -> str:
+        """The projected countries"""
+        countries = COUNTRIES.values() if code is None else [COUNTRIES[code]]
+        dicts = [
+            {field: country.to_dict()[field] for field in fields}
+            for country in countries
+        ]
+        return current_app.json.dumps(dicts if code is None else dicts[0])
+
+    return tagged(etag(code), fields), body
 
 
 def get_countries():
     """Returns all countries"""
-    countries: list[Country] = Country.get_all()
-
-    return [country.to_dict() for country in countries]
+    return conditional(*projected())
 
 
 def get_country_by_code(code: str):
     """Returns a country by code"""
-    country: Country | None = Country.get(code)
-
-    if not country:
+    if code not in serialized():
         abort(404, f"Country with ID {code} not found")
 
-    return country.to_dict()
+    return conditional(*projected(code))
 
 
 def get_country_cities(code: str):
-    """Returns all cities for a specific country by code"""
+    """
+    Returns all cities for a specific country by code, a page or a
+    stream of them
+    """
     country: Country | None = Country.get(code)
 
     if not country:
         abort(404, f"Country with ID {code} not found")
 
-    cities: list[City] = City.get_all()
+    if streamed():
+        return stream(City, country_code=country.code)
 
-    country_cities = [
-        city.to_dict() for city in cities if city.country_code == country.code
-    ]
+    if paginated():
+        return page(City, country_code=country.code)
 
-    return country_cities
+    return cached_list(
+        "city", lambda: City.find_by(country_code=country.code), country.code
+    )
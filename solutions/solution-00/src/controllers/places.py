@@ -3,14 +3,138 @@ Places controller module
 """
 
 from flask import abort, request
+from src.controllers.batch import batch_response, get_batch
+from src.controllers.responses import (
+    cached_list,
+    entity,
+    if_match,
+    as_dict,
+    json_list,
+    page,
+    paginated,
+    requested_fields,
+    stream,
+    streamed,
+    updated,
+)
+from src.models.amenity import Amenity, PlaceAmenity
 from src.models.place import Place
+from src.models.review import Review
 
 
 def get_places():
-    """Returns all places"""
-    places: list[Place] = Place.get_all()
+    """
+    Returns all places, a page or a stream of them, or with
+    `?amenities=<id>,<id>` the places that have every given amenity
+    """
+    amenities = request.args.get("amenities")
+
+    if amenities:
+        places: list[Place] = Place.with_amenities(
+            [a for a in amenities.split(",") if a]
+        )
+
+        return json_list(Place, places)
+
+    if streamed():
+        return stream(Place)
+
+    if paginated():
+        return page(Place)
+
+    return cached_list("place", Place.get_all)
+
+
+def search_places():
+    """Returns the places matching the filters of the query string"""
+    args = request.args
+    numbers = {}
+
+    for name in (
+        "min_price",
+        "max_price",
+        "min_guests",
+        "min_rooms",
+        "min_bathrooms",
+        "limit",
+    ):
+        if name not in args:
+            continue
+        try:
+            numbers[name] = int(args[name])
+        except ValueError:
+            abort(400, f"{name} must be an integer")
+
+    try:
+        places = Place.search(
+            city_id=args.get("city_id"),
+            host_id=args.get("host_id"),
+            sort=args.get("sort"),
+            **numbers,
+        )
+    except ValueError as e:
+        abort(400, str(e))
+
+    return json_list(Place, places)
+
+
+def get_top_places():
+    """Returns the best rated or the cheapest places"""
+    args = request.args
+    by = args.get("by", "rating")
+
+    try:
+        k = int(args.get("k", 10))
+        min_guests = int(args["min_guests"]) if "min_guests" in args else None
+    except ValueError:
+        abort(400, "k and min_guests must be integers")
+
+    if k > 100:
+        abort(400, "k must be at most 100")
+
+    try:
+        places = Place.top(by, args.get("city_id"), k, min_guests)
+    except ValueError as e:
+        abort(400, str(e))
+
+    fields = requested_fields(Place)
+
+    if by == "price":
+        return json_list(Place, places)
+
+    ratings = Review.ratings()["place"]
+
+    return [
+        {**as_dict(place, fields), "rating": ratings.get(place.id)}
+        for place in places
+    ], 200
 
-    return [place.to_dict() for place in places], 200
+
+def get_nearby_places():
+    """Returns the places around a point, nearest first"""
+    args = request.args
+
+    try:
+        lat = float(args["lat"])
+        lon = float(args["lon"])
+        radius_km = float(args["radius_km"]) if "radius_km" in args else None
+        limit = int(args["limit"]) if "limit" in args else None
+    except KeyError as e:
+        abort(400, f"Missing parameter: {e}")
+    except ValueError:
+        abort(400, "lat, lon and radius_km must be numbers, limit an integer")
+
+    try:
+        found = Place.nearby(lat, lon, radius_km, limit)
+    except ValueError as e:
+        abort(400, str(e))
+
+    fields = requested_fields(Place)
+
+    return [
+        {**as_dict(place, fields), "distance_km": round(distance, 3)}
+        for place, distance in found
+    ], 200
 
 
 def create_place():
@@ -27,6 +151,11 @@ def create_place():
     return place.to_dict(), 201
 
 
+def create_places_batch():
+    """Creates several places at once"""
+    return batch_response(Place.create_many(get_batch()))
+
+
 def get_place_by_id(place_id: str):
     """Returns a place by ID"""
     place: Place | None = Place.get(place_id)
@@ -34,7 +163,7 @@ def get_place_by_id(place_id: str):
     if not place:
         abort(404, f"Place with ID {place_id} not found")
 
-    return place.to_dict(), 200
+    return entity(place)
 
 
 def update_place(place_id: str):
@@ -42,14 +171,15 @@ def update_place(place_id: str):
     data = request.get_json()
 
     try:
-        place: Place | None = Place.update(place_id, data)
+        with if_match(Place, place_id):
+            place: Place | None = Place.update(place_id, data)
     except ValueError as e:
         abort(400, str(e))
 
     if not place:
         abort(404, f"Place with ID {place_id} not found")
 
-    return place.to_dict(), 200
+    return updated(place)
 
 
 def delete_place(place_id: str):
@@ -58,3 +188,43 @@ def delete_place(place_id: str):
         abort(404, f"Place with ID {place_id} not found")
 
     return "", 204
+
+
+def get_place_amenities(place_id: str):
+    """Returns the amenities of a place"""
+    if not Place.get(place_id):
+        abort(404, f"Place with ID {place_id} not found")
+
+    amenities = map(Amenity.get, PlaceAmenity.amenity_ids(place_id))
+
+    return json_list(
+        Amenity, (amenity for amenity in amenities if amenity)
+    )
+
+
+def add_place_amenity(place_id: str, amenity_id: str):
+    """Adds an amenity to a place"""
+    if not Place.get(place_id):
+        abort(404, f"Place with ID {place_id} not found")
+
+    amenity: Amenity | None = Amenity.get(amenity_id)
+
+    if not amenity:
+        abort(404, f"Amenity with ID {amenity_id} not found")
+
+    if PlaceAmenity.get(place_id, amenity_id):
+        return amenity.to_dict(), 200
+
+    PlaceAmenity.create({"place_id": place_id, "amenity_id": amenity_id})
+
+    return amenity.to_dict(), 201
+
+
+def delete_place_amenity(place_id: str, amenity_id: str):
+    """Removes an amenity from a place"""
+    if not PlaceAmenity.delete(place_id, amenity_id):
+        abort(
+            404, f"Amenity with ID {amenity_id} not found in place {place_id}"
+        )
+
+    return "", 204
@@ -0,0 +1,362 @@
+"""
+Helpers to answer with JSON that is already encoded
+
+The lists of every object of a model are cached encoded with the
+generation of the model they were built at, see Repository.generation,
+and tagged with it so the clients polling them get a 304 while the
+model does not change
+
+A single object is tagged with its version, the `updated_at` every
+update moves, and its `Last-Modified`, so its 304 is answered without
+encoding it, and an update can require with `If-Match` that the object
+did not change since the client read it
+
+With `?limit=` or `?cursor=` a list answers one page of its objects in
+`(created_at, id)` order, with the cursor of the next page in the
+`X-Next-Cursor` and `Link` headers and the size of the whole list in
+`X-Total-Count`
+
+With `Accept: application/x-ndjson` or `?stream=1` a list is streamed,
+one object per line or as a JSON array, in the same order. The objects
+are read from the repository chunk by chunk as they are sent (see
+`Repository.walk`). With SQLite only one chunk is held at a time. The
+in-memory repositories already hold every object, a filtered list only
+adds the list of the matching objects, sorted once
+
+With `?fields=id,name` the lists and the objects only hold the given
+fields, the others are neither read nor encoded (see `Base.project`)
+"""
+
+import base64
+import binascii
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import threading
+from typing import Callable, Hashable, Iterable, Iterator
+from urllib.parse import urlencode
+from flask import Response, abort, current_app, request
+from src.models.base import Base
+
+# Number of objects of a page without `?limit=`, and at most
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Number of objects read from the repository for every streamed chunk
+STREAM_CHUNK = 1000
+
+NDJSON = "application/x-ndjson"
+
+# The body of the recently used lists with the ETag they were built
+# for, by model, key and fields, the least recently used is dropped
+MAX_CACHED_LISTS = 256
+_lists: OrderedDict[tuple, tuple[str, str]] = OrderedDict()
+_lists_lock = threading.Lock()
+
+# The updates of an object hold one of these, picked by its id, from
+# the If-Match check to the write
+_update_locks = [threading.Lock() for _ in range(64)]
+
+
+def json_response(body: str, status: int = 200) -> Response:
+    """Wraps an already encoded JSON body in a response"""
+    return current_app.response_class(
+        body, status=status, mimetype="application/json"
+    )
+
+
+def requested_fields(
+    model: type | None = None,
+) -> tuple[str, ...] | None:
+    """
+    Returns the fields of the `fields` query parameter, None without
+    it, aborts with 400 if one of them is not a field of the `model`
+    """
+    value = request.args.get("fields")
+
+    if value is None:
+        return None
+
+    names = {name.strip() for name in value.split(",")}
+    fields = tuple(sorted(names - {""}))
+
+    if not fields:
+        abort(400, "fields must name at least one field")
+
+    if model is not None:
+        try:
+            model.check_fields(fields)
+        except ValueError as e:
+            abort(400, str(e))
+
+    return fields
+
+
+def tagged(etag: str, fields: tuple[str, ...] | None) -> str:
+    """The ETag of the projection of a body on the fields"""
+    return etag if fields is None else f"{etag};{','.join(fields)}"
+
+
+def as_dict(obj: Base, fields: tuple[str, ...] | None) -> dict:
+    """The `to_dict` of an object, or its projection on the fields"""
+    return obj.to_dict() if fields is None else obj.project(fields)
+
+
+def encode_list(
+    objs: Iterable[Base], fields: tuple[str, ...] | None = None
+) -> str:
+    """
+    Returns the JSON list of the given objects, joining the JSON
+    encodings they cache instead of serializing their dicts, or the
+    list of their projections on the fields
+    """
+    if fields is not None:
+        # The fields are sorted already, the keys need no sorting
+        return json.dumps(
+            [obj.project(fields) for obj in objs], separators=(",", ":")
+        )
+
+    return "[" + ",".join(obj.to_json() for obj in objs) + "]"
+
+
+def json_list(
+    model: type[Base], objs: Iterable[Base], status: int = 200
+) -> Response:
+    """
+    Answers with the list of the given objects of the `model`,
+    projected on the requested fields of the model
+    """
+    fields = requested_fields(model)
+
+    return json_response(encode_list(objs, fields), status)
+
+
+def conditional(
+    etag: str,
+    body: Callable[[], str],
+    last_modified: datetime | None = None,
+) -> Response:
+    """
+    Answers 304 if the request has the ETag in `If-None-Match`, or
+    without it if nothing was modified after its `If-Modified-Since`,
+    otherwise the JSON returned by `body` with the ETag
+    """
+    if last_modified is not None:
+        # HTTP dates are in whole seconds
+        last_modified = last_modified.astimezone(timezone.utc).replace(
+            microsecond=0
+        )
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = (
+            since is not None
+            and last_modified is not None
+            and last_modified <= since
+        )
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        response = json_response(body())
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+
+    return response
+
+
+def version(obj: Base) -> str:
+    """The ETag of an object, it changes on every update"""
+    return f"{obj.id}-{obj.updated_at.strftime('%Y%m%d%H%M%S%f')}"
+
+
+def entity(obj: Base) -> Response:
+    """
+    Answers with an object, or with 304 if the client has its current
+    version, the object is encoded only in the first case
+    """
+    fields = requested_fields(type(obj))
+
+    return conditional(
+        tagged(version(obj), fields),
+        lambda: obj.to_json(fields),
+        obj.updated_at,
+    )
+
+
+def updated(obj: Base) -> Response:
+    """
+    Answers with an object that was just updated and its new version,
+    which the client can send in the `If-Match` of its next update
+    """
+    response = json_response(obj.to_json())
+    response.set_etag(version(obj))
+    response.last_modified = obj.updated_at.astimezone(timezone.utc)
+
+    return response
+
+
+@contextmanager
+def if_match(model: type[Base], obj_id: str) -> Iterator[None]:
+    """
+    Runs an update of an object after checking the `If-Match` of the
+    request against its version, aborts with 412 if the object changed
+    since the client read it
+
+    The other updates of the object wait until this one is done, so
+    two clients can't both update the version they read
+    """
+    with _update_locks[hash(obj_id) % len(_update_locks)]:
+        obj = model.get(obj_id) if request.if_match else None
+
+        # A missing object is left to the update, which answers 404
+        if obj is not None and not request.if_match.contains(version(obj)):
+            abort(412, f"{model.__name__} with ID {obj_id} was modified")
+
+        yield
+
+
+def cached_list(
+    model_name: str,
+    objs: Callable[[], Iterable[Base]],
+    key: Hashable = None,
+) -> Response:
+    """
+    Answers with the list of the objects returned by `objs`, all the
+    objects of a model or the ones of a `key` (like the cities of a
+    country), it is encoded once per generation of the model and of
+    requested fields, and `objs` is not called when the client or the
+    cache is up to date
+    """
+    from src.models import get_models
+    from src.persistence import repo
+
+    fields = requested_fields(get_models()[model_name])
+    cache_key = (model_name, key, fields)
+
+    # Read before the objects, a write racing with the encoding leaves
+    # a newer body under an older generation, never the opposite
+    etag = tagged(f"{model_name}-{repo.generation(model_name)}", fields)
+
+    def body() -> str:
+        """The cached body, encoded again if the model changed"""
+        with _lists_lock:
+            cached = _lists.get(cache_key)
+            if cached is not None:
+                _lists.move_to_end(cache_key)
+
+        if cached is None or cached[0] != etag:
+            cached = (etag, encode_list(objs(), fields))
+
+            with _lists_lock:
+                _lists[cache_key] = cached
+                _lists.move_to_end(cache_key)
+                if len(_lists) > MAX_CACHED_LISTS:
+                    _lists.popitem(last=False)
+
+        return cached[1]
+
+    return conditional(etag, body)
+
+
+def paginated() -> bool:
+    """Checks if the request asks for a page of a list"""
+    return "limit" in request.args or "cursor" in request.args
+
+
+def encode_cursor(obj: Base) -> str:
+    """The opaque cursor of the page that starts after an object"""
+    key = [obj.created_at.isoformat(), obj.id]
+
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Returns the key of a cursor, aborts with 400 if it is invalid"""
+    try:
+        created_at, obj_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        abort(400, "Invalid cursor")
+
+    if not isinstance(created_at, str) or not isinstance(obj_id, str):
+        abort(400, "Invalid cursor")
+
+    return created_at, obj_id
+
+
+def page(model: type[Base], **criteria) -> Response:
+    """
+    Answers with the page of the objects of a model matching the
+    criteria that the `limit` and `cursor` of the request ask for
+    """
+    requested_fields(model)
+
+    try:
+        limit = int(request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        abort(400, "limit must be an integer")
+
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    cursor = request.args.get("cursor")
+    after = decode_cursor(cursor) if cursor else None
+
+    # One more object tells if there is a next page
+    objs = model.page(after, limit + 1, **criteria)
+
+    response = json_list(model, objs[:limit])
+    response.headers["X-Total-Count"] = str(model.count(**criteria))
+
+    if len(objs) > limit:
+        next_cursor = encode_cursor(objs[limit - 1])
+        args = request.args.to_dict() | {"cursor": next_cursor}
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = (
+            f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        )
+
+    return response
+
+
+def accepts_ndjson() -> bool:
+    """Checks if the client prefers NDJSON to JSON"""
+    return (
+        request.accept_mimetypes.best_match(["application/json", NDJSON])
+        == NDJSON
+    )
+
+
+def streamed() -> bool:
+    """Checks if the request asks for a streamed list"""
+    return request.args.get("stream") == "1" or accepts_ndjson()
+
+
+def stream(model: type[Base], **criteria) -> Response:
+    """
+    Streams the objects of a model matching the criteria, as NDJSON if
+    the client accepts it, as a JSON array otherwise
+    """
+    ndjson = accepts_ndjson()
+    fields = requested_fields(model)
+
+    def chunks() -> Iterator[str]:
+        """The body, one chunk per page of objects"""
+        if ndjson:
+            for objs in model.walk(STREAM_CHUNK, **criteria):
+                yield "".join(obj.to_json(fields) + "\n" for obj in objs)
+            return
+
+        separator = "["
+        for objs in model.walk(STREAM_CHUNK, **criteria):
+            yield separator + encode_list(objs, fields)[1:-1]
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+
+    return current_app.response_class(
+        chunks(), mimetype=NDJSON if ndjson else "application/json"
+    )
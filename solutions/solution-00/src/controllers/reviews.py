@@ -3,18 +3,38 @@ Reviews controller module
 """
 
 from flask import abort, request
+from src.controllers.batch import batch_response, get_batch
+from src.controllers.responses import (
+    cached_list,
+    entity,
+    if_match,
+    json_list,
+    page,
+    paginated,
+    stream,
+    streamed,
+    updated,
+)
+from src.models.place import Place
 from src.models.review import Review
+from src.models.user import User
 
 
 def get_reviews():
-    """Returns all reviews"""
-    reviews = Review.get_all()
+    """Returns all reviews, a page or a stream of them"""
+    if streamed():
+        return stream(Review)
 
-    return [review.to_dict() for review in reviews], 200
+    if paginated():
+        return page(Review)
+
+    return cached_list("review", Review.get_all)
 
 
 def create_review(place_id: str):
     """Creates a new review"""
+    from src.persistence.repository import DuplicateIdError
+
     data = request.get_json()
 
     if "user_id" not in data:
@@ -24,28 +44,53 @@ def create_review(place_id: str):
         review = Review.create(data | {"place_id": place_id})
     except KeyError as e:
         abort(400, f"Missing field: {e}")
+    except DuplicateIdError as e:
+        abort(409, str(e))
     except ValueError as e:
         abort(400, str(e))
 
     return review.to_dict(), 201
 
 
+def create_reviews_batch(place_id: str):
+    """Creates several reviews for a place at once"""
+    items = [
+        data | {"place_id": place_id} if isinstance(data, dict) else data
+        for data in get_batch()
+    ]
+
+    return batch_response(Review.create_many(items))
+
+
 def get_reviews_from_place(place_id: str):
-    """Returns all reviews from a specific place"""
-    reviews = Review.get_all()
+    """
+    Returns all reviews from a specific place, a page or a stream of
+    them
+    """
+    if streamed():
+        return stream(Review, place_id=place_id)
+
+    if paginated():
+        return page(Review, place_id=place_id)
 
-    return [
-        review.to_dict() for review in reviews if review.place_id == place_id
-    ], 200
+    reviews: list[Review] = Review.find_by(place_id=place_id)
+
+    return json_list(Review, reviews)
 
 
 def get_reviews_from_user(user_id: str):
-    """Returns all reviews from a specific user"""
-    reviews = Review.get_all()
+    """
+    Returns all reviews from a specific user, a page or a stream of them
+    """
+    if streamed():
+        return stream(Review, user_id=user_id)
+
+    if paginated():
+        return page(Review, user_id=user_id)
 
-    return [
-        review.to_dict() for review in reviews if review.user_id == user_id
-    ], 200
+    reviews: list[Review] = Review.find_by(user_id=user_id)
+
+    return json_list(Review, reviews)
 
 
 def get_review_by_id(review_id: str):
@@ -55,7 +100,7 @@ def get_review_by_id(review_id: str):
     if not review:
         abort(404, f"Review with ID {review_id} not found")
 
-    return review.to_dict(), 200
+    return entity(review)
 
 
 def update_review(review_id: str):
@@ -63,14 +108,15 @@ def update_review(review_id: str):
     data = request.get_json()
 
     try:
-        review: Review | None = Review.update(review_id, data)
+        with if_match(Review, review_id):
+            review: Review | None = Review.update(review_id, data)
     except ValueError as e:
         abort(400, str(e))
 
     if not review:
         abort(404, f"Review with ID {review_id} not found")
 
-    return review.to_dict(), 200
+    return updated(review)
 
 
 def delete_review(review_id: str):
@@ -79,3 +125,19 @@ def delete_review(review_id: str):
         abort(404, f"Review with ID {review_id} not found")
 
     return "", 204
+
+
+def get_place_rating(place_id: str):
+    """Returns the rating aggregates of a place"""
+    if not Place.get(place_id):
+        abort(404, f"Place with ID {place_id} not found")
+
+    return Review.ratings()["place"].get(place_id), 200
+
+
+def get_user_rating(user_id: str):
+    """Returns the rating aggregates of the reviews written by a user"""
+    if not User.get(user_id):
+        abort(404, f"User with ID {user_id} not found")
+
+    return Review.ratings()["user"].get(user_id), 200
@@ -0,0 +1,43 @@
+"""
+Search controller module
+"""
+
+from flask import abort, request
+from src.controllers.responses import as_dict, requested_fields
+from src.models.place import Place
+from src.models.review import Review
+
+SEARCHABLE = {"place": Place, "review": Review}
+
+
+def search():
+    """Returns the places or the reviews matching a text query"""
+    args = request.args
+    query = args.get("q", "")
+    kind = args.get("type", "place")
+
+    if not query.strip():
+        abort(400, "Missing parameter: q")
+
+    if kind not in SEARCHABLE:
+        abort(400, "type must be place or review")
+
+    try:
+        limit = int(args.get("limit", 20))
+    except ValueError:
+        abort(400, "limit must be an integer")
+
+    if limit > 100:
+        abort(400, "limit must be at most 100")
+
+    fields = requested_fields(SEARCHABLE[kind])
+
+    try:
+        found = SEARCHABLE[kind].text_search(query, limit)
+    except ValueError as e:
+        abort(400, str(e))
+
+    return [
+        {**as_dict(obj, fields), "score": round(score, 4)}
+        for obj, score in found
+    ], 200
@@ -3,24 +3,52 @@ Users controller module
 """
 
 from flask import abort, request
+from src.controllers.batch import batch_response, get_batch
+from src.controllers.responses import (
+    cached_list,
+    entity,
+    if_match,
+    json_list,
+    page,
+    paginated,
+    stream,
+    streamed,
+    updated,
+)
 from src.models.user import User
 
 
 def get_users():
-    """Returns all users"""
-    users: list[User] = User.get_all()
+    """
+    Returns all users, a page or a stream of them, or the user of the
+    `email` query parameter
+    """
+    if "email" in request.args:
+        user = User.get_by_email(request.args["email"])
 
-    return [user.to_dict() for user in users]
+        return json_list(User, [user] if user else [])
+
+    if streamed():
+        return stream(User)
+
+    if paginated():
+        return page(User)
+
+    return cached_list("user", User.get_all)
 
 
 def create_user():
     """Creates a new user"""
+    from src.persistence.repository import DuplicateIdError
+
     data = request.get_json()
 
     try:
         user = User.create(data)
     except KeyError as e:
         abort(400, f"Missing field: {e}")
+    except DuplicateIdError as e:
+        abort(409, str(e))
     except ValueError as e:
         abort(400, str(e))
 
@@ -30,6 +58,11 @@ def create_user():
     return user.to_dict(), 201
 
 
+def create_users_batch():
+    """Creates several users at once"""
+    return batch_response(User.create_many(get_batch()))
+
+
 def get_user_by_id(user_id: str):
     """Returns a user by ID"""
     user: User | None = User.get(user_id)
@@ -37,7 +70,7 @@ def get_user_by_id(user_id: str):
     if not user:
         abort(404, f"User with ID {user_id} not found")
 
-    return user.to_dict(), 200
+    return entity(user)
 
 
 def update_user(user_id: str):
@@ -45,14 +78,15 @@ def update_user(user_id: str):
     data = request.get_json()
 
     try:
-        user = User.update(user_id, data)
+        with if_match(User, user_id):
+            user = User.update(user_id, data)
     except ValueError as e:
         abort(400, str(e))
 
     if user is None:
         abort(404, f"User with ID {user_id} not found")
 
-    return user.to_dict(), 200
+    return updated(user)
 
 
 def delete_user(user_id: str):
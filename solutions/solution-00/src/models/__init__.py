@@ -1 +1,75 @@
-"""  """
+""" Helpers to rebuild the models from their dictionary representation """
+
+from datetime import datetime
+from functools import cache
+from typing import Any
+
+
+def get_models() -> dict[str, type]:
+    """
+    Returns the model class for every model name stored in the
+    repositories, the countries are a fixed table that is not stored
+    """
+    from src.models.amenity import Amenity, PlaceAmenity
+    from src.models.city import City
+    from src.models.place import Place
+    from src.models.review import Review
+    from src.models.user import User
+
+    return {
+        "amenity": Amenity,
+        "city": City,
+        "place": Place,
+        "placeamenity": PlaceAmenity,
+        "review": Review,
+        "user": User,
+    }
+
+
+@cache
+def referenced_by() -> dict[str, list[tuple[type, str, str]]]:
+    """
+    Returns the `(model, field, rule)` of the references to every
+    model name, the reverse of the `references` of the models
+    """
+    reverse: dict[str, list[tuple[type, str, str]]] = {}
+
+    for model in get_models().values():
+        for field, (target, rule) in getattr(model, "references", {}).items():
+            if rule not in ("cascade", "restrict"):
+                raise ValueError(f"Unknown rule {rule} of {field}")
+            reverse.setdefault(target, []).append((model, field, rule))
+
+    return reverse
+
+
+def from_dict(model: type, item: dict) -> Any:
+    """Builds a model instance from the output of its `to_dict`"""
+    instance = model(**item)
+
+    if "created_at" in item:
+        instance.created_at = datetime.fromisoformat(item["created_at"])
+    if "updated_at" in item:
+        instance.updated_at = datetime.fromisoformat(item["updated_at"])
+
+    return instance
+
+
+def reset_derived() -> None:
+    """
+    Drops the side stores the models derive from the repository data,
+    the repositories call it at the end of `reload`
+    """
+    for model in get_models().values():
+        if hasattr(model, "reset_derived"):
+            model.reset_derived()
+
+
+def save_derived() -> None:
+    """
+    Writes the side stores of the models that are persisted next to
+    the repository data
+    """
+    for model in get_models().values():
+        if hasattr(model, "save_derived"):
+            model.save_derived()
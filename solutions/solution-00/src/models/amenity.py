@@ -2,12 +2,19 @@
 Amenity related functionality
 """
 
+from typing import TYPE_CHECKING
 from src.models.base import Base
+from src.models.derived import DerivedStore, writing
+
+if TYPE_CHECKING:
+    from src.persistence.bitsets import InvertedIndex
 
 
 class Amenity(Base):
     """Amenity representation"""
 
+    __slots__ = ("name",)
+
     name: str
 
     def __init__(self, name: str, **kw) -> None:
@@ -61,9 +68,23 @@ class Amenity(Base):
 class PlaceAmenity(Base):
     """PlaceAmenity representation"""
 
+    __slots__ = ("place_id", "amenity_id")
+
     place_id: str
     amenity_id: str
 
+    indexes = ("place_id", "amenity_id", ("place_id", "amenity_id"))
+
+    references = {
+        "place_id": ("place", "cascade"),
+        "amenity_id": ("amenity", "cascade"),
+    }
+
+    # Bitsets of the places of every amenity, see `inverted_index`
+    _inverted: "DerivedStore[InvertedIndex]" = DerivedStore(
+        ("placeamenity",), lambda: PlaceAmenity._invert()
+    )
+
     def __init__(self, place_id: str, amenity_id: str, **kw) -> None:
         """Dummy init"""
         super().__init__(**kw)
@@ -86,20 +107,44 @@ class PlaceAmenity(Base):
         }
 
     @staticmethod
-    def get(place_id: str, amenity_id: str) -> "PlaceAmenity | None":
-        """Get a PlaceAmenity object by place_id and amenity_id"""
-        from src.persistence import repo
+    def _invert() -> "InvertedIndex":
+        """Builds the inverted index of the stored links"""
+        from src.persistence.bitsets import InvertedIndex
+
+        return InvertedIndex("place_id", "amenity_id", PlaceAmenity.get_all())
+
+    @staticmethod
+    def inverted_index() -> "InvertedIndex":
+        """
+        Returns the inverted index from the amenities to the places,
+        it is built on first use and then kept in sync by `create` and
+        `delete`
+        """
+        return PlaceAmenity._inverted.get()
+
+    @classmethod
+    def reset_derived(cls) -> None:
+        """Drops the inverted index, it is rebuilt on next use"""
+        PlaceAmenity._inverted.reset()
 
-        place_amenities: list[PlaceAmenity] = repo.get_all("placeamenity")
+    @staticmethod
+    def amenity_ids(place_id: str) -> list[str]:
+        """Returns the ids of the amenities of a place"""
+        return PlaceAmenity.inverted_index().terms(place_id)
 
-        for place_amenity in place_amenities:
-            if (
-                place_amenity.place_id == place_id
-                and place_amenity.amenity_id == amenity_id
-            ):
-                return place_amenity
+    @staticmethod
+    def place_ids(amenity_ids: list[str]) -> list[str]:
+        """Returns the ids of the places that have every given amenity"""
+        return PlaceAmenity.inverted_index().owners(*amenity_ids)
 
-        return None
+    @staticmethod
+    def get(place_id: str, amenity_id: str) -> "PlaceAmenity | None":
+        """Get a PlaceAmenity object by place_id and amenity_id"""
+        place_amenities: list[PlaceAmenity] = PlaceAmenity.find_by(
+            place_id=place_id, amenity_id=amenity_id
+        )
+
+        return place_amenities[0] if place_amenities else None
 
     @staticmethod
     def create(data: dict) -> "PlaceAmenity":
@@ -108,7 +153,11 @@ class PlaceAmenity(Base):
 
         new_place_amenity = PlaceAmenity(**data)
 
-        repo.save(new_place_amenity)
+        with writing("placeamenity"):
+            repo.save(new_place_amenity)
+
+            if (inverted := PlaceAmenity._inverted.built()) is not None:
+                inverted.add(new_place_amenity)
 
         return new_place_amenity
 
@@ -122,10 +171,20 @@ class PlaceAmenity(Base):
         if not place_amenity:
             return False
 
-        repo.delete(place_amenity)
+        with writing("placeamenity"):
+            if not repo.delete(place_amenity):
+                return False
+
+            PlaceAmenity.deleted(place_amenity)
 
         return True
 
+    @classmethod
+    def deleted(cls, place_amenity: "PlaceAmenity") -> None:
+        """Drops a deleted link from the inverted index"""
+        if (inverted := PlaceAmenity._inverted.built()) is not None:
+            inverted.remove(place_amenity)
+
     @staticmethod
     def update(entity_id: str, data: dict):
         """Not implemented, isn't needed"""
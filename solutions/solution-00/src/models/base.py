@@ -1,20 +1,73 @@
 """ Abstract base class for all models """
 
 from datetime import datetime
-from typing import Any, Optional
+from functools import cache
+import json
+from operator import attrgetter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+)
 import uuid
 from abc import ABC, abstractmethod
+from src.models.derived import DerivedStore, writing
+
+if TYPE_CHECKING:
+    from src.persistence.fulltext import FullTextIndex
+
+# Set by the models and the repositories, never by the clients
+READ_ONLY_FIELDS = frozenset({"id", "created_at", "updated_at"})
 
 
 class Base(ABC):
     """
     Base Interface for all models
+
+    The models store their fields in `__slots__` instead of a per
+    instance `__dict__`, every subclass declares its own fields in
+    `__slots__` and only those fields can be set
+
+    The JSON encoding of `to_dict` is cached by `to_json` with the
+    values of the fields it was encoded from, the slots starting with
+    an underscore hold that cache and are not fields
     """
 
+    __slots__ = ("id", "created_at", "updated_at", "_json")
+
     id: str
     created_at: datetime
     updated_at: datetime
 
+    # Fields (or tuples of fields for composite indexes) that the
+    # repositories keep a secondary index on, used by `find_by`
+    indexes: tuple = ()
+
+    # Fields holding the id of an object of another model, with what
+    # deleting that object does to the objects of this model:
+    # "cascade" deletes them with it, "restrict" refuses the deletion
+    # while they exist. The fields are indexed, see IndexManager
+    references: dict[str, tuple[str, str]] = {}
+
+    # Fields whose values are unique among the objects of the model,
+    # compared case folded, enforced by the repositories on save and
+    # update with a ValueError
+    unique: tuple = ()
+
+    # Text fields covered by the full-text index, used by `text_search`
+    text_fields: tuple = ()
+    _text: "DerivedStore[FullTextIndex] | None" = None
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        """Gives the models with text fields their full-text index"""
+        super().__init_subclass__(**kwargs)
+
+        if cls.text_fields:
+            cls._text = DerivedStore((cls.__name__.lower(),), cls._index_text)
+
     def __init__(
         self,
         id: Optional[str] = None,
@@ -24,19 +77,166 @@ class Base(ABC):
     ) -> None:
         """
         Base class constructor
-        If kwargs are provided, set them as attributes
+        If kwargs are provided, set them as fields,
+        unknown fields raise a ValueError
         """
 
         if kwargs:
-            for key, value in kwargs.items():
-                if hasattr(self, key):
-                    continue
-                setattr(self, key, value)
+            self.set_fields(kwargs)
 
         self.id = str(id or uuid.uuid4())
         self.created_at = created_at or datetime.now()
         self.updated_at = updated_at or datetime.now()
 
+    @classmethod
+    @cache
+    def fields(cls) -> frozenset[str]:
+        """Returns the names of every field of the class"""
+        return frozenset(
+            field
+            for klass in cls.__mro__
+            for field in klass.__dict__.get("__slots__", ())
+            if not field.startswith("_")
+        )
+
+    @classmethod
+    @cache
+    def _snapshot(cls) -> Callable[[Any], tuple]:
+        """Reads the values of every field of an object in one call"""
+        return attrgetter(*sorted(cls.fields()))
+
+    def _encode(self) -> str:
+        """Returns the JSON encoding of `to_dict`"""
+        return json.dumps(
+            self.to_dict(), sort_keys=True, separators=(",", ":")
+        )
+
+    @classmethod
+    def check_fields(cls, fields: Iterable[str]) -> None:
+        """Raises a ValueError if any of the fields is not a field"""
+        unknown = set(fields) - cls.fields()
+
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    def project(self, fields: Iterable[str]) -> dict:
+        """
+        Returns the entries of `to_dict` of the given fields only, the
+        other fields are not read nor converted
+
+        The `to_dict` of the models holds every field with the
+        datetimes in ISO format, a model whose `to_dict` differs must
+        override this method too
+        """
+        projected = {}
+
+        for field in fields:
+            value = getattr(self, field)
+            projected[field] = (
+                value.isoformat() if isinstance(value, datetime) else value
+            )
+
+        return projected
+
+    def to_json(self, fields: Iterable[str] | None = None) -> str:
+        """
+        Returns the JSON encoding of `to_dict`, it is reused while the
+        fields of the object keep the values it was encoded from, so
+        the list endpoints don't rebuild the same dicts on every request
+
+        With `fields` only the projection of these fields is encoded,
+        it is not cached
+        """
+        if fields is not None:
+            return json.dumps(
+                self.project(fields), sort_keys=True, separators=(",", ":")
+            )
+
+        try:
+            values = self._snapshot()(self)
+        except AttributeError:
+            # Some fields are not set, nothing to compare with
+            return self._encode()
+
+        cached = getattr(self, "_json", None)
+
+        if cached is None or cached[0] != values:
+            cached = self._json = (values, self._encode())
+
+        return cached[1]
+
+    def cache_json(self, encoded: str) -> None:
+        """
+        Caches an encoding of `to_dict` read from the storage, like the
+        JSON column of the database, for the current values
+        """
+        try:
+            self._json = (self._snapshot()(self), encoded)
+        except AttributeError:
+            pass
+
+    def set_fields(self, data: dict) -> None:
+        """
+        Sets the given fields of the object
+
+        Raises a ValueError if any of them is not a field of the class
+        or is one of the fields only the repository sets
+        """
+        unknown = data.keys() - self.fields()
+
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        read_only = data.keys() & READ_ONLY_FIELDS
+
+        if read_only:
+            raise ValueError(
+                f"Read-only fields: {', '.join(sorted(read_only))}"
+            )
+
+        for key, value in data.items():
+            setattr(self, key, value)
+
+    def check_references(self, data: dict) -> None:
+        """
+        Raises a ValueError if one of the `references` fields the data
+        changes holds the id of no stored object, an update can not
+        leave an object its deletion rules would not find
+        """
+        from src.models import get_models
+        from src.models.country import Country
+
+        models = {**get_models(), "country": Country}
+
+        for field, (target, _) in self.references.items():
+            if field not in data or data[field] == getattr(self, field):
+                continue
+
+            model = models[target]
+            value = data[field]
+
+            if not isinstance(value, str) or not model.get(value):
+                raise ValueError(f"{model.__name__} with ID {value} not found")
+
+    def __getstate__(self) -> dict:
+        """Returns the fields that are set, used by pickle"""
+        return {
+            field: getattr(self, field)
+            for field in self.fields()
+            if hasattr(self, field)
+        }
+
+    def __setstate__(self, state) -> None:
+        """
+        Restores the fields from pickle, the objects pickled before
+        the models used `__slots__` have their state in a dict
+        """
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        for field in self.fields() & state.keys():
+            setattr(self, field, state[field])
+
     @classmethod
     def get(cls, id) -> "Any | None":
         """
@@ -62,12 +262,68 @@ class Base(ABC):
 
         return repo.get_all(cls.__name__.lower())
 
+    @classmethod
+    def find_by(cls, **criteria) -> list["Any"]:
+        """
+        This is a common method to get all objects of a class
+        whose fields are equal to the given criteria
+
+        The lookup is served by the secondary indexes declared
+        in `indexes` when they cover the criteria
+        """
+        from src.persistence import repo
+
+        return repo.find_by(cls.__name__.lower(), **criteria)
+
+    @classmethod
+    def page(
+        cls,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list["Any"]:
+        """
+        This is a common method to get the objects of a class page by
+        page, ordered by `(created_at, id)`
+
+        A page starts after the key `after` of the last object of the
+        previous page, `(created_at.isoformat(), id)`
+        """
+        from src.persistence import repo
+
+        return repo.page(cls.__name__.lower(), after, limit, **criteria)
+
+    @classmethod
+    def walk(cls, chunk: int, **criteria) -> Iterator[list["Any"]]:
+        """
+        This is a common method to walk the objects of a class whose
+        fields are equal to the given criteria, in lists of at most
+        `chunk` objects ordered by `(created_at, id)`
+        """
+        from src.persistence import repo
+
+        return repo.walk(cls.__name__.lower(), chunk, **criteria)
+
+    @classmethod
+    def count(cls, **criteria) -> int:
+        """
+        This is a common method to count the objects of a class whose
+        fields are equal to the given criteria
+        """
+        from src.persistence import repo
+
+        return repo.count(cls.__name__.lower(), **criteria)
+
     @classmethod
     def delete(cls, id) -> bool:
         """
         This is a common method to delete an specific
         object of a class by its id
 
+        The objects that reference it with a "cascade" rule are
+        deleted with it in a single repository write, and a ValueError
+        is raised if any object references it with a "restrict" rule
+
         If a class needs a different implementation,
         it should override this method
         """
@@ -78,7 +334,144 @@ class Base(ABC):
         if not obj:
             return False
 
-        return repo.delete(obj)
+        doomed = Base.cascade(obj)
+
+        with writing(*{type(d).__name__.lower() for d in doomed}):
+            if not repo.delete_many(doomed):
+                return False
+
+            for deleted in doomed:
+                type(deleted).deleted(deleted)
+
+        return True
+
+    @staticmethod
+    def cascade(obj: "Base") -> list["Base"]:
+        """
+        Returns the object and every object its deletion cascades to,
+        found through the indexes of the referencing fields, so the
+        cost is the number of dependents and not the size of the tables
+
+        Raises a ValueError if an object that is not deleted with them
+        references one of them with a "restrict" rule
+        """
+        from src.models import referenced_by
+
+        def key(obj: Base) -> tuple[str, str]:
+            """Identifies an object across the models"""
+            return type(obj).__name__, obj.id
+
+        doomed = {key(obj): obj}
+        pending = [obj]
+        restricted: list[tuple[Base, Base]] = []
+
+        while pending:
+            current = pending.pop()
+            name = type(current).__name__.lower()
+
+            for model, field, rule in referenced_by().get(name, ()):
+                for dependent in model.find_by(**{field: current.id}):
+                    if rule == "restrict":
+                        restricted.append((current, dependent))
+                    elif key(dependent) not in doomed:
+                        doomed[key(dependent)] = dependent
+                        pending.append(dependent)
+
+        for target, dependent in restricted:
+            if key(dependent) not in doomed:
+                raise ValueError(
+                    f"{type(target).__name__} {target.id} is referenced "
+                    f"by {type(dependent).__name__} {dependent.id}"
+                )
+
+        return list(doomed.values())
+
+    @classmethod
+    def deleted(cls, obj: "Base") -> None:
+        """
+        Called after an object of the class was deleted, directly or
+        by a cascade, the models with side stores override it to drop
+        the object from them
+        """
+
+    @classmethod
+    def existing_ids(cls, ids: Iterable) -> set[str]:
+        """
+        Returns which of the given ids belong to a stored object of
+        the class, every distinct id is looked up only once
+
+        Used by the batch creations to check the references of all
+        the items at once
+        """
+        return {
+            obj_id
+            for obj_id in {i for i in ids if isinstance(i, str)}
+            if cls.get(obj_id)
+        }
+
+    @classmethod
+    def _index_text(cls) -> "FullTextIndex":
+        """
+        Builds the full-text index of the `text_fields` from the
+        repository, reusing the documents saved next to the data
+        """
+        from src.persistence import repo
+        from src.persistence.fulltext import FullTextIndex
+
+        return FullTextIndex(
+            cls.text_fields,
+            cls.get_all(),
+            repo.derived_filename(f"{cls.__name__.lower()}.search"),
+        )
+
+    @classmethod
+    def text_index(cls) -> "FullTextIndex":
+        """
+        Returns the full-text index of the `text_fields`, it is built
+        on first use and then kept in sync by the model
+        """
+        if cls._text is None:
+            raise ValueError(f"{cls.__name__} has no text fields")
+
+        return cls._text.get()
+
+    @classmethod
+    def text_search(
+        cls, query: str, limit: int | None = None
+    ) -> list[tuple[Any, float]]:
+        """
+        Get the objects whose text fields contain a word of the query,
+        best match first, with their BM25 score
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be positive")
+
+        return [
+            (obj, score)
+            for score, obj_id in cls.text_index().search(query, limit)
+            if (obj := cls.get(obj_id))
+        ]
+
+    @classmethod
+    def save_derived(cls) -> None:
+        """
+        Writes the side stores that are persisted next to the
+        repository data, called when the process exits
+        """
+        index = cls._text.built() if cls._text is not None else None
+
+        if index is not None:
+            index.save()
+
+    @classmethod
+    def reset_derived(cls) -> None:
+        """
+        Drops the side stores derived from the repository data, like
+        search indexes, so they are rebuilt on their next use
+
+        Called after a repository reload, the models with side stores
+        override it
+        """
 
     @abstractmethod
     def to_dict(self) -> dict:
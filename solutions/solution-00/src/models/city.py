@@ -9,9 +9,15 @@ from src.models.country import Country
 class City(Base):
     """City representation"""
 
+    __slots__ = ("name", "country_code")
+
     name: str
     country_code: str
 
+    indexes = ("country_code",)
+
+    references = {"country_code": ("country", "restrict")}
+
     def __init__(self, name: str, country_code: str, **kw) -> None:
         """Dummy init"""
         super().__init__(**kw)
@@ -59,8 +65,8 @@ class City(Base):
         if not city:
             raise ValueError("City not found")
 
-        for key, value in data.items():
-            setattr(city, key, value)
+        city.check_references(data)
+        city.set_fields(data)
 
         repo.update(city)
 
@@ -1,7 +1,13 @@
 """
 Country related functionality
+
+The countries are the ISO 3166-1 table of `utils.iso3166`, built once
+at import into the read-only `COUNTRIES` mapping of code to Country
 """
 
+from types import MappingProxyType
+from utils.iso3166 import COUNTRIES as ISO_3166
+
 
 class Country:
     """
@@ -9,23 +15,40 @@ class Country:
 
     This class does NOT inherit from Base, you can't delete or update a country
 
-    This class is used to get and list countries
+    This class is used to get and list countries, the instances are
+    immutable
     """
 
+    __slots__ = ("name", "code")
+
     name: str
     code: str
-    cities: list
 
     def __init__(self, name: str, code: str, **kw) -> None:
         """Dummy init"""
         super().__init__(**kw)
-        self.name = name
-        self.code = code
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "code", code)
+
+    def __setattr__(self, name: str, value) -> None:
+        """Countries can't be modified"""
+        raise AttributeError("Countries are immutable")
 
     def __repr__(self) -> str:
         """Dummy repr"""
         return f"<Country {self.code} ({self.name})>"
 
+    def __setstate__(self, state) -> None:
+        """
+        Restores the fields from pickle, the pickle files written when
+        the repositories stored the countries still hold them
+        """
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        object.__setattr__(self, "name", state["name"])
+        object.__setattr__(self, "code", state["code"])
+
     def to_dict(self) -> dict:
         """Returns the dictionary representation of the country"""
         return {
@@ -35,28 +58,20 @@ class Country:
 
     @staticmethod
     def get_all() -> list["Country"]:
-        """Get all countries"""
-        from src.persistence import repo
-
-        countries: list["Country"] = repo.get_all("country")
-
-        return countries
+        """Get all countries, ordered by code"""
+        return list(COUNTRIES.values())
 
     @staticmethod
     def get(code: str) -> "Country | None":
         """Get a country by its code"""
-        for country in Country.get_all():
-            if country.code == code:
-                return country
-        return None
-
-    @staticmethod
-    def create(name: str, code: str) -> "Country":
-        """Create a new country"""
-        from src.persistence import repo
-
-        country = Country(name, code)
+        return COUNTRIES.get(code)
 
-        repo.save(country)
 
-        return country
+COUNTRIES: "MappingProxyType[str, Country]" = MappingProxyType(
+    {
+        code: Country(name, code)
+        for code, name in (
+            line.split(" ", 1) for line in ISO_3166.splitlines()
+        )
+    }
+)
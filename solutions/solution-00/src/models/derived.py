@@ -0,0 +1,138 @@
+"""
+This module exports the holder of the side stores the models derive
+from the objects of the repository, like the sorted indexes of the
+places or the rating aggregates of the reviews
+
+A store is built from the repository on first use and is tied to the
+generations its models had when the build started, like the lists of
+`cached_list` it is built again once one of them moved. The writes of
+the process run in `writing`, which lets the stores that were up to
+date follow the generations the write moved once the model applied it
+to them, so a store is only built again after the writes of another
+process (another worker sharing the database) or a reload.
+
+The builds and the writes hold one lock shared by every store, so a
+store is published only once complete and a write of the process can
+not land between the objects a build read and its publication, where
+it would be lost or counted twice.
+"""
+
+from contextlib import contextmanager
+import threading
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_lock = threading.RLock()
+_stores: list["DerivedStore"] = []
+
+# The generations the models had before the write the thread runs
+_writing = threading.local()
+
+
+def _generations(models: Iterable[str]) -> dict[str, int]:
+    """Returns the current generation of every model"""
+    from src.persistence import repo
+
+    return {model: repo.generation(model) for model in models}
+
+
+class DerivedStore(Generic[T]):
+    """A side store derived from the objects of some models"""
+
+    def __init__(self, models: tuple[str, ...], build: Callable[[], T]):
+        """The store is built by `build` on first use"""
+        self.models = models
+        self.__build = build
+        self.__built: tuple[tuple, T] | None = None
+        _stores.append(self)
+
+    def _key(self, generations: dict) -> tuple:
+        """The generations of the models of the store"""
+        return tuple(generations.get(model) for model in self.models)
+
+    def get(self) -> T:
+        """
+        Returns the store, built again if one of its models moved since
+        it was built
+
+        In a write of the thread the store that was up to date before
+        it is returned as is, the write is being applied to it
+        """
+        built = self.__built
+        before = getattr(_writing, "before", None)
+
+        if built is not None:
+            if before is not None and built[0] == self._key(before):
+                return built[1]
+            if built[0] == self._key(_generations(self.models)):
+                return built[1]
+
+        with _lock:
+            # Read before the objects, a write of another process racing
+            # with the build leaves a newer store under older generations
+            generations = self._key(_generations(self.models))
+            built = self.__built
+
+            if built is None or built[0] != generations:
+                built = self.__built = (generations, self.__build())
+
+            return built[1]
+
+    def built(self) -> T | None:
+        """
+        Returns the store built so far, even if it is out of date,
+        None if it was never built, the writes apply themselves to it
+        """
+        built = self.__built
+
+        return None if built is None else built[1]
+
+    def reset(self) -> None:
+        """Drops the store, it is built again on its next use"""
+        with _lock:
+            self.__built = None
+
+    def _follow(self, before: dict, after: dict) -> None:
+        """Moves the store to the generations of a write applied to it"""
+        built = self.__built
+
+        if built is not None and built[0] == self._key(before):
+            self.__built = (self._key(after), built[1])
+
+
+@contextmanager
+def writing(*models: str) -> Iterator[None]:
+    """
+    Runs a write of the process to the given models, and the updates
+    of their stores, under the lock of the stores
+
+    The stores that were up to date before the write follow the
+    generations it moved, unless the repository tells that another
+    process wrote the models meanwhile, they are then built again
+    """
+    from src.persistence import repo
+
+    with _lock:
+        if getattr(_writing, "before", None) is not None:
+            # Nested in another write, the outer one moves the stores
+            yield
+            return
+
+        stores = [store for store in _stores if set(store.models) & {*models}]
+        before = _generations({m for store in stores for m in store.models})
+        _writing.before = before
+
+        try:
+            yield
+        finally:
+            _writing.before = None
+
+        after = _generations(before)
+
+        if all(
+            repo.follows(model, before[model], after[model], model in models)
+            for model in before
+        ):
+            for store in stores:
+                store._follow(before, after)
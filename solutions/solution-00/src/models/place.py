@@ -2,14 +2,44 @@
 Place related functionality
 """
 
+from itertools import islice
+from math import isfinite
+from typing import TYPE_CHECKING
+from src.models.amenity import PlaceAmenity
 from src.models.base import Base
 from src.models.city import City
+from src.models.derived import DerivedStore, writing
 from src.models.user import User
 
+if TYPE_CHECKING:
+    from src.persistence.columns import ColumnStore
+    from src.persistence.leaderboard import Leaderboard
+    from src.persistence.sorted_index import SortedIndex
+    from src.persistence.spatial import GeoGrid
+
+# Past 1 / COLUMN_SCAN of the places in the range of the sorted index,
+# scanning the columnar store costs less than checking the places of
+# the range one by one, see bench_place_columns
+COLUMN_SCAN = 64
+
 
 class Place(Base):
     """Place representation"""
 
+    __slots__ = (
+        "name",
+        "description",
+        "address",
+        "latitude",
+        "longitude",
+        "host_id",
+        "city_id",
+        "price_per_night",
+        "number_of_rooms",
+        "number_of_bathrooms",
+        "max_guests",
+    )
+
     name: str
     description: str
     address: str
@@ -22,6 +52,62 @@ class Place(Base):
     number_of_bathrooms: int
     max_guests: int
 
+    indexes = ("host_id", "city_id")
+
+    references = {
+        "host_id": ("user", "cascade"),
+        "city_id": ("city", "restrict"),
+    }
+
+    text_fields = ("name", "description", "address")
+
+    # Numeric fields with their type, the updates are converted to it
+    numeric = {
+        "latitude": float,
+        "longitude": float,
+        "price_per_night": int,
+        "number_of_rooms": int,
+        "number_of_bathrooms": int,
+        "max_guests": int,
+    }
+
+    # Columnar store of the numeric fields, used by the range filters
+    # of `search` and by `filter`
+    _columns: "DerivedStore[ColumnStore]" = DerivedStore(
+        ("place",), lambda: Place._index_columns()
+    )
+
+    # Fields with a sorted index, used by the range filters and the
+    # sorting of `search`
+    sorted_indexes = (
+        "price_per_night",
+        "max_guests",
+        "number_of_rooms",
+        "number_of_bathrooms",
+    )
+    _sorted: "dict[str, DerivedStore[SortedIndex]]" = {
+        field: DerivedStore(
+            ("place",), lambda field=field: Place._index_sorted(field)
+        )
+        for field in sorted_indexes
+    }
+
+    # Spatial index over latitude and longitude, used by `nearby`
+    _spatial: "DerivedStore[GeoGrid]" = DerivedStore(
+        ("place",), lambda: Place._index_spatial()
+    )
+
+    # Leaderboards of `top` by "price" and by "rating", grouped by city,
+    # the ratings come from the reviews
+    _leaderboards: "dict[str, DerivedStore[Leaderboard]]" = {
+        "price": DerivedStore(
+            ("place",), lambda: Place._rank(Place._price_score)
+        ),
+        "rating": DerivedStore(
+            ("place", "review"), lambda: Place._rank(Place._rating_score)
+        ),
+    }
+
     def __init__(self, data: dict | None = None, **kw) -> None:
         """Dummy init"""
         super().__init__(**kw)
@@ -64,6 +150,184 @@ class Place(Base):
             "updated_at": self.updated_at.isoformat(),
         }
 
+    @staticmethod
+    def _index_columns() -> "ColumnStore":
+        """Builds the columnar store of the numeric fields"""
+        from src.persistence.columns import ColumnStore
+
+        store = ColumnStore(
+            {
+                field: "d" if kind is float else "q"
+                for field, kind in Place.numeric.items()
+            }
+        )
+        for place in Place.get_all():
+            store.add(place)
+
+        return store
+
+    @staticmethod
+    def columns() -> "ColumnStore":
+        """
+        Returns the columnar store of the numeric fields, it is built
+        on first use and then kept in sync by `create`, `update` and
+        `delete`
+        """
+        return Place._columns.get()
+
+    @staticmethod
+    def _index_sorted(field: str) -> "SortedIndex":
+        """Builds the sorted index of a field from the repository"""
+        from src.persistence.sorted_index import SortedIndex
+
+        return SortedIndex(field, Place.get_all())
+
+    @staticmethod
+    def sorted_index(field: str) -> "SortedIndex":
+        """
+        Returns the sorted index of a field, it is built on first use
+        and then kept in sync by `create`, `update` and `delete`
+        """
+        if field not in Place.sorted_indexes:
+            raise ValueError(f"Field {field} has no sorted index")
+
+        return Place._sorted[field].get()
+
+    @staticmethod
+    def _index_spatial() -> "GeoGrid":
+        """Builds the spatial index of the coordinates"""
+        from src.persistence.spatial import GeoGrid
+
+        return GeoGrid(objs=Place.get_all())
+
+    @staticmethod
+    def spatial_index() -> "GeoGrid":
+        """
+        Returns the spatial index of the coordinates, it is built on
+        first use and then kept in sync by `create`, `update` and
+        `delete`
+        """
+        return Place._spatial.get()
+
+    @staticmethod
+    def _stores() -> list[DerivedStore]:
+        """Returns the holders of every side store of the places"""
+        return [
+            Place._columns,
+            *Place._sorted.values(),
+            Place._spatial,
+            Place._text,
+            *Place._leaderboards.values(),
+        ]
+
+    @classmethod
+    def reset_derived(cls) -> None:
+        """Drops the side stores, they are rebuilt on next use"""
+        for store in Place._stores():
+            store.reset()
+
+    @staticmethod
+    def _derived() -> list:
+        """Returns the side stores built so far"""
+        return [
+            built
+            for store in Place._stores()
+            if (built := store.built()) is not None
+        ]
+
+    @staticmethod
+    def _price_score(place: "Place") -> int:
+        """Cheapest first"""
+        return place.price_per_night
+
+    @staticmethod
+    def _rating_score(place: "Place") -> tuple | None:
+        """Best mean rating first, then the most reviewed"""
+        from src.models.review import Review
+
+        rating = Review.ratings()["place"].get(place.id)
+
+        if not rating["count"]:
+            return None
+
+        return (-rating["mean"], -rating["count"])
+
+    @staticmethod
+    def _rank(score) -> "Leaderboard":
+        """Builds a leaderboard of the places by a score, per city"""
+        from src.persistence.leaderboard import Leaderboard
+
+        return Leaderboard(score, "city_id", Place.get_all())
+
+    @staticmethod
+    def leaderboard(by: str) -> "Leaderboard":
+        """
+        Returns the leaderboard of the places by "price" or "rating",
+        it is built on first use and then kept in sync by `create`,
+        `update`, `delete` and the review changes
+        """
+        if by not in Place._leaderboards:
+            raise ValueError("by must be price or rating")
+
+        return Place._leaderboards[by].get()
+
+    @staticmethod
+    def rating_changed(place_id: str) -> None:
+        """Moves a place in the rating leaderboard after its reviews changed"""
+        board = Place._leaderboards["rating"].built()
+
+        if board is None:
+            return
+
+        place: Place | None = Place.get(place_id)
+
+        if place:
+            board.update(place)
+
+    @staticmethod
+    def top(
+        by: str,
+        city_id: str | None = None,
+        k: int = 10,
+        min_guests: int | None = None,
+    ) -> list["Place"]:
+        """
+        Get the `k` best rated or cheapest places, of a city if given,
+        the places without reviews are not rated
+        """
+        if k < 0:
+            raise ValueError("k must be positive")
+
+        places = (
+            place
+            for place in map(Place.get, Place.leaderboard(by).ranked(city_id))
+            if place
+            and (min_guests is None or place.max_guests >= min_guests)
+        )
+
+        return list(islice(places, k))
+
+    @staticmethod
+    def with_amenities(amenity_ids: list[str]) -> list["Place"]:
+        """Get all places that have every given amenity"""
+        return [
+            place
+            for place in map(Place.get, PlaceAmenity.place_ids(amenity_ids))
+            if place
+        ]
+
+    @staticmethod
+    def filter(**conditions) -> list["Place"]:
+        """
+        Get all places whose numeric fields match the conditions,
+        see `ColumnStore.filter`
+        """
+        return [
+            place
+            for place in map(Place.get, Place.columns().filter(**conditions))
+            if place
+        ]
+
     @staticmethod
     def create(data: dict) -> "Place":
         """Create a new place"""
@@ -81,10 +345,56 @@ class Place(Base):
 
         new_place = Place(data=data)
 
-        repo.save(new_place)
+        with writing("place"):
+            repo.save(new_place)
+
+            for store in Place._derived():
+                store.add(new_place)
 
         return new_place
 
+    @staticmethod
+    def create_many(items: list) -> list["Place | Exception"]:
+        """
+        Create several places with a single repository write
+
+        Returns the created place or the error of every item,
+        in the same order
+        """
+        from src.persistence import repo
+
+        objects = [data for data in items if isinstance(data, dict)]
+        hosts = User.existing_ids(data.get("host_id") for data in objects)
+        cities = City.existing_ids(data.get("city_id") for data in objects)
+        results: list[Place | Exception] = []
+
+        for data in items:
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError("Expected an object")
+                if data["host_id"] not in hosts:
+                    raise ValueError(
+                        f"User with ID {data['host_id']} not found"
+                    )
+                if data["city_id"] not in cities:
+                    raise ValueError(
+                        f"City with ID {data['city_id']} not found"
+                    )
+                results.append(Place(data=data))
+            except (KeyError, TypeError, ValueError) as e:
+                results.append(e)
+
+        places = [r for r in results if isinstance(r, Place)]
+
+        with writing("place"):
+            repo.save_many(places)
+
+            for store in Place._derived():
+                for place in places:
+                    store.add(place)
+
+        return results
+
     @staticmethod
     def update(place_id: str, data: dict) -> "Place | None":
         """Update an existing place"""
@@ -95,9 +405,177 @@ class Place(Base):
         if not place:
             return None
 
-        for key, value in data.items():
-            setattr(place, key, value)
+        data = dict(data)
+        for field, kind in Place.numeric.items():
+            if field not in data:
+                continue
+            try:
+                data[field] = kind(data[field])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {field}: {data[field]!r}")
+
+        place.check_references(data)
+        place.set_fields(data)
+
+        with writing("place"):
+            repo.update(place)
 
-        repo.update(place)
+            for store in Place._derived():
+                store.update(place)
 
         return place
+
+    @classmethod
+    def deleted(cls, place: "Place") -> None:
+        """Drops a deleted place from the side stores"""
+        for store in Place._derived():
+            store.remove(place.id)
+
+    @staticmethod
+    def search(
+        city_id: str | None = None,
+        host_id: str | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        min_guests: int | None = None,
+        min_rooms: int | None = None,
+        min_bathrooms: int | None = None,
+        sort: str | None = None,
+        limit: int | None = None,
+    ) -> list["Place"]:
+        """
+        Get the places matching every given filter
+
+        `sort` is one of the `sorted_indexes` fields, prefixed with `-`
+        for a descending order, the ties are ordered by id
+
+        The candidates come from the most selective index: the hashed
+        `city_id`/`host_id` indexes of the repository or the sorted
+        index whose range holds the fewest places. When the candidates
+        already come in the sort order the scan stops at `limit`. When
+        even the fewest places are many, every range is applied at once
+        by a scan of the columnar store.
+        """
+        equal = {
+            field: value
+            for field, value in (("city_id", city_id), ("host_id", host_id))
+            if value is not None
+        }
+        ranges = {
+            field: bounds
+            for field, bounds in (
+                ("price_per_night", (min_price, max_price)),
+                ("max_guests", (min_guests, None)),
+                ("number_of_rooms", (min_rooms, None)),
+                ("number_of_bathrooms", (min_bathrooms, None)),
+            )
+            if bounds != (None, None)
+        }
+
+        descending = bool(sort) and sort.startswith("-")
+        sort_field = sort.removeprefix("-") if sort else None
+
+        if sort_field is not None and sort_field not in Place.sorted_indexes:
+            raise ValueError(f"Can't sort by {sort_field}")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be positive")
+
+        driver = None
+        scan = False
+        if not equal:
+            counts = {
+                field: Place.sorted_index(field).count(*bounds)
+                for field, bounds in ranges.items()
+            }
+            if counts:
+                driver = min(counts, key=counts.__getitem__)
+            if sort_field is not None and driver is None:
+                driver = sort_field
+            elif sort_field is not None and limit is not None:
+                # Walking the sort index in order stops once `limit`
+                # places matched, after about limit * total / smallest
+                # places, fetching the driver range reads smallest
+                total = len(Place.sorted_index(sort_field))
+                smallest = counts[driver]
+                if limit * total < smallest * smallest:
+                    driver = sort_field
+            if ranges and driver != sort_field:
+                total = len(Place.sorted_index(driver))
+                scan = counts[driver] * COLUMN_SCAN > total
+
+        def in_ranges(place: "Place") -> bool:
+            """Checks the range filters the driver didn't apply"""
+            for field, (low, high) in ranges.items():
+                value = getattr(place, field)
+                if low is not None and value < low:
+                    return False
+                if high is not None and value > high:
+                    return False
+            return True
+
+        if equal:
+            candidates = iter(Place.find_by(**equal))
+        elif scan:
+            ids = Place.columns().filter(**ranges)
+            candidates = (p for p in map(Place.get, ids) if p is not None)
+        elif driver is not None:
+            index = Place.sorted_index(driver)
+            ids = index.range(
+                *ranges.get(driver, (None, None)),
+                reverse=descending and driver == sort_field,
+            )
+            candidates = (p for p in map(Place.get, ids) if p is not None)
+        else:
+            candidates = iter(Place.get_all())
+
+        # The scan already applied every range
+        found = candidates if scan else filter(in_ranges, candidates)
+
+        if sort_field is None or driver == sort_field:
+            return list(islice(found, limit))
+
+        return sorted(
+            found,
+            key=lambda place: (getattr(place, sort_field), place.id),
+            reverse=descending,
+        )[:limit]
+
+    @staticmethod
+    def nearby(
+        lat: float,
+        lon: float,
+        radius_km: float | None = None,
+        limit: int | None = None,
+    ) -> list[tuple["Place", float]]:
+        """
+        Get the places around a point with their great-circle distance
+        in km, nearest first
+
+        With `radius_km` every place in the radius is returned (at most
+        `limit`), without it the `limit` nearest places
+        """
+        if not all(
+            isfinite(value) for value in (lat, lon, radius_km or 0)
+        ):
+            raise ValueError("lat, lon and radius_km must be finite")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat must be in [-90, 90], lon in [-180, 180]")
+        if radius_km is not None and radius_km < 0:
+            raise ValueError("radius_km must be positive")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be positive")
+
+        index = Place.spatial_index()
+
+        if radius_km is None:
+            found = index.nearest(lat, lon, 10 if limit is None else limit)
+        else:
+            found = index.within(lat, lon, radius_km)[:limit]
+
+        return [
+            (place, distance)
+            for distance, place in (
+                (distance, Place.get(obj_id)) for distance, obj_id in found
+            )
+            if place is not None
+        ]
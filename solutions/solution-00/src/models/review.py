@@ -2,19 +2,41 @@
 Review related functionality
 """
 
+from numbers import Real
+from typing import TYPE_CHECKING
 from src.models.base import Base
+from src.models.derived import DerivedStore, writing
 from src.models.place import Place
 from src.models.user import User
 
+if TYPE_CHECKING:
+    from src.persistence.aggregates import RatingAggregates
+
 
 class Review(Base):
     """Review representation"""
 
+    __slots__ = ("place_id", "user_id", "comment", "rating")
+
     place_id: str
     user_id: str
     comment: str
     rating: float
 
+    indexes = ("place_id", "user_id")
+
+    references = {
+        "place_id": ("place", "cascade"),
+        "user_id": ("user", "cascade"),
+    }
+
+    text_fields = ("comment",)
+
+    # Rating aggregates of every place and of every user, see `ratings`
+    _ratings: "DerivedStore[dict[str, RatingAggregates]]" = DerivedStore(
+        ("review",), lambda: Review._aggregate_all()
+    )
+
     def __init__(
         self, place_id: str, user_id: str, comment: str, rating: float, **kw
     ) -> None:
@@ -42,6 +64,84 @@ class Review(Base):
             "updated_at": self.updated_at.isoformat(),
         }
 
+    @staticmethod
+    def check_rating(rating) -> None:
+        """Raises a ValueError if a rating is not a number from 1 to 5"""
+        if (
+            isinstance(rating, bool)
+            or not isinstance(rating, Real)
+            or not 1 <= rating <= 5
+        ):
+            raise ValueError("rating must be a number between 1 and 5")
+
+    @staticmethod
+    def _aggregate_all() -> "dict[str, RatingAggregates]":
+        """Builds the rating aggregates of every stored review"""
+        from src.persistence.aggregates import RatingAggregates
+
+        ratings = {"place": RatingAggregates(), "user": RatingAggregates()}
+
+        for review in Review.get_all():
+            Review._count(
+                ratings, review.place_id, review.user_id, review.rating
+            )
+
+        return ratings
+
+    @staticmethod
+    def ratings() -> "dict[str, RatingAggregates]":
+        """
+        Returns the rating aggregates by "place" and by "user", they
+        are built on first use and then kept in sync by `create`,
+        `update` and `delete` in O(1)
+        """
+        return Review._ratings.get()
+
+    @staticmethod
+    def _count(
+        ratings: "dict[str, RatingAggregates]",
+        place_id: str,
+        user_id: str,
+        rating,
+        add: bool = True,
+    ) -> None:
+        """Adds a rating to the aggregates, or removes it"""
+        try:
+            Review.check_rating(rating)
+        except ValueError:
+            # Stored before the ratings were checked
+            return
+
+        for aggregates, group in (
+            (ratings["place"], place_id),
+            (ratings["user"], user_id),
+        ):
+            if add:
+                aggregates.add(group, rating)
+            else:
+                aggregates.remove(group, rating)
+
+    @staticmethod
+    def _aggregate(
+        place_id: str, user_id: str, rating, add: bool = True
+    ) -> None:
+        """
+        Adds a rating to the aggregates built so far, or removes it,
+        and moves its place in the rating leaderboard
+        """
+        ratings = Review._ratings.built()
+
+        if ratings is not None:
+            Review._count(ratings, place_id, user_id, rating, add)
+
+        Place.rating_changed(place_id)
+
+    @classmethod
+    def reset_derived(cls) -> None:
+        """Drops the side stores, they are rebuilt on next use"""
+        Review._ratings.reset()
+        Review._text.reset()
+
     @staticmethod
     def create(data: dict) -> "Review":
         """Create a new review"""
@@ -57,12 +157,86 @@ class Review(Base):
         if not place:
             raise ValueError(f"Place with ID {data['place_id']} not found")
 
+        if "rating" in data:
+            Review.check_rating(data["rating"])
+
         new_review = Review(**data)
 
-        repo.save(new_review)
+        with writing("review"):
+            repo.save(new_review)
+
+            Review._aggregate(
+                new_review.place_id, new_review.user_id, new_review.rating
+            )
+
+            if (text := Review._text.built()) is not None:
+                text.add(new_review)
 
         return new_review
 
+    @staticmethod
+    def create_many(items: list) -> list["Review | Exception"]:
+        """
+        Create several reviews with a single repository write
+
+        Returns the created review or the error of every item,
+        in the same order, if an id was taken by another request
+        meanwhile none of them is created
+        """
+        from src.persistence import repo
+
+        objects = [data for data in items if isinstance(data, dict)]
+        users = User.existing_ids(data.get("user_id") for data in objects)
+        places = Place.existing_ids(data.get("place_id") for data in objects)
+        ids = Review.existing_ids(data.get("id") for data in objects)
+        results: list[Review | Exception] = []
+
+        for data in items:
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError("Expected an object")
+                if data["user_id"] not in users:
+                    raise ValueError(
+                        f"User with ID {data['user_id']} not found"
+                    )
+                if data["place_id"] not in places:
+                    raise ValueError(
+                        f"Place with ID {data['place_id']} not found"
+                    )
+                Review.check_rating(data["rating"])
+                review = Review(**data)
+                if review.id in ids:
+                    raise ValueError(
+                        f"Review with ID {review.id} already exists"
+                    )
+            except (KeyError, TypeError, ValueError) as e:
+                results.append(e)
+                continue
+
+            ids.add(review.id)
+            results.append(review)
+
+        reviews = [r for r in results if isinstance(r, Review)]
+
+        with writing("review"):
+            try:
+                repo.save_many(reviews)
+            except ValueError as e:
+                # An id was taken by another request meanwhile
+                return [e if isinstance(r, Review) else r for r in results]
+
+            text = Review._text.built()
+
+            for review in reviews:
+                Review._aggregate(
+                    review.place_id, review.user_id, review.rating
+                )
+
+                if text is not None:
+                    text.add(review)
+
+        return results
+
     @staticmethod
     def update(review_id: str, data: dict) -> "Review | None":
         """Update an existing review"""
@@ -73,9 +247,33 @@ class Review(Base):
         if not review:
             raise ValueError("Review not found")
 
-        for key, value in data.items():
-            setattr(review, key, value)
+        if "rating" in data:
+            Review.check_rating(data["rating"])
+
+        review.check_references(data)
 
-        repo.update(review)
+        before = (review.place_id, review.user_id, review.rating)
+
+        review.set_fields(data)
+
+        with writing("review"):
+            if repo.update(review):
+                Review._aggregate(*before, add=False)
+                Review._aggregate(
+                    review.place_id, review.user_id, review.rating
+                )
+
+                if (text := Review._text.built()) is not None:
+                    text.update(review)
 
         return review
+
+    @classmethod
+    def deleted(cls, review: "Review") -> None:
+        """Drops a deleted review from the side stores"""
+        Review._aggregate(
+            review.place_id, review.user_id, review.rating, add=False
+        )
+
+        if (text := Review._text.built()) is not None:
+            text.remove(review.id)
@@ -8,10 +8,15 @@ from src.models.base import Base
 class User(Base):
     """User representation"""
 
+    __slots__ = ("email", "first_name", "last_name")
+
     email: str
     first_name: str
     last_name: str
 
+    # No two users share an email, whatever its case
+    unique = ("email",)
+
     def __init__(self, email: str, first_name: str, last_name: str, **kw):
         """Dummy init"""
         super().__init__(**kw)
@@ -34,23 +39,83 @@ class User(Base):
             "updated_at": self.updated_at.isoformat(),
         }
 
+    @staticmethod
+    def check_email(email) -> None:
+        """Raises a ValueError if an email is not a non-empty string"""
+        if not isinstance(email, str) or not email.strip():
+            raise ValueError("email must be a non-empty string")
+
+    @staticmethod
+    def get_by_email(email: str) -> "User | None":
+        """Get the user of an email, the case is ignored"""
+        from src.persistence import repo
+
+        return repo.find_unique("user", "email", email)
+
     @staticmethod
     def create(user: dict) -> "User":
-        """Create a new user"""
+        """
+        Create a new user
+
+        The email is looked up first to fail fast, the repository
+        checks it again when it saves the user
+        """
         from src.persistence import repo
 
-        users: list["User"] = User.get_all()
+        User.check_email(user["email"])
 
-        for u in users:
-            if u.email == user["email"]:
-                raise ValueError("User already exists")
+        if User.get_by_email(user["email"]):
+            raise ValueError("email already in use")
 
         new_user = User(**user)
-
         repo.save(new_user)
 
         return new_user
 
+    @staticmethod
+    def create_many(items: list) -> list["User | Exception"]:
+        """
+        Create several users with a single repository write
+
+        Returns the created user or the error of every item,
+        in the same order, if an email or an id was taken by another
+        request meanwhile none of them is created
+        """
+        from src.persistence import repo
+        from src.persistence.unique import normalize
+
+        results: list[User | Exception] = []
+        emails: set[str] = set()
+        ids = User.existing_ids(
+            data.get("id") for data in items if isinstance(data, dict)
+        )
+
+        for data in items:
+            try:
+                if not isinstance(data, dict):
+                    raise ValueError("Expected an object")
+                User.check_email(data["email"])
+                user = User(**data)
+                if user.id in ids:
+                    raise ValueError(f"User with ID {user.id} already exists")
+                email = normalize(user.email)
+                if email in emails or User.get_by_email(email):
+                    raise ValueError("email already in use")
+            except (KeyError, TypeError, ValueError) as e:
+                results.append(e)
+                continue
+
+            emails.add(email)
+            ids.add(user.id)
+            results.append(user)
+
+        try:
+            repo.save_many([r for r in results if isinstance(r, User)])
+        except ValueError as e:
+            return [e if isinstance(r, User) else r for r in results]
+
+        return results
+
     @staticmethod
     def update(user_id: str, data: dict) -> "User | None":
         """Update an existing user"""
@@ -62,12 +127,29 @@ class User(Base):
             return None
 
         if "email" in data:
-            user.email = data["email"]
-        if "first_name" in data:
-            user.first_name = data["first_name"]
-        if "last_name" in data:
-            user.last_name = data["last_name"]
+            User.check_email(data["email"])
+            owner = User.get_by_email(data["email"])
+            if owner and owner.id != user.id:
+                raise ValueError("email already in use")
+
+        previous = {
+            field: getattr(user, field)
+            for field in ("email", "first_name", "last_name", "updated_at")
+        }
 
-        repo.update(user)
+        try:
+            if "email" in data:
+                user.email = data["email"]
+            if "first_name" in data:
+                user.first_name = data["first_name"]
+            if "last_name" in data:
+                user.last_name = data["last_name"]
+
+            repo.update(user)
+        except ValueError:
+            # The email was taken meanwhile, the user is left unchanged
+            for field, value in previous.items():
+                setattr(user, field, value)
+            raise
 
         return user
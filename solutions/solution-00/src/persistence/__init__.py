@@ -1,8 +1,10 @@
 """ This module is responsible for selecting the repository
 to be used based on the environment variable REPOSITORY_ENV_VAR."""
 
+import atexit
 import os
 
+from src.models import save_derived
 from src.persistence.repository import Repository
 from utils.constants import REPOSITORY_ENV_VAR
 
@@ -26,3 +28,6 @@ else:
     repo = MemoryRepository()
 
 print(f"Using {repo.__class__.__name__} as repository")
+
+# The side stores persisted next to the data are written on exit
+atexit.register(save_derived)
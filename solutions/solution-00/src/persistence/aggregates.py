@@ -0,0 +1,71 @@
+"""
+This module exports running aggregates of a rating per group, like the
+ratings of the reviews of every place
+
+Every group keeps its count and how many times each distinct rating
+was given, so adding or removing a rating is O(1) and the sum, the min,
+the max and the 1-5 histogram are read from the few distinct ratings
+instead of from the reviews. Keeping the sum in a float would drift
+after many additions and removals of fractional ratings.
+"""
+
+from math import floor
+import threading
+
+
+class RatingAggregates:
+    """Count, sum, mean, min, max and histogram of the ratings of groups"""
+
+    def __init__(self) -> None:
+        """Starts with no groups"""
+        self.__count: dict[str, int] = {}
+        self.__values: dict[str, dict[float, int]] = {}
+        self.__lock = threading.Lock()
+
+    def add(self, group: str, rating: float) -> None:
+        """Adds a rating to a group"""
+        with self.__lock:
+            self.__count[group] = self.__count.get(group, 0) + 1
+            values = self.__values.setdefault(group, {})
+            values[rating] = values.get(rating, 0) + 1
+
+    def remove(self, group: str, rating: float) -> None:
+        """Removes a rating that was added to a group"""
+        with self.__lock:
+            values = self.__values.get(group, {})
+
+            if rating not in values:
+                return
+
+            values[rating] -= 1
+            if not values[rating]:
+                del values[rating]
+
+            self.__count[group] -= 1
+
+            if not self.__count[group]:
+                del self.__count[group], self.__values[group]
+
+    def get(self, group: str) -> dict:
+        """
+        Returns the aggregates of a group, the histogram counts the
+        ratings by their integer part, clamped to 1-5
+        """
+        with self.__lock:
+            count = self.__count.get(group, 0)
+            values = dict(self.__values.get(group, {}))
+
+        total = sum(rating * times for rating, times in values.items())
+
+        histogram = {str(star): 0 for star in range(1, 6)}
+        for rating, times in values.items():
+            histogram[str(min(5, max(1, floor(rating))))] += times
+
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else None,
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+            "histogram": histogram,
+        }
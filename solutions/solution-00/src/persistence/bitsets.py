@@ -0,0 +1,122 @@
+"""
+This module exports an inverted index over the rows of a link model,
+like PlaceAmenity that links a place to an amenity
+
+Every owner (the place) gets a row number, and every term (the
+amenity) maps to a bitset of the rows of its owners, a Python int where
+bit `n` is set if the owner of row `n` is linked to the term. "The
+owners linked to all these terms" is then the intersection (`&`) of a
+few ints instead of nested scans. The terms of every owner are kept in
+insertion order for the reverse lookup.
+"""
+
+import re
+import threading
+from typing import Any, Iterable
+
+_ONE = re.compile("1")
+
+
+class InvertedIndex:
+    """Maps the terms of a link model to the bitset of their owners"""
+
+    def __init__(self, owner: str, term: str, objs: Iterable = ()) -> None:
+        """
+        Builds the index from the given links, `owner` and `term` are
+        the names of the two fields of the link
+        """
+        self.owner = owner
+        self.term = term
+        self.__rows: dict[str, int] = {}
+        self.__owners: list[str] = []
+        self.__bitsets: dict[str, int] = {}
+        self.__terms: dict[str, dict[str, None]] = {}
+        self.__lock = threading.Lock()
+
+        # Setting one bit copies the whole int, so the initial bitsets
+        # are built from bytes at once
+        rows: dict[str, list[int]] = {}
+        for obj in objs:
+            owner, term = self._fields(obj)
+            row = self.__rows.get(owner)
+            if row is None:
+                row = self.__rows[owner] = len(self.__owners)
+                self.__owners.append(owner)
+            if term not in self.__terms.setdefault(owner, {}):
+                self.__terms[owner][term] = None
+                rows.setdefault(term, []).append(row)
+
+        for term, term_rows in rows.items():
+            bits = bytearray(max(term_rows) // 8 + 1)
+            for row in term_rows:
+                bits[row >> 3] |= 1 << (row & 7)
+            self.__bitsets[term] = int.from_bytes(bits, "little")
+
+    def _fields(self, obj: Any) -> tuple[str, str]:
+        """Returns the owner and the term of a link or of a raw record"""
+        if isinstance(obj, dict):
+            return obj[self.owner], obj[self.term]
+
+        return getattr(obj, self.owner), getattr(obj, self.term)
+
+    def add(self, obj: Any) -> None:
+        """Adds a link"""
+        owner, term = self._fields(obj)
+
+        with self.__lock:
+            row = self.__rows.get(owner)
+            if row is None:
+                row = self.__rows[owner] = len(self.__owners)
+                self.__owners.append(owner)
+
+            self.__bitsets[term] = self.__bitsets.get(term, 0) | (1 << row)
+            self.__terms.setdefault(owner, {})[term] = None
+
+    def remove(self, obj: Any) -> None:
+        """Removes a link"""
+        owner, term = self._fields(obj)
+
+        with self.__lock:
+            terms = self.__terms.get(owner)
+            if terms is None or term not in terms:
+                return
+
+            del terms[term]
+            if not terms:
+                del self.__terms[owner]
+
+            bitset = self.__bitsets[term] & ~(1 << self.__rows[owner])
+            if bitset:
+                self.__bitsets[term] = bitset
+            else:
+                del self.__bitsets[term]
+
+    def terms(self, owner: str) -> list[str]:
+        """Returns the terms linked to an owner, in the order of the links"""
+        with self.__lock:
+            return list(self.__terms.get(owner, ()))
+
+    def owners(self, *terms: str) -> list[str]:
+        """
+        Returns the owners linked to every given term, in the order
+        their first link was added
+        """
+        if not terms:
+            return []
+
+        with self.__lock:
+            bitsets = [self.__bitsets.get(term, 0) for term in set(terms)]
+            # The smallest bitset first, the intersection only shrinks
+            bitsets.sort(key=int.bit_length)
+
+            found = bitsets[0]
+            for bitset in bitsets[1:]:
+                if not found:
+                    break
+                found &= bitset
+
+            # The set bits are found by a C level scan of the binary
+            # string, least significant bit first
+            bits = bin(found)[:1:-1]
+
+            return [self.__owners[m.start()] for m in _ONE.finditer(bits)]
@@ -0,0 +1,286 @@
+"""
+This module exports a columnar side store for the numeric fields of a
+model
+
+Every field is kept in its own typed `array`, one row per object, so a
+filter over hundreds of thousands of objects is a scan over contiguous
+memory instead of a loop over Python objects. When NumPy is installed
+the scans are vectorized with it, otherwise they run in the C loops of
+`map` and `itertools.compress`, narrowing the matching rows one
+condition at a time.
+
+A value the array of its field can't hold, an int past the 64 bits of
+a "q" column, boxes its row: the arrays hold 0 for it and the exact
+values of the row are kept aside and compared in Python by `filter`.
+
+The rows of removed objects are reused by the next added object.
+"""
+
+from array import array
+from functools import partial
+from itertools import compress
+import operator
+import threading
+from typing import Any
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - NumPy is optional
+    numpy = None
+
+
+def _limits(typecode: str) -> tuple[int, int] | None:
+    """The smallest and largest int of an array typecode, None for floats"""
+    if typecode in "fd":
+        return None
+
+    bits = 8 * array(typecode).itemsize
+
+    if typecode.isupper():
+        return 0, 2**bits - 1
+
+    return -(2 ** (bits - 1)), 2 ** (bits - 1) - 1
+
+
+class ColumnStore:
+    """
+    Keeps the given numeric fields of a set of objects in typed arrays
+
+    `columns` maps every field to its `array` typecode, for example
+    `{"latitude": "d", "max_guests": "q"}`
+    """
+
+    def __init__(self, columns: dict[str, str]) -> None:
+        """Starts with no rows"""
+        self.__columns = {
+            field: array(typecode) for field, typecode in columns.items()
+        }
+        self.__ids: list[str | None] = []
+        self.__rows: dict[str, int] = {}
+        self.__alive = array("b")
+        self.__free: list[int] = []
+        # The exact values of the rows the arrays can't hold
+        self.__boxed: dict[int, dict[str, Any]] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of stored objects"""
+        return len(self.__rows)
+
+    def __contains__(self, obj_id: str) -> bool:
+        """Whether an object id is stored"""
+        return obj_id in self.__rows
+
+    @staticmethod
+    def _get(obj: Any, field: str) -> Any:
+        """Returns a field of an object or of a raw record"""
+        if isinstance(obj, dict):
+            return obj.get(field) or 0
+
+        return getattr(obj, field, None) or 0
+
+    def clear(self) -> None:
+        """Drops every row"""
+        with self.__lock:
+            for column in self.__columns.values():
+                del column[:]
+            self.__ids.clear()
+            self.__rows.clear()
+            del self.__alive[:]
+            self.__free.clear()
+            self.__boxed.clear()
+
+    def _write(self, row: int, values: dict[str, Any]) -> None:
+        """Writes the values of a row, boxing it if they don't fit"""
+        boxed = False
+
+        for field, column in self.__columns.items():
+            try:
+                column[row] = values[field]
+            except OverflowError:
+                column[row] = 0
+                boxed = True
+
+        if boxed:
+            self.__boxed[row] = values
+        else:
+            self.__boxed.pop(row, None)
+
+    def add(self, obj: Any) -> None:
+        """Adds an object, or updates it if it is already stored"""
+        obj_id = obj["id"] if isinstance(obj, dict) else obj.id
+        values = {field: self._get(obj, field) for field in self.__columns}
+
+        with self.__lock:
+            row = self.__rows.get(obj_id)
+
+            if row is None and self.__free:
+                row = self.__free.pop()
+                self.__ids[row] = obj_id
+                self.__alive[row] = 1
+                self.__rows[obj_id] = row
+
+            if row is None:
+                row = self.__rows[obj_id] = len(self.__ids)
+                self.__ids.append(obj_id)
+                self.__alive.append(1)
+                for column in self.__columns.values():
+                    column.append(0)
+
+            self._write(row, values)
+
+    def update(self, obj: Any) -> None:
+        """Writes the current values of a stored object"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Removes an object, its row is reused later"""
+        with self.__lock:
+            row = self.__rows.pop(obj_id, None)
+
+            if row is None:
+                return
+
+            self.__ids[row] = None
+            self.__alive[row] = 0
+            self.__boxed.pop(row, None)
+            self.__free.append(row)
+
+    def filter(self, **conditions) -> list[str]:
+        """
+        Returns the ids of the objects matching every condition, in
+        row order
+
+        A condition is either a value, for an equality, or a
+        `(low, high)` range where both ends are inclusive and None
+        leaves that end open:
+
+            store.filter(max_guests=(4, None), number_of_rooms=2)
+        """
+        unknown = conditions.keys() - self.__columns.keys()
+
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        ranges = {
+            field: (condition, condition)
+            if not isinstance(condition, tuple)
+            else condition
+            for field, condition in conditions.items()
+        }
+
+        with self.__lock:
+            fitted = {
+                field: self._fitted(field, bounds)
+                for field, bounds in ranges.items()
+            }
+
+            if None in fitted.values():
+                rows: list[int] = []
+            elif numpy is not None:
+                rows = self._filter_numpy(fitted)
+            else:
+                rows = self._filter_arrays(fitted)
+
+            if self.__boxed:
+                rows = self._unbox(rows, ranges)
+
+            ids = self.__ids
+
+            # The rows of removed objects have no id
+            return [ids[row] for row in rows if ids[row] is not None]
+
+    def _fitted(self, field: str, bounds: tuple) -> tuple | None:
+        """
+        Returns a range over the values of a column that the array can
+        compare, its ends past the ints of the typecode are opened, or
+        None if no value of the array is in the range
+        """
+        limits = _limits(self.__columns[field].typecode)
+        low, high = bounds
+
+        if limits is None:
+            return bounds
+
+        smallest, largest = limits
+
+        if (low is not None and low > largest) or (
+            high is not None and high < smallest
+        ):
+            return None
+
+        return (
+            None if low is None or low < smallest else low,
+            None if high is None or high > largest else high,
+        )
+
+    def _unbox(self, rows: list[int], ranges: dict) -> list[int]:
+        """
+        Replaces the boxed rows the scan compared by their 0s with the
+        boxed rows whose exact values match the ranges
+        """
+        boxed = self.__boxed
+        matching = [
+            row
+            for row, values in boxed.items()
+            if all(
+                (low is None or values[field] >= low)
+                and (high is None or values[field] <= high)
+                for field, (low, high) in ranges.items()
+            )
+        ]
+        rows = [row for row in rows if row not in boxed]
+
+        return sorted(rows + matching) if matching else rows
+
+    def _filter_arrays(self, ranges: dict) -> list[int]:
+        """
+        Scans the arrays with the C loops of map and compress, the
+        first condition scans a whole column and the next ones only
+        the rows that are still matching
+        """
+        rows: Any = range(len(self.__ids))
+
+        for field, (low, high) in ranges.items():
+            column = self.__columns[field]
+
+            if low is not None and low == high:
+                tests = [partial(operator.eq, low)]
+            else:
+                tests = []
+                if low is not None:
+                    tests.append(partial(operator.le, low))
+                if high is not None:
+                    tests.append(partial(operator.ge, high))
+
+            for test in tests:
+                values = (
+                    column
+                    if isinstance(rows, range)
+                    else map(column.__getitem__, rows)
+                )
+                rows = list(compress(rows, map(test, values)))
+
+        return list(rows)
+
+    def _filter_numpy(self, ranges: dict) -> list[int]:
+        """Scans the arrays with NumPy, the arrays are not copied"""
+        mask = numpy.frombuffer(self.__alive, dtype=numpy.int8) != 0
+
+        for field, (low, high) in ranges.items():
+            column = self.__columns[field]
+            # Views over the array memory, they are dropped before the
+            # lock is released so the arrays can grow again
+            values = numpy.frombuffer(column, dtype=column.typecode)
+
+            if low is not None and low == high:
+                mask &= values == low
+            else:
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+
+            del values
+
+        return numpy.flatnonzero(mask).tolist()
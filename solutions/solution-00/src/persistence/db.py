@@ -1,43 +1,654 @@
 """
-  Now is easy to implement the database repository. The DBRepository
-  should implement the Repository (Storage) interface and the methods defined
-  in the abstract class Storage.
-
-  The methods to implement are:
-    - get_all
-    - get
-    - save
-    - update
-    - delete
-    - reload (which can be empty)
+This module exports a Repository that persists data in a SQLite database
+
+Every model has its own table with:
+
+- `id` as primary key, the rowid keeps the insertion order
+- `created_at` and `updated_at`
+- one column per field declared in the `indexes` of the model,
+  each index declared by the model is also created in the table,
+  followed by `(created_at, id)`
+- one `<field>_normalized` column per field declared in the `unique`
+  of the model, holding the case folded value under a UNIQUE index,
+  so two processes can't store the same value
+- `data`, the JSON representation (`to_dict`) of the object
+
+The statements are built once per table and always run with
+parameters, so the sqlite3 statement cache of each connection keeps
+them prepared. The connections are kept in a bounded pool: a request
+borrows one for a read or a transaction and gives it back, so the
+connections and their prepared statements are reused by the next
+requests whatever thread serves them. The database runs in WAL mode so
+readers don't block the writer, which also lets several processes
+(gunicorn workers) share the same database file.
+
+The generations of the models are kept in the `_generation` table and
+moved in the transaction of every write, so a process sees the writes
+of the other processes too. The number of rows of every table is kept
+in the `_count` table the same way, so counting a model is O(1).
+
+The lists are paginated on the `(created_at, id)` index of the tables,
+a page starts right after the key of the last row of the previous one.
+The lists filtered on an indexed field are paginated on the same index
+after the field.
 """
 
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+from typing import Iterator
+from src.models import from_dict, get_models, reset_derived
 from src.models.base import Base
-from src.persistence.repository import Repository
+from src.persistence.indexes import IndexManager
+from src.persistence.repository import DuplicateIdError, Repository
+from src.persistence.unique import normalize
+from utils.constants import DATABASE_URL_ENV_VAR, DEFAULT_DATABASE_URL
+
+GENERATIONS = (
+    'CREATE TABLE IF NOT EXISTS "_generation" '
+    "(model TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+)
+SELECT_GENERATION = 'SELECT value FROM "_generation" WHERE model = ?'
+INSERT_GENERATION = 'INSERT OR IGNORE INTO "_generation" VALUES (?, ?)'
+BUMP_GENERATION = (
+    'UPDATE "_generation" SET value = value + 1 WHERE model = ?'
+)
+COUNTS = (
+    'CREATE TABLE IF NOT EXISTS "_count" '
+    "(model TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+)
+SELECT_COUNT = 'SELECT value FROM "_count" WHERE model = ?'
+ADD_COUNT = 'UPDATE "_count" SET value = value + ? WHERE model = ?'
+
+# Connections opened at most, and seconds a request waits for one of
+# them to be given back when they are all borrowed
+POOL_SIZE = 8
+POOL_TIMEOUT = 30
+
+
+def quote(*parts: str) -> str:
+    """Quotes an identifier made of the given parts"""
+    return '"' + "_".join(parts) + '"'
+
+
+class Table:
+    """The statements and indexed columns of the table of a model"""
+
+    def __init__(self, name: str, model: type) -> None:
+        """Builds the statements of the table"""
+        self.name = name
+        self.model = model
+        self.indexes = IndexManager.declared(model)
+        self.columns = list(
+            dict.fromkeys(field for fields in self.indexes for field in fields)
+        )
+        self.unique = {
+            field: f"{field}_normalized"
+            for field in getattr(model, "unique", ())
+        }
+
+        columns = [
+            "id",
+            "created_at",
+            "updated_at",
+            *self.columns,
+            *self.unique.values(),
+            "data",
+        ]
+        placeholders = ", ".join("?" for _ in columns)
+        assignments = ", ".join(f"{quote(c)} = ?" for c in columns[1:])
+
+        self.create = (
+            f'CREATE TABLE IF NOT EXISTS "{name}" ('
+            "id TEXT PRIMARY KEY, created_at TEXT, updated_at TEXT, "
+            + "".join(f"{quote(c)}, " for c in columns[3:-1])
+            + "data TEXT NOT NULL)"
+        )
+        self.create_indexes = [
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {quote('ux', name, field)} "
+            f"ON {quote(name)} ({quote(column)})"
+            for field, column in self.unique.items()
+        ] + [
+            # The indexes end with (created_at, id) so the pages of the
+            # rows matching them are read in order, without a sort
+            statement
+            for fields in self.indexes
+            for statement in (
+                f"DROP INDEX IF EXISTS {quote('ix', name, *fields)}",
+                f"CREATE INDEX IF NOT EXISTS "
+                f"{quote('ix', name, *fields, 'created_at_id')} "
+                f"ON {quote(name)} "
+                f"({', '.join(quote(f) for f in fields)}, created_at, id)",
+            )
+        ] + [
+            f"CREATE INDEX IF NOT EXISTS {quote('ix', name, 'created_at_id')} "
+            f"ON {quote(name)} (created_at, id)"
+        ]
+        self.count_all = (
+            f'INSERT OR IGNORE INTO "_count" '
+            f'SELECT ?, COUNT(*) FROM "{name}"'
+        )
+        self.select_all = f'SELECT data FROM "{name}" ORDER BY rowid'
+        self.select = f'SELECT data FROM "{name}" WHERE id = ?'
+        self.select_unique = {
+            field: f'SELECT data FROM "{name}" WHERE {quote(column)} = ?'
+            for field, column in self.unique.items()
+        }
+        # A row already stored with the id is skipped, but a taken
+        # unique value still fails the insert
+        self.insert = (
+            f'INSERT INTO "{name}" '
+            f"({', '.join(quote(c) for c in columns)}) "
+            f"VALUES ({placeholders}) ON CONFLICT (id) DO NOTHING"
+        )
+        self.update = f'UPDATE "{name}" SET {assignments} WHERE id = ?'
+        self.delete = f'DELETE FROM "{name}" WHERE id = ?'
+
+    def values(self, obj) -> list:
+        """Returns the column values of an object, `id` first"""
+        data = obj.to_dict()
+
+        return [
+            obj.id,
+            data.get("created_at"),
+            data.get("updated_at"),
+            *(getattr(obj, column, None) for column in self.columns),
+            *(
+                normalize(value) if isinstance(value, str) else None
+                for field in self.unique
+                for value in (getattr(obj, field, None),)
+            ),
+            json.dumps(data),
+        ]
+
+    def upgrade(self, connection: sqlite3.Connection) -> None:
+        """
+        Adds the normalized columns missing from a table created before
+        they were declared, filled from the JSON data, if several rows
+        share a value the first one owns it and the others have none
+        """
+        info = connection.execute(f"PRAGMA table_info({quote(self.name)})")
+        existing = {row[1] for row in info}
+
+        for field, column in self.unique.items():
+            if column in existing:
+                continue
+
+            connection.execute(
+                f"ALTER TABLE {quote(self.name)} ADD COLUMN {quote(column)}"
+            )
+            owners: dict[str, str] = {}
+            for obj_id, value in connection.execute(
+                f"SELECT id, json_extract(data, ?) FROM {quote(self.name)} "
+                "ORDER BY rowid",
+                (f"$.{field}",),
+            ):
+                if isinstance(value, str):
+                    owners.setdefault(normalize(value), obj_id)
+            connection.executemany(
+                f"UPDATE {quote(self.name)} SET {quote(column)} = ? "
+                "WHERE id = ?",
+                owners.items(),
+            )
+
+    def conflict(self, error: sqlite3.IntegrityError) -> str | None:
+        """Returns the unique field a constraint error is about"""
+        for field, column in self.unique.items():
+            if f"{self.name}.{column}" in str(error):
+                return field
+
+        return None
+
+    def where(self, criteria: dict) -> tuple[str, list]:
+        """Builds the query of `find_by`"""
+        clause, params = self.conditions(criteria)
+
+        return (
+            f'SELECT data FROM "{self.name}" WHERE {clause} ORDER BY rowid',
+            params,
+        )
+
+    def page(
+        self, criteria: dict, after: tuple[str, str] | None, limit: int | None
+    ) -> tuple[str, list]:
+        """Builds the query of a page in `(created_at, id)` order"""
+        clause, params = self.conditions(criteria)
+
+        if after is not None:
+            clause += " AND (created_at, id) > (?, ?)"
+            params += after
+
+        return (
+            f'SELECT data FROM "{self.name}" WHERE {clause} '
+            "ORDER BY created_at, id LIMIT ?",
+            params + [-1 if limit is None else limit],
+        )
+
+    def count(self, criteria: dict) -> tuple[str, list]:
+        """Builds the query counting the rows matching the criteria"""
+        clause, params = self.conditions(criteria)
+
+        return f'SELECT COUNT(*) FROM "{self.name}" WHERE {clause}', params
+
+    def conditions(self, criteria: dict) -> tuple[str, list]:
+        """
+        Builds the WHERE clause of the criteria, the indexed fields use
+        their column and the others are read from the JSON data
+        """
+        conditions = []
+        params = []
+
+        for field, value in criteria.items():
+            if field in self.columns:
+                conditions.append(f"{quote(field)} = ?")
+            elif field.isidentifier():
+                conditions.append("json_extract(data, ?) = ?")
+                params.append(f"$.{field}")
+            else:
+                raise ValueError(f"Invalid field: {field}")
+            params.append(value)
+
+        return " AND ".join(conditions) or "1", params
 
 
 class DBRepository(Repository):
-    """Dummy DB repository"""
+    """
+    SQLite repository
+
+    The database is read from the DATABASE_URL environment variable,
+    only `sqlite:///<path>` URIs are supported
+    """
+
+    def __init__(self, url: str | None = None) -> None:
+        """Opens the database and calls reload method"""
+        super().__init__()
+        url = url or os.getenv(DATABASE_URL_ENV_VAR, DEFAULT_DATABASE_URL)
+
+        if not url.startswith("sqlite:///"):
+            raise ValueError(f"Unsupported database URL: {url}")
+
+        path = url.removeprefix("sqlite:///")
+
+        self.__memory = path in ("", ":memory:")
+        self.__path = (
+            f"file:hbnb-{id(self)}?mode=memory&cache=shared"
+            if self.__memory
+            else path
+        )
+        self.__tables = {
+            name: Table(name, model) for name, model in get_models().items()
+        }
+        self.__idle: queue.LifoQueue = queue.LifoQueue()
+        self.__opened = 0
+        # The connections of a shared cache lock whole tables and
+        # don't wait for each other, so an in-memory database has one
+        self.__size = 1 if self.__memory else POOL_SIZE
+        self.__pool_lock = threading.Lock()
+
+        # An in-memory database lives as long as one connection is open
+        self.__anchor = self._open()
+
+        self.reload()
+
+    def _open(self) -> sqlite3.Connection:
+        """Opens a connection, it can be used by any thread"""
+        connection = sqlite3.connect(
+            self.__path,
+            uri=self.__memory,
+            cached_statements=256,
+            check_same_thread=False,
+        )
+        if not self.__memory:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+
+        return connection
+
+    def _acquire(self) -> sqlite3.Connection:
+        """
+        Takes an idle connection of the pool, opens one if less than
+        the size of the pool are open, or waits for one to be given back
+        """
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.__pool_lock:
+            if self.__opened < self.__size:
+                self.__opened += 1
+                return self._open()
+
+        try:
+            return self.__idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise sqlite3.OperationalError("No free database connection")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection of the pool, its transaction is committed
+        at the end of the block, or rolled back if it raises, and the
+        connection is given back to the pool
+        """
+        connection = self._acquire()
+
+        try:
+            with connection:
+                yield connection
+        finally:
+            self.__idle.put(connection)
+
+    @contextmanager
+    def _checked(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection for a write, a value taken in a unique
+        column rolls the transaction back and raises a ValueError
+        """
+        try:
+            with self._connection() as connection:
+                yield connection
+        except sqlite3.IntegrityError as e:
+            for table in self.__tables.values():
+                field = table.conflict(e)
+                if field is not None:
+                    raise ValueError(f"{field} already in use") from e
+            raise
+
+    def _table(self, model_name: str) -> Table:
+        """Returns the table of a model"""
+        if model_name not in self.__tables:
+            raise ValueError(f"Unknown model: {model_name}")
+
+        return self.__tables[model_name]
 
-    def __init__(self) -> None:
-        """Not implemented"""
+    def _group(self, objs: list[Base]) -> list[tuple[Table, list[Base]]]:
+        """Groups the objects by the table they belong to"""
+        groups: dict[str, list[Base]] = {}
+
+        for obj in objs:
+            groups.setdefault(obj.__class__.__name__.lower(), []).append(obj)
+
+        return [(self._table(name), group) for name, group in groups.items()]
+
+    @staticmethod
+    def _build(table: Table, data: str):
+        """
+        Builds the model instance of a JSON column, the column is kept
+        as its cached JSON encoding
+        """
+        obj = from_dict(table.model, json.loads(data))
+
+        if isinstance(obj, Base):
+            obj.cache_json(data)
+
+        return obj
+
+    def generation(self, model_name: str) -> int:
+        """Returns the generation of a model stored in the database"""
+        with self._connection() as connection:
+            row = connection.execute(
+                SELECT_GENERATION, (model_name,)
+            ).fetchone()
+
+        return row[0] if row else 0
+
+    def follows(
+        self, model_name: str, before: int, after: int, wrote: bool
+    ) -> bool:
+        """
+        Every write transaction moves the generation of the tables it
+        wrote by one, a bigger move comes from another process
+        """
+        return after - before == int(wrote)
+
+    @staticmethod
+    def _bump(
+        connection: sqlite3.Connection, names, added: int = 0
+    ) -> None:
+        """
+        Moves the generation of the models in a transaction, and adds
+        `added` to their number of rows
+        """
+        connection.executemany(BUMP_GENERATION, [(name,) for name in names])
+
+        if added:
+            connection.executemany(
+                ADD_COUNT, [(added, name) for name in names]
+            )
+
+    def changed(self, model_name: str | None = None) -> None:
+        """Moves the generation of a model, or of every model"""
+        with self._connection() as connection:
+            self._bump(
+                connection,
+                self.__tables if model_name is None else (model_name,),
+            )
+
+    def _load(self, table: Table, rows: list) -> list:
+        """Builds the model instances of the fetched rows"""
+        return [self._build(table, row[0]) for row in rows]
 
     def get_all(self, model_name: str) -> list:
-        """Not implemented"""
-        return []
+        """Get all objects of a given model"""
+        table = self._table(model_name)
+        with self._connection() as connection:
+            rows = connection.execute(table.select_all).fetchall()
+
+        return self._load(table, rows)
 
     def get(self, model_name: str, obj_id: str) -> Base | None:
-        """Not implemented"""
+        """Get an object by its ID"""
+        table = self._table(model_name)
+        with self._connection() as connection:
+            row = connection.execute(table.select, (obj_id,)).fetchone()
+
+        return self._build(table, row[0]) if row else None
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model matching the criteria"""
+        table = self._table(model_name)
+        query, params = table.where(criteria)
+        with self._connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+
+        return self._load(table, rows)
+
+    def find_unique(self, model_name: str, field: str, value: str):
+        """Get the object of a model that owns a value of a unique field"""
+        table = self._table(model_name)
+
+        if field not in table.unique:
+            raise ValueError(f"{field} is not unique")
+
+        with self._connection() as connection:
+            row = connection.execute(
+                table.select_unique[field], (normalize(value),)
+            ).fetchone()
+
+        return self._build(table, row[0]) if row else None
+
+    def page(
+        self,
+        model_name: str,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list:
+        """Get a page of the objects of a model in `(created_at, id)` order"""
+        table = self._table(model_name)
+        query, params = table.page(criteria, after, limit)
+        with self._connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+
+        return self._load(table, rows)
+
+    def count(self, model_name: str, **criteria) -> int:
+        """Number of objects of a model matching the criteria"""
+        table = self._table(model_name)
+
+        if criteria:
+            query, params = table.count(criteria)
+        else:
+            query, params = SELECT_COUNT, [model_name]
+
+        with self._connection() as connection:
+            row = connection.execute(query, params).fetchone()
+
+        return row[0] if row else 0
+
+    def flush(self) -> None:
+        """Nothing to flush, every mutation is committed right away"""
+
+    def derived_filename(self, name: str) -> str | None:
+        """Path of a side store file next to the database file"""
+        return None if self.__memory else f"{self.__path}.{name}"
 
     def reload(self) -> None:
-        """Not implemented"""
+        """Creates the missing tables"""
+        with self._connection() as connection:
+            for table in self.__tables.values():
+                connection.execute(table.create)
+                table.upgrade(connection)
+                for statement in table.create_indexes:
+                    connection.execute(statement)
+
+            # A new database starts its generations at a random value
+            # so they don't repeat the ones of a deleted database
+            connection.execute(GENERATIONS)
+            connection.executemany(
+                INSERT_GENERATION,
+                [(name, random.getrandbits(48)) for name in self.__tables],
+            )
+
+            # Counted once, then moved by every insert and delete
+            connection.execute(COUNTS)
+            for name, table in self.__tables.items():
+                connection.execute(table.count_all, (name,))
+
+        reset_derived()
 
     def save(self, obj: Base) -> None:
-        """Not implemented"""
+        """Save an object"""
+        table = self._table(obj.__class__.__name__.lower())
+
+        with self._checked() as connection:
+            cursor = connection.execute(table.insert, table.values(obj))
+            if cursor.rowcount < 1:
+                raise DuplicateIdError(
+                    f"{table.model.__name__} with ID {obj.id} already exists"
+                )
+            self._bump(connection, (table.name,), cursor.rowcount)
+
+    def save_many(self, objs: list[Base]) -> None:
+        """
+        Save several objects in a single transaction, it is rolled back
+        if a row with one of the ids is stored
+        """
+        with self._checked() as connection:
+            for table, group in self._group(objs):
+                cursor = connection.executemany(
+                    table.insert, [table.values(obj) for obj in group]
+                )
+                if cursor.rowcount < len(group):
+                    raise DuplicateIdError(
+                        f"A {table.model.__name__} with one of these IDs "
+                        "already exists"
+                    )
+                if cursor.rowcount > 0:
+                    self._bump(connection, (table.name,), cursor.rowcount)
+
+    @staticmethod
+    def _update_row(
+        connection: sqlite3.Connection, table: Table, obj: Base
+    ) -> bool:
+        """
+        Writes an object over its row with a new `updated_at`, returns
+        False if there is no row, the object then keeps its previous
+        `updated_at`
+        """
+        previous = obj.updated_at
+        obj.updated_at = datetime.now()
+
+        try:
+            values = table.values(obj)
+            cursor = connection.execute(table.update, values[1:] + values[:1])
+        except BaseException:
+            obj.updated_at = previous
+            raise
+
+        if not cursor.rowcount:
+            obj.updated_at = previous
+
+        return cursor.rowcount > 0
 
     def update(self, obj: Base) -> Base | None:
-        """Not implemented"""
+        """Update an object"""
+        table = self._table(obj.__class__.__name__.lower())
+
+        with self._checked() as connection:
+            updated = self._update_row(connection, table, obj)
+            if updated:
+                self._bump(connection, (table.name,))
+
+        return obj if updated else None
+
+    def update_many(self, objs: list[Base]) -> list[Base]:
+        """
+        Update several objects in a single transaction, if it is rolled
+        back the objects keep their previous `updated_at`
+        """
+        stamps = [(obj, obj.updated_at) for obj in objs]
+        updated = []
+
+        try:
+            with self._checked() as connection:
+                for table, group in self._group(objs):
+                    updated += [
+                        obj
+                        for obj in group
+                        if self._update_row(connection, table, obj)
+                    ]
+
+                self._bump(
+                    connection,
+                    {type(obj).__name__.lower() for obj in updated},
+                )
+        except BaseException:
+            for obj, stamp in stamps:
+                obj.updated_at = stamp
+            raise
+
+        return updated
 
     def delete(self, obj: Base) -> bool:
-        """Not implemented"""
-        return False
+        """Delete an object"""
+        table = self._table(obj.__class__.__name__.lower())
+
+        with self._connection() as connection:
+            cursor = connection.execute(table.delete, (obj.id,))
+            if cursor.rowcount:
+                self._bump(connection, (table.name,), -cursor.rowcount)
+
+        return cursor.rowcount > 0
+
+    def delete_many(self, objs: list[Base]) -> int:
+        """Delete several objects in a single transaction"""
+        deleted = 0
+
+        with self._connection() as connection:
+            for table, group in self._group(objs):
+                cursor = connection.executemany(
+                    table.delete, [(obj.id,) for obj in group]
+                )
+                deleted += cursor.rowcount
+                if cursor.rowcount:
+                    self._bump(connection, (table.name,), -cursor.rowcount)
+
+        return deleted
@@ -1,132 +1,469 @@
 """
 This module exports a Repository that persists data in a JSON file
+
+In journal mode every mutation is appended as one JSON line to a log
+file next to the snapshot instead of rewriting the whole snapshot.
+On reload the snapshot is read and then the log is replayed on top of
+it, once the log grows past a size threshold it is folded into a new
+snapshot (compaction).
+
+In lazy mode reload keeps the decoded records and the model instances
+are only built (timestamps included) the first time they are used by
+`get`, `get_all` or `find_by`.
+
+The writes follow the flush policy of the Flusher, with a deferred
+policy the pending journal records (or the snapshot) are written by a
+background thread.
 """
 
 from datetime import datetime
 import json
+import os
+import threading
+from typing import Iterator
+from src.models import from_dict, get_models, reset_derived
 from src.models.base import Base
-from src.persistence.repository import Repository
-from utils.constants import FILE_STORAGE_FILENAME
+from src.persistence.flusher import Flusher
+from src.persistence.indexes import (
+    IndexManager,
+    chunked,
+    matches,
+    page_of,
+)
+from src.persistence.json_stream import iter_records
+from src.persistence.repository import DuplicateIdError, Repository
+from utils.constants import (
+    FILE_JOURNAL_COMPACT_SIZE,
+    FILE_JOURNAL_ENV_VAR,
+    FILE_JOURNAL_SUFFIX,
+    FILE_LAZY_ENV_VAR,
+    FILE_STORAGE_FILENAME,
+)
 
 
 class FileRepository(Repository):
     """File Repository"""
 
     __filename = FILE_STORAGE_FILENAME
-    __data: dict[str, list] = {
-        "country": [],
-        "user": [],
-        "amenity": [],
-        "city": [],
-        "review": [],
-        "place": [],
-        "placeamenity": [],
-    }
-
-    def __init__(self) -> None:
-        """Calls reload method"""
+    __data: dict[str, dict[str, Base | dict]]
+
+    def __init__(
+        self,
+        filename: str | None = None,
+        journal: bool | None = None,
+        lazy: bool | None = None,
+    ) -> None:
+        """
+        Calls reload method
+
+        The journal and lazy modes are enabled with the FILE_JOURNAL
+        and FILE_LAZY environment variables unless they are given
+        """
+        if filename:
+            self.__filename = filename
+        if journal is None:
+            journal = os.getenv(FILE_JOURNAL_ENV_VAR, "0") == "1"
+        if lazy is None:
+            lazy = os.getenv(FILE_LAZY_ENV_VAR, "0") == "1"
+
+        super().__init__()
+        self.__journal = journal
+        self.__lazy = lazy
+        self.__models = get_models()
+        self.__journal_filename = self.__filename + FILE_JOURNAL_SUFFIX
+        self.__data = {
+            "user": {},
+            "amenity": {},
+            "city": {},
+            "review": {},
+            "place": {},
+            "placeamenity": {},
+        }
+        self.__indexes = IndexManager()
+        self.__lock = threading.RLock()
+        self.__pending: list[str] = []
         self.reload()
+        self.__flusher = Flusher(self._flush, self.__lock)
 
     def _save_to_file(self):
         """Helper method to save the current object data to the file"""
         serialized = {
-            k: [v.to_dict() for v in l if type(v) is not dict]
-            for k, l in self.__data.items()
+            k: [
+                v if type(v) is dict else v.to_dict()
+                for v in objects.values()
+            ]
+            for k, objects in self.__data.items()
         }
 
-        with open(self.__filename, "w") as file:
+        tmp_filename = self.__filename + ".tmp"
+
+        with open(tmp_filename, "w") as file:
             json.dump(serialized, file)
 
+        os.replace(tmp_filename, self.__filename)
+
+        if os.path.exists(self.__journal_filename):
+            open(self.__journal_filename, "w").close()
+
+    def _append_to_journal(self, op: str, model: str, obj) -> None:
+        """
+        Helper method to queue a mutation for the next flush
+
+        Without journal mode the whole snapshot will be rewritten
+        """
+        if not self.__journal:
+            return
+
+        record = {"op": op, "model": model}
+        if op == "delete":
+            record["id"] = obj.id
+        else:
+            record["data"] = obj.to_dict()
+
+        self.__pending.append(json.dumps(record) + "\n")
+
+    def _flush(self) -> None:
+        """Writes the pending mutations to the disk"""
+        if not self.__journal:
+            self._save_to_file()
+            return
+
+        if not self.__pending:
+            return
+
+        with open(self.__journal_filename, "a") as file:
+            file.write("".join(self.__pending))
+            size = file.tell()
+
+        self.__pending.clear()
+
+        if size > FILE_JOURNAL_COMPACT_SIZE:
+            self.compact()
+
+    def flush(self) -> None:
+        """Writes the pending mutations without waiting for the policy"""
+        self.__flusher.flush()
+
+    def derived_filename(self, name: str) -> str | None:
+        """Path of a side store file next to the data file"""
+        return f"{self.__filename}.{name}"
+
+    @property
+    def writes(self) -> int:
+        """Number of flushes that reached the disk"""
+        return self.__flusher.writes
+
+    def compact(self) -> None:
+        """Folds the journal into a new snapshot"""
+        with self.__lock:
+            self.__pending.clear()
+            self._save_to_file()
+
+    def _load(self, model_name: str, item: dict) -> Base | dict:
+        """
+        Returns what is stored for a record read from the disk, the
+        record itself in lazy mode or the model instance otherwise
+        """
+        if self.__lazy and "id" in item:
+            return item
+
+        return from_dict(self.__models[model_name], item)
+
+    def _hydrate(self, model_name: str, obj: Base | dict) -> Base:
+        """Builds the instance of a record kept by the lazy mode"""
+        if type(obj) is not dict:
+            return obj
+
+        with self.__lock:
+            objects = self.__data[model_name]
+            stored = objects.get(obj["id"], obj)
+
+            if type(stored) is dict:
+                stored = from_dict(self.__models[model_name], stored)
+                objects[stored.id] = stored
+
+        return stored
+
     def get_all(self, model_name: str):
         """Get all objects of a given model"""
-        return self.__data.get(model_name, [])
+        return [
+            self._hydrate(model_name, obj)
+            for obj in list(self.__data.get(model_name, {}).values())
+        ]
 
     def get(self, model_name: str, obj_id: str):
         """Get an object by its ID"""
-        for obj in self.get_all(model_name):
-            if obj.id == obj_id:
-                return obj
-        return None
+        obj = self.__data.get(model_name, {}).get(obj_id)
+
+        return None if obj is None else self._hydrate(model_name, obj)
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model matching the criteria"""
+        found = self.__indexes.find(
+            model_name, criteria, lambda obj_id: self.get(model_name, obj_id)
+        )
+
+        if found is not None:
+            return found
+
+        return [
+            obj for obj in self.get_all(model_name) if matches(obj, criteria)
+        ]
+
+    def find_unique(self, model_name: str, field: str, value: str):
+        """Get the object of a model that owns a value of a unique field"""
+        obj_id = self.__indexes.find_unique(model_name, field, value)
+
+        return None if obj_id is None else self.get(model_name, obj_id)
+
+    def page(
+        self,
+        model_name: str,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list:
+        """Get a page of the objects of a model in `(created_at, id)` order"""
+        with self.__lock:
+            if criteria:
+                return page_of(
+                    self.find_by(model_name, **criteria), after, limit
+                )
+
+            return self.__indexes.page(
+                model_name,
+                lambda: list(self.__data.get(model_name, {}).values()),
+                lambda obj_id: self.get(model_name, obj_id),
+                after,
+                limit,
+            )
+
+    def walk(
+        self, model_name: str, chunk: int, **criteria
+    ) -> Iterator[list]:
+        """
+        Walks the ordered index without criteria, the objects matching
+        the criteria are found and sorted once, they are already in
+        memory so only the list of them is added
+        """
+        if not criteria:
+            return super().walk(model_name, chunk)
+
+        with self.__lock:
+            found = page_of(self.find_by(model_name, **criteria), None, None)
+
+        return chunked(found, chunk)
+
+    def count(self, model_name: str, **criteria) -> int:
+        """Number of objects of a model matching the criteria"""
+        with self.__lock:
+            if not criteria:
+                return len(self.__data.get(model_name, {}))
+
+            counted = self.__indexes.count(model_name, criteria)
+
+            return (
+                len(self.find_by(model_name, **criteria))
+                if counted is None
+                else counted
+            )
 
     def reload(self):
-        """Reloads the data from the file"""
-        file_data = {}
+        """Reloads the data from the file and replays the journal"""
+        self.__data = {model: {} for model in self.__data}
+        self.__indexes.clear()
+
         try:
             with open(self.__filename, "r") as file:
-                file_data = json.load(file)
-        except FileNotFoundError:
-            from src.models.country import Country
+                # The records are streamed one by one so the decoded
+                # document is never held in memory next to the objects
+                for model, item in iter_records(file):
+                    # The countries of the files written when they
+                    # were stored are left out
+                    if model not in self.__models:
+                        continue
 
-            self.__data["country"] = [Country("Uruguay", "UY")]
+                    obj = self._load(model, item)
+                    obj_id = obj["id"] if type(obj) is dict else obj.id
+                    objects = self.__data.setdefault(model, {})
 
+                    if obj_id not in objects:
+                        objects[obj_id] = obj
+                        self.__indexes.add(model, obj)
+        except FileNotFoundError:
             self._save_to_file()
 
-        from src.models.amenity import Amenity, PlaceAmenity
-        from src.models.city import City
-        from src.models.country import Country
-        from src.models.place import Place
-        from src.models.review import Review
-        from src.models.user import User
-
-        models = {
-            "amenity": Amenity,
-            "city": City,
-            "country": Country,
-            "place": Place,
-            "placeamenity": PlaceAmenity,
-            "review": Review,
-            "user": User,
-        }
+        self._replay_journal()
+        self.changed()
+        reset_derived()
 
-        for model, data in file_data.items():
-            for item in data:
-                instance: Base = models[model](**item)
+    def _replay_journal(self) -> None:
+        """Applies the journaled mutations on top of the snapshot"""
+        try:
+            with open(self.__journal_filename, "r") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
 
-                if "created_at" in item:
-                    instance.created_at = datetime.fromisoformat(
-                        item["created_at"]
-                    )
-                if "updated_at" in item:
-                    instance.updated_at = datetime.fromisoformat(
-                        item["updated_at"]
-                    )
+        torn = False
 
-                self.save(data=instance, save_to_file=False)
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn write at the end of the log, the mutation
+                # was never acknowledged so it is safe to drop it
+                torn = True
+                break
 
-    def save(self, data: Base, save_to_file=True):
-        """Save an object to the repository"""
+            model = record["model"]
+            obj_id = record["id"] if "id" in record else record["data"]["id"]
+            current = self.__data.get(model, {}).get(obj_id)
+
+            if current is not None:
+                self.__indexes.remove(model, current)
+
+            if record["op"] == "delete":
+                self.__data[model].pop(obj_id, None)
+                continue
+
+            # Replacing the object keeps its position in the model dict
+            obj = self._load(model, record["data"])
+            self.__data.setdefault(model, {})[obj_id] = obj
+            self.__indexes.add(model, obj)
+
+        size = sum(len(line) for line in lines)
+
+        # The torn record is compacted away, the next records appended
+        # to its line could not be read back
+        if torn or (
+            size and (not self.__journal or size > FILE_JOURNAL_COMPACT_SIZE)
+        ):
+            self.compact()
+
+    def _save(self, data: Base, journal: bool = True) -> bool:
+        """Stores an object, returns False if it was already stored"""
         model: str = data.__class__.__name__.lower()
+        objects = self.__data.setdefault(model, {})
 
-        if model not in self.__data:
-            self.__data[model] = []
+        if data.id in objects:
+            return False
 
-        self.__data[model].append(data)
+        self.__indexes.claim([(model, data)])
+        objects[data.id] = data
+        self.__indexes.add(model, data)
+        self.changed(model)
+        if journal:
+            self._append_to_journal("save", model, data)
 
-        if save_to_file:
-            self._save_to_file()
+        return True
 
-    def update(self, obj: Base):
-        """Update an object in the repository"""
+    def _update(self, obj: Base) -> bool:
+        """Replaces a stored object, returns False if it wasn't stored"""
         cls = obj.__class__.__name__.lower()
 
-        for i, o in enumerate(self.__data[cls]):
-            if o.id == obj.id:
-                obj.updated_at = datetime.now()
-                self.__data[cls][i] = obj
-                self._save_to_file()
-                return obj
+        if obj.id not in self.__data.get(cls, {}):
+            return False
 
-        return None
+        self.__indexes.claim([(cls, obj)])
+        obj.updated_at = datetime.now()
+        self.__data[cls][obj.id] = obj
+        self.__indexes.update(cls, obj)
+        self.changed(cls)
+        self._append_to_journal("update", cls, obj)
 
-    def delete(self, obj: Base):
-        """Delete an object from the repository"""
+        return True
+
+    def _delete(self, obj: Base) -> bool:
+        """Removes a stored object, returns False if it wasn't stored"""
         class_name = obj.__class__.__name__.lower()
 
-        if obj not in self.__data[class_name]:
+        if self.__data.get(class_name, {}).pop(obj.id, None) is None:
             return False
 
-        self.__data[class_name].remove(obj)
+        self.__indexes.remove(class_name, obj)
+        self.changed(class_name)
+        self._append_to_journal("delete", class_name, obj)
+
+        return True
+
+    def _claim_batch(self, objs: list, stored: bool) -> None:
+        """
+        Takes the unique values of the objects of a batch that are
+        stored (or not stored yet) before any of them is written, so a
+        taken value fails the whole batch
+        """
+        self.__indexes.claim(
+            (cls, obj)
+            for obj in objs
+            for cls in (obj.__class__.__name__.lower(),)
+            if (obj.id in self.__data.get(cls, {})) == stored
+        )
+
+    def _check_new(self, objs: list) -> None:
+        """
+        Raises a DuplicateIdError if one of the objects has the id of a
+        stored object or of another object of the batch
+        """
+        seen = set()
+
+        for obj in objs:
+            cls = obj.__class__.__name__.lower()
+            if obj.id in self.__data.get(cls, {}) or (cls, obj.id) in seen:
+                raise DuplicateIdError(
+                    f"{type(obj).__name__} with ID {obj.id} already exists"
+                )
+            seen.add((cls, obj.id))
+
+    def save(self, data: Base, save_to_file=True):
+        """Save an object to the repository"""
+        with self.__lock:
+            self._check_new([data])
+            if self._save(data, journal=save_to_file) and save_to_file:
+                self.__flusher.mutated()
+
+    def save_many(self, objs: list[Base]) -> None:
+        """Save several objects with a single write"""
+        with self.__lock:
+            self._check_new(objs)
+            self._claim_batch(objs, stored=False)
+            saved = sum(self._save(obj) for obj in objs)
+            if saved:
+                self.__flusher.mutated(saved)
+
+    def update(self, obj: Base):
+        """Update an object in the repository"""
+        with self.__lock:
+            if not self._update(obj):
+                return None
+            self.__flusher.mutated()
+
+        return obj
+
+    def update_many(self, objs: list[Base]) -> list[Base]:
+        """Update several objects with a single write"""
+        with self.__lock:
+            self._claim_batch(objs, stored=True)
+            updated = [obj for obj in objs if self._update(obj)]
+            if updated:
+                self.__flusher.mutated(len(updated))
 
-        self._save_to_file()
+        return updated
+
+    def delete(self, obj: Base):
+        """Delete an object from the repository"""
+        with self.__lock:
+            if not self._delete(obj):
+                return False
+            self.__flusher.mutated()
 
         return True
+
+    def delete_many(self, objs: list[Base]) -> int:
+        """Delete several objects with a single write"""
+        with self.__lock:
+            deleted = sum(self._delete(obj) for obj in objs)
+            if deleted:
+                self.__flusher.mutated(deleted)
+
+        return deleted
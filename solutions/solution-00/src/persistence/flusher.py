@@ -0,0 +1,102 @@
+"""
+This module exports the Flusher used by the repositories that persist
+data to disk to group the writes of several mutations together
+
+The flush policy is configured with environment variables:
+
+- FLUSH_INTERVAL_MS: write at most once every N milliseconds
+- FLUSH_EVERY: write once N mutations are pending
+
+When none of them is set every mutation is written immediately.
+"""
+
+import atexit
+import os
+import threading
+from typing import Callable
+
+from utils.constants import FLUSH_EVERY_ENV_VAR, FLUSH_INTERVAL_ENV_VAR
+
+
+class Flusher:
+    """
+    Calls `write` when the pending mutations have to reach the disk
+
+    With a deferred policy a background thread does the writes, so a
+    burst of mutations is coalesced into a single write. The remaining
+    mutations are flushed when the process exits.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[], None],
+        lock: threading.RLock,
+        interval_ms: int | None = None,
+        every: int | None = None,
+    ) -> None:
+        """
+        `lock` must be the lock the repository holds while mutating
+        its data, the writes are done while holding it
+        """
+        if interval_ms is None:
+            interval_ms = int(os.getenv(FLUSH_INTERVAL_ENV_VAR, "0"))
+        if every is None:
+            every = int(os.getenv(FLUSH_EVERY_ENV_VAR, "0"))
+
+        self.__write = write
+        self.__lock = lock
+        self.__condition = threading.Condition(lock)
+        self.__interval = interval_ms / 1000 if interval_ms > 0 else None
+        self.__every = every if every > 0 else 0
+        self.__pending = 0
+        self.__closed = False
+        self.writes = 0
+
+        if self.immediate:
+            return
+
+        self.__thread = threading.Thread(
+            target=self._run, name="repository-flusher", daemon=True
+        )
+        self.__thread.start()
+        atexit.register(self.close)
+
+    @property
+    def immediate(self) -> bool:
+        """Whether every mutation is written as soon as it happens"""
+        return self.__interval is None and not self.__every
+
+    def mutated(self, count: int = 1) -> None:
+        """Records mutations and writes them according to the policy"""
+        with self.__lock:
+            self.__pending += count
+
+            if self.immediate:
+                self.flush()
+            elif self.__every and self.__pending >= self.__every:
+                self.__condition.notify()
+
+    def flush(self) -> None:
+        """Writes the pending mutations, if any"""
+        with self.__lock:
+            if not self.__pending:
+                return
+
+            self.__write()
+            self.__pending = 0
+            self.writes += 1
+
+    def close(self) -> None:
+        """Stops the background writer after a last flush"""
+        with self.__lock:
+            self.__closed = True
+            self.__condition.notify()
+
+        self.flush()
+
+    def _run(self) -> None:
+        """Background writer loop"""
+        with self.__lock:
+            while not self.__closed:
+                self.__condition.wait(self.__interval)
+                self.flush()
@@ -0,0 +1,294 @@
+"""
+This module exports a full-text index over the text fields of a model,
+like the name, description and address of the places
+
+The text is split into words, case folded and stemmed with a few
+suffix rules, so "Houses" and "house" are the same term. Every term
+maps to the term frequency of the documents that contain it, and the
+documents are ranked with BM25 against the terms of the query.
+
+The index can be persisted in a JSON file. Every document is saved
+with the `updated_at` of its object, so when the index is opened again
+only the objects created or updated since the last save are tokenized.
+"""
+
+from functools import lru_cache
+from heapq import nlargest
+import json
+from math import log
+from operator import itemgetter
+import os
+import re
+import threading
+from typing import Any, Iterable
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+# Version of the persisted format
+FORMAT = 1
+
+_WORD = re.compile(r"\w+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on "
+    "or that the this to was were will with".split()
+)
+
+# Tried in order, the first matching suffix is replaced
+_SUFFIXES = (
+    ("ational", "ate"),
+    ("ization", "ize"),
+    ("fulness", "ful"),
+    ("iveness", "ive"),
+    ("ousness", "ous"),
+    ("ations", "ate"),
+    ("ation", "ate"),
+    ("ments", ""),
+    ("ment", ""),
+    ("ness", ""),
+    ("ingly", ""),
+    ("edly", ""),
+    ("ing", ""),
+    ("ies", "y"),
+    ("ied", "y"),
+    ("sses", "ss"),
+    ("ed", ""),
+    ("ly", ""),
+    ("ss", "ss"),
+    ("us", "us"),
+    ("s", ""),
+)
+
+
+@lru_cache(maxsize=1 << 16)
+def stem(word: str) -> str:
+    """Strips the common English suffixes of a case folded word"""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    for suffix, replacement in _SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+
+        stemmed = word[: len(word) - len(suffix)] + replacement
+
+        if len(stemmed) < 3:
+            return word
+
+        # "running" -> "runn" -> "run"
+        if (
+            suffix in ("ing", "ed")
+            and stemmed[-1] == stemmed[-2]
+            and stemmed[-1] not in "aeioulsz"
+        ):
+            stemmed = stemmed[:-1]
+
+        return stemmed
+
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Returns the stemmed terms of a text, without the stop words"""
+    return [
+        stem(word)
+        for word in _WORD.findall(text.casefold())
+        if word not in STOP_WORDS
+    ]
+
+
+def _stamp(obj: Any) -> str:
+    """Version of an object, changes every time it is updated"""
+    return obj.updated_at.isoformat()
+
+
+class FullTextIndex:
+    """Ranks the objects of a model by the BM25 score of their text"""
+
+    def __init__(
+        self,
+        fields: Iterable[str],
+        objs: Iterable = (),
+        path: str | None = None,
+    ) -> None:
+        """
+        Indexes the text `fields` of the given objects
+
+        With a `path`, the documents saved there are reused for the
+        objects that did not change since, and `save` writes there
+        """
+        self.fields = tuple(fields)
+        self.path = path
+        self.__docs: dict[str, tuple[str, dict[str, int]]] = {}
+        self.__postings: dict[str, dict[str, int]] = {}
+        self.__lengths: dict[str, int] = {}
+        self.__total_length = 0
+        self.__dirty = False
+        self.__lock = threading.Lock()
+
+        saved = self._read() if path else {}
+
+        for obj in objs:
+            entry = saved.pop(obj.id, None)
+
+            if entry is not None and entry[0] == _stamp(obj):
+                self._insert(obj.id, *entry)
+            else:
+                self._insert(obj.id, _stamp(obj), self._terms(obj))
+                self.__dirty = True
+
+        # Documents of objects deleted since the save
+        if saved:
+            self.__dirty = True
+
+        self.save()
+
+    def __len__(self) -> int:
+        """Number of indexed documents"""
+        return len(self.__docs)
+
+    def _terms(self, obj: Any) -> dict[str, int]:
+        """Returns the frequency of every term of an object"""
+        terms: dict[str, int] = {}
+
+        for field in self.fields:
+            for term in tokenize(getattr(obj, field, None) or ""):
+                terms[term] = terms.get(term, 0) + 1
+
+        return terms
+
+    def _insert(self, obj_id: str, stamp: str, terms: dict) -> None:
+        """Adds a tokenized document, the lock must be held"""
+        self.__docs[obj_id] = (stamp, terms)
+        self.__lengths[obj_id] = sum(terms.values())
+        self.__total_length += self.__lengths[obj_id]
+
+        for term, frequency in terms.items():
+            self.__postings.setdefault(term, {})[obj_id] = frequency
+
+    def _discard(self, obj_id: str) -> None:
+        """Removes a document, the lock must be held"""
+        entry = self.__docs.pop(obj_id, None)
+
+        if entry is None:
+            return
+
+        self.__total_length -= self.__lengths.pop(obj_id)
+
+        for term in entry[1]:
+            postings = self.__postings[term]
+            del postings[obj_id]
+            if not postings:
+                del self.__postings[term]
+
+    def add(self, obj: Any) -> None:
+        """Indexes an object, or indexes it again if it changed"""
+        terms = self._terms(obj)
+
+        with self.__lock:
+            self._discard(obj.id)
+            self._insert(obj.id, _stamp(obj), terms)
+            self.__dirty = True
+
+    def update(self, obj: Any) -> None:
+        """Indexes an object again after its text changed"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Removes an object"""
+        with self.__lock:
+            if obj_id in self.__docs:
+                self._discard(obj_id)
+                self.__dirty = True
+
+    def search(
+        self, query: str, limit: int | None = None
+    ) -> list[tuple[float, str]]:
+        """
+        Returns the `(score, id)` of the documents that contain any
+        term of the query, best score first
+        """
+        terms = set(tokenize(query))
+        scores: dict[str, float] = {}
+
+        with self.__lock:
+            count = len(self.__docs)
+
+            if not count:
+                return []
+
+            average = self.__total_length / count or 1
+            lengths = self.__lengths
+
+            for term in terms:
+                postings = self.__postings.get(term)
+
+                if not postings:
+                    continue
+
+                frequency = len(postings)
+                idf = log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+                for obj_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * lengths[obj_id] / average)
+                    scores[obj_id] = scores.get(obj_id, 0.0) + (
+                        idf * tf * (K1 + 1) / (tf + norm)
+                    )
+
+        if limit is None:
+            limit = len(scores)
+
+        return [
+            (score, obj_id)
+            for obj_id, score in nlargest(
+                limit, scores.items(), key=itemgetter(1)
+            )
+        ]
+
+    def _read(self) -> dict[str, tuple[str, dict[str, int]]]:
+        """
+        Returns the documents saved in `path`, none if the file is
+        missing, unreadable or was saved for other fields
+        """
+        try:
+            with open(self.path, "r") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            not isinstance(saved, dict)
+            or saved.get("format") != FORMAT
+            or saved.get("fields") != list(self.fields)
+        ):
+            return {}
+
+        return {
+            obj_id: (stamp, terms)
+            for obj_id, (stamp, terms) in saved["docs"].items()
+        }
+
+    def save(self) -> None:
+        """Writes the documents to `path` if they changed since"""
+        if not self.path:
+            return
+
+        with self.__lock:
+            if not self.__dirty:
+                return
+
+            saved = {
+                "format": FORMAT,
+                "fields": list(self.fields),
+                "docs": self.__docs,
+            }
+
+            tmp_path = self.path + ".tmp"
+
+            with open(tmp_path, "w") as file:
+                json.dump(saved, file)
+
+            os.replace(tmp_path, self.path)
+            self.__dirty = False
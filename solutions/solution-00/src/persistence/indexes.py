@@ -0,0 +1,323 @@
+"""
+This module exports the secondary indexes shared by the repositories
+
+The models declare which fields should be indexed with the `indexes`
+class attribute, for example:
+
+    class Review(Base):
+        indexes = ("place_id", "user_id")
+
+A tuple of fields inside `indexes` declares a composite index. The
+fields of the `references` of a model are always indexed, they are
+used to find the objects a deletion cascades to.
+
+The indexes also accept the raw records (the `to_dict` output) that
+the lazy FileRepository keeps until an object is used.
+
+The objects of a model can also be walked in `(created_at, id)` order,
+for the keyset pagination of the lists, through an ordered index built
+on the first `page` of the model.
+
+The fields of the `unique` of a model have a UniqueIndex, their values
+are claimed with `claim` before an object is stored or updated.
+"""
+
+from heapq import nsmallest
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from src.models import get_models
+from src.persistence.sorted_index import SortedIndex
+from src.persistence.unique import UniqueIndex
+
+
+class IndexManager:
+    """
+    Keeps the declared secondary indexes of every model in sync with
+    the objects stored in a repository
+
+    Each index maps the tuple of indexed values to the ids of the objects
+    that have them, the ids are kept in an insertion ordered dict so
+    adding, moving or removing an object from an index is O(1)
+    """
+
+    def __init__(self) -> None:
+        """Starts with no indexes, they are created on the first add"""
+        self.__indexes: dict[str, dict[tuple, dict[tuple, dict]]] = {}
+        self.__models = get_models()
+        self.__keys: dict[str, dict[str, dict[tuple, tuple]]] = {}
+        self.__ordered: dict[str, SortedIndex] = {}
+        self.__unique: dict[str, dict[str, UniqueIndex]] = {}
+
+    @staticmethod
+    def declared(model: type) -> list[tuple[str, ...]]:
+        """Returns the indexes declared by a model class"""
+        declared = [
+            fields if isinstance(fields, tuple) else (fields,)
+            for fields in getattr(model, "indexes", ())
+        ]
+
+        return declared + [
+            (field,)
+            for field in getattr(model, "references", {})
+            if (field,) not in declared
+        ]
+
+    @staticmethod
+    def _values(obj: Any, fields: tuple[str, ...]) -> tuple:
+        """Returns the values of `fields` in `obj`"""
+        if isinstance(obj, dict):
+            return tuple(obj.get(field) for field in fields)
+
+        return tuple(getattr(obj, field, None) for field in fields)
+
+    @staticmethod
+    def _id(obj: Any) -> str:
+        """Returns the id of an object or of a raw record"""
+        return obj["id"] if isinstance(obj, dict) else obj.id
+
+    def clear(self) -> None:
+        """Drops every index"""
+        self.__indexes.clear()
+        self.__keys.clear()
+        self.__ordered.clear()
+        self.__unique.clear()
+
+    def _uniques(self, model_name: str, obj: Any) -> dict[str, UniqueIndex]:
+        """Returns the unique indexes of a model, created on first use"""
+        if model_name not in self.__unique:
+            model = self.__models.get(model_name, type(obj))
+            self.__unique.setdefault(
+                model_name,
+                {
+                    field: UniqueIndex(field)
+                    for field in getattr(model, "unique", ())
+                },
+            )
+
+        return self.__unique[model_name]
+
+    def claim(self, objs: Iterable[tuple[str, Any]]) -> None:
+        """
+        Takes the unique values of the given (model name, object) pairs
+        before they are stored, raises a ValueError if another object
+        owns one of them, and then none of the values is taken
+        """
+        taken = []
+
+        try:
+            for model_name, obj in objs:
+                for index in self._uniques(model_name, obj).values():
+                    key = index.key(obj)
+                    if key is not None and index.claim(obj.id, key):
+                        taken.append((index, obj.id, key))
+        except ValueError:
+            for index, obj_id, key in taken:
+                index.release(obj_id, key)
+            raise
+
+    def find_unique(self, model_name: str, field: str, value: str) -> Any:
+        """
+        Returns the id of the object of a model that owns a value of
+        one of its unique fields, None if no object does
+        """
+        model = self.__models.get(model_name)
+
+        if field not in getattr(model, "unique", ()):
+            raise ValueError(f"{field} is not unique")
+
+        return self._uniques(model_name, None)[field].get(value)
+
+    def add(self, model_name: str, obj: Any) -> None:
+        """Adds an object to the indexes of its model"""
+        if model_name in self.__ordered:
+            self.__ordered[model_name].add(obj)
+
+        for index in self._uniques(model_name, obj).values():
+            index.add(obj)
+
+        self._index(model_name, obj)
+
+    def _index(self, model_name: str, obj: Any) -> None:
+        """Adds an object to the declared indexes of its model"""
+        if model_name not in self.__indexes:
+            model = self.__models.get(model_name, type(obj))
+            self.__indexes[model_name] = {
+                fields: {} for fields in self.declared(model)
+            }
+            self.__keys[model_name] = {}
+
+        indexes = self.__indexes[model_name]
+
+        if not indexes:
+            return
+
+        obj_id = self._id(obj)
+        keys = {}
+        for fields, index in indexes.items():
+            values = self._values(obj, fields)
+            index.setdefault(values, {})[obj_id] = None
+            keys[fields] = values
+
+        self.__keys[model_name][obj_id] = keys
+
+    def remove(self, model_name: str, obj: Any) -> None:
+        """Removes an object from the indexes of its model"""
+        if model_name in self.__ordered:
+            self.__ordered[model_name].remove(self._id(obj))
+
+        for index in self.__unique.get(model_name, {}).values():
+            index.remove(self._id(obj))
+
+        self._unindex(model_name, obj)
+
+    def _unindex(self, model_name: str, obj: Any) -> None:
+        """Removes an object from the declared indexes of its model"""
+        obj_id = self._id(obj)
+        keys = self.__keys.get(model_name, {}).pop(obj_id, None)
+
+        if keys is None:
+            return
+
+        for fields, values in keys.items():
+            index = self.__indexes[model_name][fields]
+            bucket = index[values]
+            bucket.pop(obj_id, None)
+            if not bucket:
+                del index[values]
+
+    def update(self, model_name: str, obj: Any) -> None:
+        """
+        Moves an object to the right buckets after its indexed
+        fields changed, the objects are mutated in place so the
+        previous values are taken from the keys stored on `add`
+
+        The `created_at` of an object never changes, it keeps its
+        place in the ordered index
+        """
+        for index in self._uniques(model_name, obj).values():
+            index.update(obj)
+
+        self._unindex(model_name, obj)
+        self._index(model_name, obj)
+
+    def ordered(
+        self, model_name: str, objs: Callable[[], Iterable]
+    ) -> SortedIndex:
+        """
+        Returns the index of the objects of a model ordered by
+        `(created_at, id)`, it is built from `objs()` on first use and
+        then kept in sync by `add` and `remove`
+        """
+        if model_name not in self.__ordered:
+            self.__ordered[model_name] = SortedIndex(
+                "created_at", objs(), created_key
+            )
+
+        return self.__ordered[model_name]
+
+    def page(
+        self,
+        model_name: str,
+        objs: Callable[[], Iterable],
+        get: Callable[[str], Any],
+        after: tuple[str, str] | None,
+        limit: int | None,
+    ) -> list:
+        """
+        Returns the objects of a model that come after the key `after`
+        in `(created_at, id)` order, at most `limit` of them, `get`
+        returns the object of an id
+        """
+        ids = self.ordered(model_name, objs).after(after)
+
+        return list(islice(filter(None, map(get, ids)), limit))
+
+    def count(self, model_name: str, criteria: dict) -> int | None:
+        """
+        Returns how many objects match the criteria if an index has
+        exactly their fields, None otherwise
+        """
+        index = self.__indexes.get(model_name, {}).get(tuple(criteria))
+
+        if index is None:
+            return None
+
+        return len(index.get(tuple(criteria.values()), ()))
+
+    def find(
+        self, model_name: str, criteria: dict, get: Callable[[str], Any]
+    ) -> list | None:
+        """
+        Returns the objects matching every criteria using the
+        indexes of the model, `get` returns the object of an id
+
+        Returns None when no index covers any of the criteria fields,
+        the caller should fall back to a full scan in that case
+        """
+        indexes = self.__indexes.get(model_name, {})
+
+        best: tuple[str, ...] | None = None
+        for fields in indexes:
+            if not set(fields) <= criteria.keys():
+                continue
+            if best is None or len(fields) > len(best):
+                best = fields
+
+        if best is None:
+            return None
+
+        values = tuple(criteria[field] for field in best)
+        candidates = [get(obj_id) for obj_id in indexes[best].get(values, {})]
+
+        if len(best) == len(criteria):
+            return candidates
+
+        return [obj for obj in candidates if matches(obj, criteria)]
+
+
+def matches(obj: Any, criteria: dict) -> bool:
+    """Checks if `obj` has every field value in `criteria`"""
+    return all(
+        getattr(obj, field, None) == value
+        for field, value in criteria.items()
+    )
+
+
+def created_key(obj: Any) -> str:
+    """
+    Returns the `created_at` of an object or of a raw record as an ISO
+    string, the keyset pagination orders by `(created_key, id)`
+    """
+    if isinstance(obj, dict):
+        return obj["created_at"]
+
+    return obj.created_at.isoformat()
+
+
+def page_of(
+    objs: Iterable, after: tuple[str, str] | None, limit: int | None
+) -> list:
+    """
+    Returns the objects that come after the key `after` in
+    `(created_at, id)` order, at most `limit` of them, used for the
+    subsets of a model (like the reviews of a place) that have no
+    ordered index, it costs O(n log limit) for n objects
+    """
+
+    def key(obj: Any) -> tuple[str, str]:
+        """The pagination key of an object"""
+        return created_key(obj), obj.id
+
+    if after is not None:
+        objs = (obj for obj in objs if key(obj) > after)
+
+    if limit is None:
+        return sorted(objs, key=key)
+
+    return nsmallest(limit, objs, key=key)
+
+
+def chunked(objs: list, size: int) -> Iterator[list]:
+    """Yields the objects in lists of at most `size` objects"""
+    return (objs[start:start + size] for start in range(0, len(objs), size))
@@ -0,0 +1,127 @@
+"""
+This module exports an incremental reader for the FileRepository
+snapshot, a JSON object that maps every model name to a list of
+records:
+
+    {"user": [{...}, {...}], "review": [{...}], ...}
+
+The file is read in chunks and every record is yielded as soon as it
+is decoded, so the whole document is never held in memory at once.
+"""
+
+import json
+import sys
+from typing import Iterator, TextIO
+
+CHUNK_SIZE = 1024 * 1024
+
+# Every record is decoded on its own, the keys are interned so all the
+# records share the same key strings like they do with json.load
+_decoder = json.JSONDecoder(
+    object_pairs_hook=lambda pairs: {sys.intern(k): v for k, v in pairs}
+)
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """A buffer over a text file that is refilled on demand"""
+
+    def __init__(self, file: TextIO, chunk_size: int) -> None:
+        """Starts with an empty buffer"""
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Reads one more chunk, returns False at the end of the file"""
+        if self.eof:
+            return False
+
+        chunk = self.file.read(self.chunk_size)
+
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non whitespace character without using it"""
+        while True:
+            while (
+                self.pos < len(self.buffer)
+                and self.buffer[self.pos] in _WHITESPACE
+            ):
+                self.pos += 1
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self.fill():
+                raise ValueError("Unexpected end of the JSON document")
+
+    def expect(self, chars: str) -> str:
+        """Uses the next character, which must be one of `chars`"""
+        char = self.peek()
+
+        if char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} but got {char!r} in the JSON"
+            )
+
+        self.pos += 1
+
+        return char
+
+    def value(self):
+        """Decodes the next JSON value, reading more chunks if needed"""
+        self.peek()
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value is cut by the end of the buffer
+                if not self.fill():
+                    raise
+                continue
+
+            self.pos = end
+
+            return value
+
+
+def iter_records(
+    file: TextIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[tuple[str, dict]]:
+    """Yields every `(model name, record)` of a snapshot in order"""
+    reader = _Reader(file, chunk_size)
+
+    if not reader.fill():
+        return
+
+    reader.expect("{")
+
+    if reader.peek() == "}":
+        return
+
+    while True:
+        model = reader.value()
+        reader.expect(":")
+        reader.expect("[")
+
+        if reader.peek() == "]":
+            reader.pos += 1
+        else:
+            while True:
+                yield model, reader.value()
+                if reader.expect(",]") == "]":
+                    break
+
+        if reader.expect(",}") == "}":
+            return
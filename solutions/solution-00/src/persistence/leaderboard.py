@@ -0,0 +1,118 @@
+"""
+This module exports a leaderboard, the objects of a model ordered by a
+score overall and inside groups (like the places of every city)
+
+Every group keeps a list of `(score, id)` pairs sorted with bisect,
+the lowest score first, so the top k of a group is read from the head
+of its list instead of sorting every object on each request.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+ALL = None
+
+
+class Leaderboard:
+    """Keeps the ids of a set of objects ordered by a score per group"""
+
+    def __init__(
+        self,
+        score: Callable[[Any], Any],
+        group_field: str,
+        objs: Iterable = (),
+    ) -> None:
+        """
+        `score` returns the sort key of an object, None leaves the
+        object out of the leaderboard, and `group_field` is the field
+        whose value groups the objects
+        """
+        self.__score = score
+        self.__group_field = group_field
+        self.__entries: dict[str, tuple[Any, Any]] = {}
+        self.__groups: dict[Any, list[tuple[Any, str]]] = {ALL: []}
+        self.__lock = threading.Lock()
+
+        for obj in objs:
+            score_value = score(obj)
+            if score_value is None:
+                continue
+            group = getattr(obj, group_field, None)
+            self.__entries[obj.id] = (group, score_value)
+            self.__groups.setdefault(group, []).append((score_value, obj.id))
+            self.__groups[ALL].append((score_value, obj.id))
+
+        for entries in self.__groups.values():
+            entries.sort()
+
+    def __len__(self) -> int:
+        """Number of ranked objects"""
+        return len(self.__entries)
+
+    def add(self, obj: Any) -> None:
+        """Adds an object, or moves it if its score or group changed"""
+        score = self.__score(obj)
+        group = getattr(obj, self.__group_field, None)
+
+        with self.__lock:
+            if self.__entries.get(obj.id) == (group, score):
+                return
+
+            self._discard(obj.id)
+
+            if score is None:
+                return
+
+            self.__entries[obj.id] = (group, score)
+            insort(self.__groups.setdefault(group, []), (score, obj.id))
+            insort(self.__groups[ALL], (score, obj.id))
+
+    def update(self, obj: Any) -> None:
+        """Moves an object after its score or its group changed"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Removes an object"""
+        with self.__lock:
+            self._discard(obj_id)
+
+    def _discard(self, obj_id: str) -> None:
+        """Removes an object, the lock must be held"""
+        entry = self.__entries.pop(obj_id, None)
+
+        if entry is None:
+            return
+
+        group, score = entry
+        for key in (group, ALL):
+            entries = self.__groups[key]
+            del entries[bisect_left(entries, (score, obj_id))]
+            if not entries and key is not ALL:
+                del self.__groups[key]
+
+    def ranked(self, group: Any = ALL) -> Iterator[str]:
+        """
+        Yields the ids of a group (every object by default), lowest
+        score first
+
+        The ids are copied in chunks, every chunk is looked up again
+        after the last `(score, id)` it yielded, so the leaderboard can
+        change while the caller consumes them lazily and no id is
+        skipped or repeated
+        """
+        chunk = 256
+        last = None
+
+        while True:
+            with self.__lock:
+                entries = self.__groups.get(group, [])
+                start = 0 if last is None else bisect_right(entries, last)
+                keys = entries[start:start + chunk]
+
+            if not keys:
+                return
+
+            yield from (obj_id for _, obj_id in keys)
+
+            last = keys[-1]
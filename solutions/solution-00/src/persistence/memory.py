@@ -4,77 +4,214 @@ it only stores it in memory
 """
 
 from datetime import datetime
+from typing import Iterator
+from src.models import reset_derived
 from src.models.base import Base
-from src.persistence.repository import Repository
-from utils.populate import populate_db
+from src.persistence.indexes import (
+    IndexManager,
+    chunked,
+    matches,
+    page_of,
+)
+from src.persistence.repository import DuplicateIdError, Repository
 
 
 class MemoryRepository(Repository):
     """
     A Repository that does not persist data, it only stores it in memory
 
+    Every model is stored in a dict keyed by the object id, dicts keep
+    the insertion order so `get_all` returns the objects in the order
+    they were saved while `get`, `save`, `update` and `delete` are O(1)
 
+    The secondary indexes declared by the models are used by `find_by`
 
     Every time the server is restarted, the data is lost
     """
 
-    __data: dict[str, list] = {
-        "country": [],
-        "user": [],
-        "amenity": [],
-        "city": [],
-        "review": [],
-        "place": [],
-        "placeamenity": [],
-    }
+    __data: dict[str, dict[str, Base]]
+    __indexes: IndexManager
 
     def __init__(self) -> None:
         """Calls reload method"""
+        super().__init__()
+        self.__data = {
+            "user": {},
+            "amenity": {},
+            "city": {},
+            "review": {},
+            "place": {},
+            "placeamenity": {},
+        }
+        self.__indexes = IndexManager()
+
         self.reload()
 
     def get_all(self, model_name: str) -> list:
         """Get all objects of a given model"""
-        return self.__data.get(model_name, [])
+        return list(self.__data.get(model_name, {}).values())
 
     def get(self, model_name: str, obj_id: str):
         """Get an object by its ID"""
-        for obj in self.get_all(model_name):
-            if obj.id == obj_id:
-                return obj
-        return None
+        return self.__data.get(model_name, {}).get(obj_id)
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model matching the criteria"""
+        found = self.__indexes.find(
+            model_name, criteria, lambda obj_id: self.get(model_name, obj_id)
+        )
+
+        if found is not None:
+            return found
+
+        return [
+            obj for obj in self.get_all(model_name) if matches(obj, criteria)
+        ]
+
+    def find_unique(self, model_name: str, field: str, value: str):
+        """Get the object of a model that owns a value of a unique field"""
+        obj_id = self.__indexes.find_unique(model_name, field, value)
+
+        return None if obj_id is None else self.get(model_name, obj_id)
+
+    def page(
+        self,
+        model_name: str,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list:
+        """Get a page of the objects of a model in `(created_at, id)` order"""
+        if criteria:
+            return page_of(self.find_by(model_name, **criteria), after, limit)
+
+        return self.__indexes.page(
+            model_name,
+            lambda: list(self.__data.get(model_name, {}).values()),
+            lambda obj_id: self.get(model_name, obj_id),
+            after,
+            limit,
+        )
+
+    def walk(
+        self, model_name: str, chunk: int, **criteria
+    ) -> Iterator[list]:
+        """
+        Walks the ordered index without criteria, the objects matching
+        the criteria are found and sorted once, they are already in
+        memory so only the list of them is added
+        """
+        if not criteria:
+            return super().walk(model_name, chunk)
+
+        found = page_of(self.find_by(model_name, **criteria), None, None)
+
+        return chunked(found, chunk)
+
+    def count(self, model_name: str, **criteria) -> int:
+        """Number of objects of a model matching the criteria"""
+        if not criteria:
+            return len(self.__data.get(model_name, {}))
+
+        counted = self.__indexes.count(model_name, criteria)
+
+        return (
+            len(self.find_by(model_name, **criteria))
+            if counted is None
+            else counted
+        )
+
+    def flush(self) -> None:
+        """Nothing to flush, the data is only in memory"""
 
     def reload(self):
-        """Populates the database with some dummy data"""
-        populate_db(self)
+        """Nothing to reload, the data is only in memory"""
+        self.changed()
+        reset_derived()
+
+    def _claim_batch(self, objs: list, stored: bool) -> None:
+        """
+        Takes the unique values of the objects of a batch that are
+        stored (or not stored yet) before any of them is written, so a
+        taken value fails the whole batch
+        """
+        self.__indexes.claim(
+            (cls, obj)
+            for obj in objs
+            for cls in (obj.__class__.__name__.lower(),)
+            if (obj.id in self.__data.get(cls, {})) == stored
+        )
+
+    def _check_new(self, objs: list) -> None:
+        """
+        Raises a DuplicateIdError if one of the objects has the id of a
+        stored object or of another object of the batch
+        """
+        seen = set()
+
+        for obj in objs:
+            cls = obj.__class__.__name__.lower()
+            if obj.id in self.__data.get(cls, {}) or (cls, obj.id) in seen:
+                raise DuplicateIdError(
+                    f"{type(obj).__name__} with ID {obj.id} already exists"
+                )
+            seen.add((cls, obj.id))
 
     def save(self, obj: Base):
         """Save an object"""
         cls = obj.__class__.__name__.lower()
 
-        if obj not in self.__data[cls]:
-            # print(f"Saving {obj}, {cls}")
-            self.__data[cls].append(obj)
+        self._check_new([obj])
+        self.__indexes.claim([(cls, obj)])
+        self.__data.setdefault(cls, {})[obj.id] = obj
+        self.__indexes.add(cls, obj)
+        self.changed(cls)
 
         return obj
 
+    def save_many(self, objs: list[Base]) -> None:
+        """
+        Save several objects, none of them if an id or a value is taken
+        """
+        self._check_new(objs)
+        self._claim_batch(objs, stored=False)
+
+        for obj in objs:
+            self.save(obj)
+
     def update(self, obj: Base):
         """Update an object"""
         cls = obj.__class__.__name__.lower()
 
-        for i, o in enumerate(self.__data[cls]):
-            if o.id == obj.id:
-                obj.updated_at = datetime.now()
-                self.__data[cls][i] = obj
-                return obj
+        if obj.id not in self.__data.get(cls, {}):
+            return None
 
-        return None
+        self.__indexes.claim([(cls, obj)])
+        obj.updated_at = datetime.now()
+        self.__data[cls][obj.id] = obj
+        self.__indexes.update(cls, obj)
+        self.changed(cls)
+
+        return obj
+
+    def update_many(self, objs: list[Base]) -> list[Base]:
+        """Update several objects, none of them if a value is taken"""
+        self._claim_batch(objs, stored=True)
+
+        return [obj for obj in objs if self.update(obj)]
 
     def delete(self, obj: Base) -> bool:
         """Delete an object"""
         cls = obj.__class__.__name__.lower()
 
-        if obj in self.__data[cls]:
-            self.__data[cls].remove(obj)
-            return True
+        if self.__data.get(cls, {}).pop(obj.id, None) is None:
+            return False
+
+        self.__indexes.remove(cls, obj)
+        self.changed(cls)
+
+        return True
 
-        return False
+    def delete_many(self, objs: list[Base]) -> int:
+        """Delete several objects"""
+        return sum(self.delete(obj) for obj in objs)
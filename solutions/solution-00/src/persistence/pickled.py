@@ -1,9 +1,23 @@
 """
 This module exports a Repository that persists data in a pickle file
+
+The writes follow the flush policy of the Flusher
 """
 
+from datetime import datetime
+import os
 import pickle
-from src.persistence.repository import Repository
+import threading
+from typing import Iterator
+from src.models import reset_derived
+from src.persistence.flusher import Flusher
+from src.persistence.indexes import (
+    IndexManager,
+    chunked,
+    matches,
+    page_of,
+)
+from src.persistence.repository import DuplicateIdError, Repository
 from utils.constants import PICKLE_STORAGE_FILENAME
 
 
@@ -11,35 +25,127 @@ class PickleRepository(Repository):
     """Pickle Repository"""
 
     __filename = PICKLE_STORAGE_FILENAME
-    __data: dict[str, list] = {
-        "country": [],
-        "user": [],
-        "amenity": [],
-        "city": [],
-        "review": [],
-        "place": [],
-        "placeamenity": [],
-    }
+    __data: dict[str, dict]
 
     def __init__(self) -> None:
         """Calls reload method"""
+        super().__init__()
+        self.__data = {
+            "user": {},
+            "amenity": {},
+            "city": {},
+            "review": {},
+            "place": {},
+            "placeamenity": {},
+        }
+        self.__indexes = IndexManager()
+        self.__lock = threading.RLock()
         self.reload()
+        self.__flusher = Flusher(self._save_to_file, self.__lock)
 
     def _save_to_file(self):
-        """Helper method to save the current object data to the file"""
-        with open(self.__filename, "wb") as file:
+        """
+        Helper method to save the current object data to the file, a
+        crash while writing leaves the previous file as it was
+        """
+        tmp_filename = self.__filename + ".tmp"
+
+        with open(tmp_filename, "wb") as file:
             pickle.dump(self.__data, file)
 
+        os.replace(tmp_filename, self.__filename)
+
+    def flush(self) -> None:
+        """Writes the pending mutations without waiting for the policy"""
+        self.__flusher.flush()
+
+    def derived_filename(self, name: str) -> str | None:
+        """Path of a side store file next to the data file"""
+        return f"{self.__filename}.{name}"
+
+    @property
+    def writes(self) -> int:
+        """Number of flushes that reached the disk"""
+        return self.__flusher.writes
+
     def get_all(self, model_name: str) -> list:
         """Get all objects of a given model"""
-        return self.__data[model_name]
+        return list(self.__data[model_name].values())
 
     def get(self, model_name: str, obj_id: str):
         """Get an object by its ID"""
-        for obj in self.__data[model_name]:
-            if obj.id == obj_id:
-                return obj
-        return None
+        return self.__data[model_name].get(obj_id)
+
+    def find_by(self, model_name: str, **criteria) -> list:
+        """Get all objects of a model matching the criteria"""
+        found = self.__indexes.find(
+            model_name, criteria, lambda obj_id: self.get(model_name, obj_id)
+        )
+
+        if found is not None:
+            return found
+
+        return [
+            obj for obj in self.get_all(model_name) if matches(obj, criteria)
+        ]
+
+    def find_unique(self, model_name: str, field: str, value: str):
+        """Get the object of a model that owns a value of a unique field"""
+        obj_id = self.__indexes.find_unique(model_name, field, value)
+
+        return None if obj_id is None else self.get(model_name, obj_id)
+
+    def page(
+        self,
+        model_name: str,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list:
+        """Get a page of the objects of a model in `(created_at, id)` order"""
+        with self.__lock:
+            if criteria:
+                return page_of(
+                    self.find_by(model_name, **criteria), after, limit
+                )
+
+            return self.__indexes.page(
+                model_name,
+                lambda: list(self.__data[model_name].values()),
+                lambda obj_id: self.get(model_name, obj_id),
+                after,
+                limit,
+            )
+
+    def walk(
+        self, model_name: str, chunk: int, **criteria
+    ) -> Iterator[list]:
+        """
+        Walks the ordered index without criteria, the objects matching
+        the criteria are found and sorted once, they are already in
+        memory so only the list of them is added
+        """
+        if not criteria:
+            return super().walk(model_name, chunk)
+
+        with self.__lock:
+            found = page_of(self.find_by(model_name, **criteria), None, None)
+
+        return chunked(found, chunk)
+
+    def count(self, model_name: str, **criteria) -> int:
+        """Number of objects of a model matching the criteria"""
+        with self.__lock:
+            if not criteria:
+                return len(self.__data[model_name])
+
+            counted = self.__indexes.count(model_name, criteria)
+
+            return (
+                len(self.find_by(model_name, **criteria))
+                if counted is None
+                else counted
+            )
 
     def reload(self):
         """Reloads the data from the pickle file"""
@@ -47,31 +153,140 @@ class PickleRepository(Repository):
             with open(self.__filename, "rb") as file:
                 self.__data = pickle.load(file)
         except FileNotFoundError:
-            from src.models.country import Country
-
-            self.__data["country"] = [Country("Uruguay", "UY")]
             self._save_to_file()
 
+        # The files written when the countries were stored hold them
+        self.__data.pop("country", None)
+
+        self.__indexes.clear()
+        for model, objects in self.__data.items():
+            if isinstance(objects, list):
+                # Files written before the objects were keyed by id
+                objects = self.__data[model] = {o.id: o for o in objects}
+            for obj in objects.values():
+                self.__indexes.add(model, obj)
+
+        self.changed()
+        reset_derived()
+
+    def _save(self, obj) -> bool:
+        """Stores an object, returns False if it was already stored"""
+        cls = obj.__class__.__name__.lower()
+
+        if obj.id in self.__data[cls]:
+            return False
+
+        self.__indexes.claim([(cls, obj)])
+        self.__data[cls][obj.id] = obj
+        self.__indexes.add(cls, obj)
+        self.changed(cls)
+
+        return True
+
+    def _update(self, obj) -> bool:
+        """Replaces a stored object, returns False if it wasn't stored"""
+        cls = obj.__class__.__name__.lower()
+
+        if obj.id not in self.__data[cls]:
+            return False
+
+        self.__indexes.claim([(cls, obj)])
+        obj.updated_at = datetime.now()
+        self.__data[cls][obj.id] = obj
+        self.__indexes.update(cls, obj)
+        self.changed(cls)
+
+        return True
+
+    def _delete(self, obj) -> bool:
+        """Removes a stored object, returns False if it wasn't stored"""
+        cls = obj.__class__.__name__.lower()
+
+        if self.__data[cls].pop(obj.id, None) is None:
+            return False
+
+        self.__indexes.remove(cls, obj)
+        self.changed(cls)
+
+        return True
+
+    def _claim_batch(self, objs: list, stored: bool) -> None:
+        """
+        Takes the unique values of the objects of a batch that are
+        stored (or not stored yet) before any of them is written, so a
+        taken value fails the whole batch
+        """
+        self.__indexes.claim(
+            (cls, obj)
+            for obj in objs
+            for cls in (obj.__class__.__name__.lower(),)
+            if (obj.id in self.__data[cls]) == stored
+        )
+
+    def _check_new(self, objs: list) -> None:
+        """
+        Raises a DuplicateIdError if one of the objects has the id of a
+        stored object or of another object of the batch
+        """
+        seen = set()
+
+        for obj in objs:
+            cls = obj.__class__.__name__.lower()
+            if obj.id in self.__data[cls] or (cls, obj.id) in seen:
+                raise DuplicateIdError(
+                    f"{type(obj).__name__} with ID {obj.id} already exists"
+                )
+            seen.add((cls, obj.id))
+
     def save(self, obj, save_to_file=True):
         """Save an object"""
-        self.__data[obj.__class__.__name__.lower()].append(obj)
-        if save_to_file:
-            self._save_to_file()
+        with self.__lock:
+            self._check_new([obj])
+            if self._save(obj) and save_to_file:
+                self.__flusher.mutated()
+
+    def save_many(self, objs: list) -> None:
+        """Save several objects with a single write"""
+        with self.__lock:
+            self._check_new(objs)
+            self._claim_batch(objs, stored=False)
+            saved = sum(self._save(obj) for obj in objs)
+            if saved:
+                self.__flusher.mutated(saved)
 
     def update(self, obj):
         """Update an object"""
-        for i, o in enumerate(self.__data[obj.__class__.__name__.lower()]):
-            if o.id == obj.id:
-                self.__data[obj.__class__.__name__.lower()][i] = obj
-                self._save_to_file()
-                return
+        with self.__lock:
+            if not self._update(obj):
+                return None
+            self.__flusher.mutated()
+
+        return obj
+
+    def update_many(self, objs: list) -> list:
+        """Update several objects with a single write"""
+        with self.__lock:
+            self._claim_batch(objs, stored=True)
+            updated = [obj for obj in objs if self._update(obj)]
+            if updated:
+                self.__flusher.mutated(len(updated))
+
+        return updated
 
     def delete(self, obj) -> bool:
         """Delete an object"""
-        for i, o in enumerate(self.__data[obj.__class__.__name__.lower()]):
-            if o.id == obj.id:
-                del self.__data[obj.__class__.__name__.lower()][i]
-                break
+        with self.__lock:
+            if not self._delete(obj):
+                return False
+            self.__flusher.mutated()
 
-        self._save_to_file()
         return True
+
+    def delete_many(self, objs: list) -> int:
+        """Delete several objects with a single write"""
+        with self.__lock:
+            deleted = sum(self._delete(obj) for obj in objs)
+            if deleted:
+                self.__flusher.mutated(deleted)
+
+        return deleted
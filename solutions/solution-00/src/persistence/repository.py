@@ -1,14 +1,84 @@
 """ Repository pattern for data access layer """
 
 from abc import ABC, abstractmethod
+from itertools import count
+import random
+from typing import Iterator
+
+# Shared by every repository, a generation is never given twice in a
+# process, even after a reload, and it starts at a random value so a
+# restarted process does not give back the generations of the last one
+_ticks = count(random.getrandbits(48))
+
+
+class DuplicateIdError(ValueError):
+    """Raised by `save` when an object with the same id is stored"""
 
 
 class Repository(ABC):
-    """Abstract class for repository pattern"""
+    """
+    Abstract class for repository pattern
+
+    Every model has a generation that changes on each mutation of its
+    objects, the implementations call `changed` after saving, updating
+    or deleting objects and after a reload, so anything derived from
+    the objects of a model (like an encoded list) can be cached until
+    the generation moves
+    """
+
+    def __init__(self) -> None:
+        """Starts every model at the same generation"""
+        self.__generations: dict[str, int] = {}
+        self.__base = next(_ticks)
+
+    def generation(self, model_name: str) -> int:
+        """Returns the current generation of a model"""
+        return self.__generations.get(model_name, self.__base)
+
+    def changed(self, model_name: str | None = None) -> None:
+        """
+        Moves the generation of a model after its objects changed,
+        every model moves when no model is given
+        """
+        if model_name is None:
+            self.__base = next(_ticks)
+            self.__generations.clear()
+        else:
+            self.__generations[model_name] = next(_ticks)
+
+    def follows(
+        self, model_name: str, before: int, after: int, wrote: bool
+    ) -> bool:
+        """
+        Checks that the generation of a model went from `before` to
+        `after` only through a write of this process, `wrote` tells if
+        that write was to the model
+
+        The data of this repository is only written by this process,
+        whose writes to the models with side stores don't overlap (see
+        `src.models.derived`)
+        """
+        return wrote or after == before
 
     @abstractmethod
     def reload(self) -> None:
-        """Reload data to the repository"""
+        """
+        Reload data to the repository
+
+        The implementations call `src.models.reset_derived` at the end
+        so the side stores of the models are rebuilt from the new data
+        """
+
+    def derived_filename(self, name: str) -> str | None:
+        """
+        Path of a file next to the stored data where a side store of
+        the models can be persisted, None if the data is not in a file
+        """
+        return None
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Write the pending mutations to the storage"""
 
     @abstractmethod
     def get_all(self, model_name: str) -> list:
@@ -18,14 +88,104 @@ class Repository(ABC):
     def get(self, model_name: str, id: str) -> None:
         """Get an object by id"""
 
+    @abstractmethod
+    def find_by(self, model_name: str, **criteria) -> list:
+        """
+        Get all objects of a model whose fields are equal to the
+        given criteria, using the secondary indexes of the model
+        """
+
+    @abstractmethod
+    def find_unique(self, model_name: str, field: str, value: str):
+        """
+        Get the object of a model whose value of a field declared in its
+        `unique` is the given one, case folded, None if there is none
+
+        The values of these fields are checked by `save`, `save_many`,
+        `update` and `update_many` against every stored object, they
+        raise a ValueError when another object has the value
+        """
+
+    @abstractmethod
+    def page(
+        self,
+        model_name: str,
+        after: tuple[str, str] | None = None,
+        limit: int | None = None,
+        **criteria,
+    ) -> list:
+        """
+        Get at most `limit` objects of a model matching the criteria,
+        ordered by `(created_at, id)` with `created_at` as an ISO
+        string, starting after the key `after`
+
+        Without criteria the walk resumes from the key in an ordered
+        index, the objects before it are not scanned
+        """
+
+    def walk(
+        self, model_name: str, chunk: int, **criteria
+    ) -> Iterator[list]:
+        """
+        Yields the objects of a model matching the criteria in lists of
+        at most `chunk` objects, in `(created_at, id)` order
+
+        Every list is a page read after the key of the last object of
+        the previous one, so only one page is held at a time
+        """
+        after = None
+
+        while True:
+            objs = self.page(model_name, after, chunk, **criteria)
+
+            if objs:
+                yield objs
+
+            if len(objs) < chunk:
+                return
+
+            after = (objs[-1].created_at.isoformat(), objs[-1].id)
+
+    @abstractmethod
+    def count(self, model_name: str, **criteria) -> int:
+        """
+        Number of objects of a model matching the criteria, O(1)
+        without criteria or when an index covers them exactly
+        """
+
     @abstractmethod
     def save(self, obj) -> None:
-        """Save an object"""
+        """
+        Save an object, raises a DuplicateIdError if an object with
+        its id is stored
+        """
+
+    @abstractmethod
+    def save_many(self, objs: list) -> None:
+        """
+        Save several objects in a single write or transaction, none of
+        them if one has the id of a stored object or of another object
+        of the batch, a DuplicateIdError is raised then
+        """
 
     @abstractmethod
     def update(self, obj) -> None:
         """Update an object"""
 
+    @abstractmethod
+    def update_many(self, objs: list) -> list:
+        """
+        Update several objects in a single write or transaction,
+        returns the objects that were found and updated
+        """
+
     @abstractmethod
     def delete(self, obj) -> bool:
         """Delete an object"""
+
+    @abstractmethod
+    def delete_many(self, objs: list) -> int:
+        """
+        Delete several objects in a single write or transaction,
+        returns how many objects were deleted
+        """
@@ -0,0 +1,175 @@
+"""
+This module exports a sorted index over one field of a model
+
+The index is a list of `(value, id)` pairs kept in order with bisect,
+so a range lookup costs O(log n) plus the size of the result, and the
+ids of a range can be walked in value order without sorting them.
+A walk can also resume after a `(value, id)` key, which is what the
+keyset pagination of the lists uses.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+_value = itemgetter(0)
+
+
+class SortedIndex:
+    """Keeps the ids of a set of objects sorted by one of their fields"""
+
+    def __init__(
+        self,
+        field: str,
+        objs: Iterable = (),
+        value: Callable[[Any], Any] | None = None,
+    ) -> None:
+        """
+        Builds the index from the given objects, `value` returns the
+        indexed value of an object or of a raw record instead of its
+        `field`, like a datetime field as an ISO string
+        """
+        self.field = field
+        self.__value = value
+        self.__values: dict[str, Any] = {}
+        for obj in objs:
+            value = self._get(obj)
+            if value is not None:
+                self.__values[self._id(obj)] = value
+        self.__keys = sorted(
+            (value, obj_id) for obj_id, value in self.__values.items()
+        )
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of indexed objects"""
+        return len(self.__keys)
+
+    @staticmethod
+    def _id(obj: Any) -> str:
+        """Returns the id of an object or of a raw record"""
+        return obj["id"] if isinstance(obj, dict) else obj.id
+
+    def _get(self, obj: Any) -> Any:
+        """Returns the indexed field of an object or of a raw record"""
+        if self.__value is not None:
+            return self.__value(obj)
+
+        if isinstance(obj, dict):
+            return obj.get(self.field)
+
+        return getattr(obj, self.field, None)
+
+    def add(self, obj: Any) -> None:
+        """Adds an object, or moves it if its value changed"""
+        obj_id = self._id(obj)
+        value = self._get(obj)
+
+        with self.__lock:
+            if self.__values.get(obj_id) == value and value is not None:
+                return
+
+            self._discard(obj_id)
+
+            if value is None:
+                return
+
+            self.__values[obj_id] = value
+            insort(self.__keys, (value, obj_id))
+
+    def update(self, obj: Any) -> None:
+        """Moves an object after its field changed"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Removes an object"""
+        with self.__lock:
+            self._discard(obj_id)
+
+    def _discard(self, obj_id: str) -> None:
+        """Removes an object, the lock must be held"""
+        value = self.__values.pop(obj_id, None)
+
+        if value is None:
+            return
+
+        position = bisect_left(self.__keys, (value, obj_id))
+        del self.__keys[position]
+
+    def _bounds(self, low: Any, high: Any) -> tuple[int, int]:
+        """Returns the positions of the inclusive `[low, high]` range"""
+        start = 0 if low is None else bisect_left(self.__keys, low, key=_value)
+        end = (
+            len(self.__keys)
+            if high is None
+            else bisect_right(self.__keys, high, key=_value)
+        )
+
+        return start, max(start, end)
+
+    def count(self, low: Any = None, high: Any = None) -> int:
+        """Number of objects whose value is in `[low, high]`"""
+        with self.__lock:
+            start, end = self._bounds(low, high)
+
+        return end - start
+
+    def range(
+        self, low: Any = None, high: Any = None, reverse: bool = False
+    ) -> Iterator[str]:
+        """
+        Yields the ids of the objects whose value is in `[low, high]`,
+        None leaves that end open, ordered by value (then id)
+
+        Like `after`, every chunk of ids is looked up again from the
+        last key it yielded, so the index can change while the caller
+        consumes them lazily and no id is skipped or repeated
+        """
+        chunk = 1024
+        last = None
+
+        while True:
+            with self.__lock:
+                start, end = self._bounds(low, high)
+
+                if last is not None and reverse:
+                    end = min(end, bisect_left(self.__keys, last))
+                elif last is not None:
+                    start = max(start, bisect_right(self.__keys, last))
+
+                if reverse:
+                    keys = self.__keys[max(start, end - chunk):end]
+                    keys.reverse()
+                else:
+                    keys = self.__keys[start:min(end, start + chunk)]
+
+            if not keys:
+                return
+
+            yield from map(itemgetter(1), keys)
+
+            last = keys[-1]
+
+    def after(self, key: tuple | None = None) -> Iterator[str]:
+        """
+        Yields the ids ordered by value then id, starting after the
+        `(value, id)` key, or from the first one without a key
+
+        Every chunk of ids is looked up again after the last key it
+        yielded, so the index can change while the caller consumes
+        them lazily and no id is skipped or repeated
+        """
+        chunk = 1024
+
+        while True:
+            with self.__lock:
+                start = 0 if key is None else bisect_right(self.__keys, key)
+                keys = self.__keys[start:start + chunk]
+
+            if not keys:
+                return
+
+            yield from map(itemgetter(1), keys)
+
+            key = keys[-1]
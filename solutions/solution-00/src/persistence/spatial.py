@@ -0,0 +1,210 @@
+"""
+This module exports a spatial index over the coordinates of a model
+
+The index is a grid of fixed size cells in degrees, every object is
+kept in the cell holding its `(latitude, longitude)`. A radius query
+only computes the great-circle distance of the objects in the cells
+overlapping the bounding box of the circle, and a k-nearest query runs
+radius queries with a growing radius until it finds k objects.
+"""
+
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+import threading
+from typing import Any, Iterable
+
+EARTH_RADIUS_KM = 6371.0088
+# Half of the circumference, no two points are further apart
+MAX_DISTANCE_KM = EARTH_RADIUS_KM * 3.141592653589793
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points with the haversine formula"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+class GeoGrid:
+    """Keeps the ids of a set of objects in a grid over their coordinates"""
+
+    def __init__(
+        self,
+        cell_degrees: float = 0.5,
+        objs: Iterable = (),
+        lat_field: str = "latitude",
+        lon_field: str = "longitude",
+    ) -> None:
+        """Builds the index from the given objects"""
+        self.__cell = cell_degrees
+        self.__rows = int(floor(180 / cell_degrees)) + 1
+        self.__columns = int(floor(360 / cell_degrees)) + 1
+        self.__lat_field = lat_field
+        self.__lon_field = lon_field
+        self.__cells: dict[tuple[int, int], dict[str, tuple]] = {}
+        self.__points: dict[str, tuple[tuple[int, int], float, float]] = {}
+        self.__lock = threading.Lock()
+
+        for obj in objs:
+            self.add(obj)
+
+    def __len__(self) -> int:
+        """Number of indexed objects"""
+        return len(self.__points)
+
+    def _coordinates(self, obj: Any) -> tuple[float, float] | None:
+        """
+        Returns the coordinates of an object or of a raw record, None
+        if it has no valid coordinates
+        """
+        if isinstance(obj, dict):
+            lat, lon = obj.get(self.__lat_field), obj.get(self.__lon_field)
+        else:
+            lat = getattr(obj, self.__lat_field, None)
+            lon = getattr(obj, self.__lon_field, None)
+
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return None
+
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None
+
+        return lat, lon
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        """Returns the cell holding a point"""
+        return (
+            int(floor((lat + 90) / self.__cell)),
+            int(floor((lon + 180) / self.__cell)),
+        )
+
+    def _column_range(self, west: float, east: float) -> range:
+        """Returns the columns between two longitudes in [-180, 180]"""
+        return range(
+            int(floor((west + 180) / self.__cell)),
+            int(floor((east + 180) / self.__cell)) + 1,
+        )
+
+    def add(self, obj: Any) -> None:
+        """Adds an object, or moves it if its coordinates changed"""
+        obj_id = obj["id"] if isinstance(obj, dict) else obj.id
+        coordinates = self._coordinates(obj)
+
+        with self.__lock:
+            self._discard(obj_id)
+
+            if coordinates is None:
+                return
+
+            cell = self._cell(*coordinates)
+            self.__cells.setdefault(cell, {})[obj_id] = coordinates
+            self.__points[obj_id] = (cell, *coordinates)
+
+    def update(self, obj: Any) -> None:
+        """Moves an object after its coordinates changed"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Removes an object"""
+        with self.__lock:
+            self._discard(obj_id)
+
+    def _discard(self, obj_id: str) -> None:
+        """Removes an object, the lock must be held"""
+        point = self.__points.pop(obj_id, None)
+
+        if point is None:
+            return
+
+        cell = self.__cells[point[0]]
+        del cell[obj_id]
+        if not cell:
+            del self.__cells[point[0]]
+
+    def _cells(self, lat: float, lon: float, radius_km: float) -> Iterable:
+        """Returns the non empty cells overlapping the circle bounds"""
+        angle = radius_km / EARTH_RADIUS_KM
+        low, high = lat - degrees(angle), lat + degrees(angle)
+
+        if low <= -90 or high >= 90 or angle >= 3.14:
+            # The circle holds a pole, every longitude is in range
+            columns: Iterable[int] = range(self.__columns)
+        else:
+            # Bounding box of a circle on a sphere
+            spread = degrees(asin(min(1.0, sin(angle) / cos(radians(lat)))))
+            west, east = lon - spread, lon + spread
+            if east - west >= 360:
+                columns = range(self.__columns)
+            elif west < -180:
+                # The box crosses the antimeridian, -180 and 180 are
+                # the same meridian but not the same column
+                columns = {
+                    *self._column_range(-180, east),
+                    *self._column_range(west + 360, 180),
+                }
+            elif east > 180:
+                columns = {
+                    *self._column_range(west, 180),
+                    *self._column_range(-180, east - 360),
+                }
+            else:
+                columns = self._column_range(west, east)
+
+        rows = range(
+            max(0, int(floor((low + 90) / self.__cell))),
+            min(self.__rows, int(floor((high + 90) / self.__cell)) + 1),
+        )
+
+        if len(rows) * len(columns) > len(self.__cells):
+            # Fewer cells are used than covered by the bounds
+            return [
+                cell
+                for key, cell in self.__cells.items()
+                if key[0] in rows and key[1] in columns
+            ]
+
+        return [
+            self.__cells[key]
+            for key in ((i, j) for i in rows for j in columns)
+            if key in self.__cells
+        ]
+
+    def within(
+        self, lat: float, lon: float, radius_km: float
+    ) -> list[tuple[float, str]]:
+        """
+        Returns the `(distance in km, id)` of the objects at most
+        `radius_km` away from the point, nearest first
+        """
+        found = []
+
+        with self.__lock:
+            for cell in self._cells(lat, lon, radius_km):
+                for obj_id, (obj_lat, obj_lon) in cell.items():
+                    distance = distance_km(lat, lon, obj_lat, obj_lon)
+                    if distance <= radius_km:
+                        found.append((distance, obj_id))
+
+        found.sort()
+
+        return found
+
+    def nearest(
+        self, lat: float, lon: float, count: int
+    ) -> list[tuple[float, str]]:
+        """Returns the `(distance in km, id)` of the `count` nearest objects"""
+        if count <= 0:
+            return []
+
+        radius = self.__cell * 111.0
+
+        while True:
+            found = self.within(lat, lon, radius)
+            if len(found) >= count or radius >= MAX_DISTANCE_KM:
+                return found[:count]
+            radius *= 4
@@ -0,0 +1,124 @@
+"""
+This module exports a unique index over one field of a model, like the
+email of the users
+
+The values are normalized (case folded, surrounding spaces stripped)
+before they are compared, so "Ann@Mail.com" and "ann@mail.com" are the
+same value. Checking that a value is free and taking it is one atomic
+`claim`, two concurrent signups with the same email can not both pass
+the check.
+
+The repositories that keep their data in the process keep one of these
+per unique field of a model (see IndexManager) and claim the values in
+their save and update, under their lock. The database enforces the same
+with a UNIQUE index on a normalized column.
+"""
+
+import threading
+from typing import Any, Iterable
+
+
+def normalize(value: str) -> str:
+    """Returns the form of a value that is compared for uniqueness"""
+    return value.strip().casefold()
+
+
+class UniqueIndex:
+    """Maps the normalized values of a field to the id that owns them"""
+
+    def __init__(self, field: str, objs: Iterable = ()) -> None:
+        """
+        Builds the index from the given objects or raw records, if
+        several of them already share a value the first one owns it
+        """
+        self.field = field
+        self.__owners: dict[str, str] = {}
+        self.__claims: dict[str, set[str]] = {}
+        self.__lock = threading.Lock()
+
+        for obj in objs:
+            self.add(obj)
+
+    def __len__(self) -> int:
+        """Number of indexed values"""
+        return len(self.__owners)
+
+    def key(self, obj: Any) -> str | None:
+        """
+        Returns the normalized value of an object or of a raw record,
+        None if it has no string value
+        """
+        if isinstance(obj, dict):
+            value = obj.get(self.field)
+        else:
+            value = getattr(obj, self.field, None)
+
+        return normalize(value) if isinstance(value, str) else None
+
+    def get(self, value: str) -> str | None:
+        """Returns the id that owns a value"""
+        with self.__lock:
+            return self.__owners.get(normalize(value))
+
+    def claim(self, obj_id: str, value: str) -> bool:
+        """
+        Takes a value for an object, raises a ValueError if another
+        object owns it
+
+        Returns False if the object already owned it
+        """
+        key = normalize(value)
+
+        with self.__lock:
+            owner = self.__owners.setdefault(key, obj_id)
+
+            if owner != obj_id:
+                raise ValueError(f"{self.field} already in use")
+
+            claims = self.__claims.setdefault(obj_id, set())
+            taken = key not in claims
+            claims.add(key)
+
+            return taken
+
+    def release(self, obj_id: str, value: str) -> None:
+        """Gives back a value claimed by an object"""
+        key = normalize(value)
+
+        with self.__lock:
+            if self.__owners.get(key) != obj_id:
+                return
+
+            del self.__owners[key]
+            claims = self.__claims[obj_id]
+            claims.discard(key)
+            if not claims:
+                del self.__claims[obj_id]
+
+    def add(self, obj: Any) -> None:
+        """
+        Keeps only the value the object or raw record has now, taken
+        if no other object owns it, the other values it claimed are
+        released
+        """
+        key = self.key(obj)
+        obj_id = obj["id"] if isinstance(obj, dict) else obj.id
+
+        with self.__lock:
+            for claimed in self.__claims.pop(obj_id, set()):
+                if claimed != key:
+                    del self.__owners[claimed]
+
+            if key is not None:
+                if self.__owners.setdefault(key, obj_id) == obj_id:
+                    self.__claims[obj_id] = {key}
+
+    def update(self, obj: Any) -> None:
+        """Releases the previous value of an object after it changed"""
+        self.add(obj)
+
+    def remove(self, obj_id: str) -> None:
+        """Releases every value of an object"""
+        with self.__lock:
+            for key in self.__claims.pop(obj_id, set()):
+                del self.__owners[key]
@@ -4,10 +4,17 @@ This module contains the routes for the places blueprint
 
 from flask import Blueprint
 from src.controllers.places import (
+    add_place_amenity,
     create_place,
+    create_places_batch,
     delete_place,
+    delete_place_amenity,
+    get_place_amenities,
     get_place_by_id,
+    get_nearby_places,
     get_places,
+    get_top_places,
+    search_places,
     update_place,
 )
 
@@ -15,7 +22,19 @@ places_bp = Blueprint("places", __name__, url_prefix="/places")
 
 places_bp.route("/", methods=["GET"])(get_places)
 places_bp.route("/", methods=["POST"])(create_place)
+places_bp.route("/batch", methods=["POST"])(create_places_batch)
+places_bp.route("/search", methods=["GET"])(search_places)
+places_bp.route("/nearby", methods=["GET"])(get_nearby_places)
+places_bp.route("/top", methods=["GET"])(get_top_places)
 
 places_bp.route("/<place_id>", methods=["GET"])(get_place_by_id)
 places_bp.route("/<place_id>", methods=["PUT"])(update_place)
 places_bp.route("/<place_id>", methods=["DELETE"])(delete_place)
+
+places_bp.route("/<place_id>/amenities", methods=["GET"])(get_place_amenities)
+places_bp.route("/<place_id>/amenities/<amenity_id>", methods=["POST"])(
+    add_place_amenity
+)
+places_bp.route("/<place_id>/amenities/<amenity_id>", methods=["DELETE"])(
+    delete_place_amenity
+)
@@ -5,19 +5,27 @@ This module contains the routes for the reviews blueprint
 from flask import Blueprint
 from src.controllers.reviews import (
     create_review,
+    create_reviews_batch,
     delete_review,
+    get_place_rating,
     get_reviews_from_place,
     get_reviews_from_user,
     get_review_by_id,
     get_reviews,
+    get_user_rating,
     update_review,
 )
 
 reviews_bp = Blueprint("reviews", __name__)
 
 reviews_bp.route("/places/<place_id>/reviews", methods=["POST"])(create_review)
+reviews_bp.route(
+    "/places/<place_id>/reviews/batch", methods=["POST"]
+)(create_reviews_batch)
 reviews_bp.route("/places/<place_id>/reviews")(get_reviews_from_place)
 reviews_bp.route("/users/<user_id>/reviews")(get_reviews_from_user)
+reviews_bp.route("/places/<place_id>/rating")(get_place_rating)
+reviews_bp.route("/users/<user_id>/rating")(get_user_rating)
 
 reviews_bp.route("/reviews", methods=["GET"])(get_reviews)
 
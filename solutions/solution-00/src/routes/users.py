@@ -5,6 +5,7 @@ This module contains the routes for the users endpoints.
 from flask import Blueprint
 from src.controllers.users import (
     create_user,
+    create_users_batch,
     delete_user,
     get_user_by_id,
     get_users,
@@ -15,6 +16,7 @@ users_bp = Blueprint("users", __name__, url_prefix="/users")
 
 users_bp.route("/", methods=["GET"])(get_users)
 users_bp.route("/", methods=["POST"])(create_user)
+users_bp.route("/batch", methods=["POST"])(create_users_batch)
 
 users_bp.route("/<user_id>", methods=["GET"])(get_user_by_id)
 users_bp.route("/<user_id>", methods=["PUT"])(update_user)
@@ -0,0 +1,86 @@
+""" This script checks the filters of the columnar store, with NumPy
+and with the plain array scans, including the ints past 64 bits."""
+
+import unittest
+from unittest import mock
+
+from src.persistence import columns
+from src.persistence.columns import ColumnStore
+
+ROWS = {
+    "a": {"price": 80, "guests": 2, "lat": 10.5},
+    "b": {"price": 150, "guests": 6, "lat": -20.0},
+    "c": {"price": 2**70, "guests": 4, "lat": 0.0},
+    "d": {"price": -(2**70), "guests": 6, "lat": 45.0},
+    "e": {"price": 2**63 - 1, "guests": 1, "lat": 89.0},
+}
+
+
+class TestColumns(unittest.TestCase):
+    """Runs every test with and without NumPy"""
+
+    def store(self) -> ColumnStore:
+        """A store holding the ROWS"""
+        store = ColumnStore({"price": "q", "guests": "q", "lat": "d"})
+        for obj_id, row in ROWS.items():
+            store.add({"id": obj_id, **row})
+        return store
+
+    def check(self, test) -> None:
+        """Runs a test against the NumPy and the array scans"""
+        for numpy in {columns.numpy, None}:
+            with self.subTest(numpy=numpy is not None), mock.patch.object(
+                columns, "numpy", numpy
+            ):
+                test(self.store())
+
+    def test_filter(self):
+        """The equalities and the ranges give the matching ids"""
+
+        def test(store: ColumnStore) -> None:
+            """Compares the filters with the expected ids"""
+            self.assertEqual(store.filter(guests=6), ["b", "d"])
+            self.assertEqual(store.filter(price=(None, 150)), ["a", "b", "d"])
+            self.assertEqual(store.filter(price=(100, None)), ["b", "c", "e"])
+            self.assertEqual(store.filter(price=2**70), ["c"])
+            self.assertEqual(store.filter(price=(2**63, None)), ["c"])
+            self.assertEqual(
+                store.filter(price=(None, 2**63 - 1)), ["a", "b", "d", "e"]
+            )
+            self.assertEqual(
+                store.filter(guests=(4, None), lat=(-30.0, 1.0)), ["b", "c"]
+            )
+            self.assertEqual(store.filter(price=(2**71, None)), [])
+            with self.assertRaises(ValueError):
+                store.filter(name="a")
+
+        self.check(test)
+
+    def test_sync(self):
+        """The updates and the removals are seen by the filters"""
+
+        def test(store: ColumnStore) -> None:
+            """Moves the rows in and out of the boxed values"""
+            store.update({"id": "c", "price": 90, "guests": 4, "lat": 0.0})
+            self.assertEqual(store.filter(price=(None, 100)), ["a", "c", "d"])
+
+            store.update({"id": "a", "price": 2**64, "guests": 2, "lat": 0})
+            self.assertEqual(store.filter(price=(100, None)), ["a", "b", "e"])
+
+            store.remove("a")
+            store.remove("d")
+            self.assertEqual(len(store), 3)
+            self.assertEqual(
+                store.filter(price=(None, 2**65)), ["b", "c", "e"]
+            )
+
+            # The row of a removed object is reused without its values
+            store.add({"id": "f", "price": 5, "guests": 2, "lat": 0.0})
+            self.assertEqual(store.filter(guests=2), ["f"])
+            self.assertEqual(store.filter(price=(None, 2**65)).count("f"), 1)
+
+        self.check(test)
+
+
+if __name__ == "__main__":
+    unittest.main()
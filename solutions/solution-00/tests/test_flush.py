@@ -0,0 +1,104 @@
+""" This script checks the flush policy of the repositories persisting
+data to disk: the writes are coalesced and the last ones reach the disk
+when the process exits."""
+
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Posts the users in a process of its own, which exits normally after
+# printing the number of writes the repository did until then
+SCRIPT = """
+from src import create_app
+from src.persistence import repo
+
+client = create_app().test_client()
+
+for i in range({count}):
+    response = client.post(
+        "/users",
+        json={{"email": f"user{{i}}@flush.com", "first_name": "a",
+               "last_name": "b"}},
+    )
+    assert response.status_code == 201, response.text
+
+print(repo.writes)
+"""
+
+
+class TestFlush(unittest.TestCase):
+    """Runs the posts with a deferred flush policy"""
+
+    def run_posts(self, repository: str, count: int, **policy) -> tuple:
+        """
+        Posts `count` users with the given repository and flush policy,
+        returns the writes done before the exit and the users on disk
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "PYTHONPATH": ROOT,
+                "REPOSITORY": repository,
+                "FLUSH_INTERVAL_MS": str(policy.get("interval_ms", 0)),
+                "FLUSH_EVERY": str(policy.get("every", 0)),
+            }
+            result = subprocess.run(
+                [sys.executable, "-c", SCRIPT.format(count=count)],
+                cwd=directory,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=300,
+                check=True,
+            )
+            writes = int(result.stdout.split()[-1])
+
+            if repository == "pickle":
+                with open(os.path.join(directory, "data.pkl"), "rb") as f:
+                    users = pickle.load(f)["user"]
+            else:
+                with open(os.path.join(directory, "data.json")) as f:
+                    users = json.load(f)["user"]
+
+            self.assertEqual(
+                [name for name in os.listdir(directory)
+                 if name.endswith(".tmp")],
+                [],
+            )
+
+        return writes, len(users)
+
+    def test_every(self):
+        """The posts are written once every FLUSH_EVERY mutations"""
+        for repository in ("pickle", "file"):
+            with self.subTest(repository=repository):
+                writes, users = self.run_posts(repository, 1000, every=250)
+                self.assertGreaterEqual(writes, 1)
+                self.assertLessEqual(writes, 4)
+                self.assertEqual(users, 1000)
+
+    def test_interval(self):
+        """The posts are written at most once every FLUSH_INTERVAL_MS"""
+        writes, users = self.run_posts("pickle", 1000, interval_ms=500)
+        self.assertLessEqual(writes, 20)
+        self.assertEqual(users, 1000)
+
+    def test_shutdown(self):
+        """The posts not written yet are flushed when the process exits"""
+        for repository in ("pickle", "file"):
+            with self.subTest(repository=repository):
+                writes, users = self.run_posts(
+                    repository, 100, interval_ms=3600 * 1000
+                )
+                self.assertEqual(writes, 0)
+                self.assertEqual(users, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+""" This script checks the journal mode of the file repository: the
+journaled mutations are replayed on reload, the journal is compacted
+into the snapshot and a torn record at its end is dropped."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.models.user import User
+from src.persistence.file import FileRepository
+
+# The writes are immediate and the journal mode comes from FILE_JOURNAL
+ENV = {"FILE_JOURNAL": "1", "FLUSH_INTERVAL_MS": "0", "FLUSH_EVERY": "0"}
+
+
+class TestJournal(unittest.TestCase):
+    """Writes through a repository and reads back through a new one"""
+
+    def setUp(self):
+        """Each test has its own snapshot and journal files"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "data.json")
+        self.journal = self.filename + ".log"
+
+        patcher = mock.patch.dict(os.environ, ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def repository(self, **kw) -> FileRepository:
+        """A repository reloading the files of the test"""
+        return FileRepository(self.filename, **kw)
+
+    def snapshot_users(self) -> list:
+        """The users of the snapshot file"""
+        with open(self.filename) as file:
+            return json.load(file)["user"]
+
+    def write_users(self) -> list[User]:
+        """Saves, updates and deletes users, returns the ones kept"""
+        repo = self.repository()
+        users = [
+            User(f"user{i}@journal.com", "first", "last") for i in range(3)
+        ]
+
+        for user in users:
+            repo.save(user)
+
+        users[0].first_name = "updated"
+        repo.update(users[0])
+        repo.delete(users[1])
+
+        return [users[0], users[2]]
+
+    def test_replay(self):
+        """The snapshot and the journal give back the data"""
+        kept = self.write_users()
+
+        # Only the journal was written since the empty snapshot
+        self.assertEqual(self.snapshot_users(), [])
+        with open(self.journal) as file:
+            self.assertEqual(len(file.readlines()), 5)
+
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                repo = self.repository(lazy=lazy)
+                self.assertEqual(
+                    sorted(user.id for user in repo.get_all("user")),
+                    sorted(user.id for user in kept),
+                )
+                self.assertEqual(
+                    repo.get("user", kept[0].id).first_name, "updated"
+                )
+                self.assertEqual(
+                    repo.find_unique("user", "email", kept[1].email).id,
+                    kept[1].id,
+                )
+
+    def test_torn_record(self):
+        """A truncated record at the end of the journal is skipped"""
+        kept = self.write_users()
+
+        with open(self.journal, "a") as file:
+            file.write('{"op": "save", "model": "user", "data": {"id"')
+
+        repo = self.repository()
+        self.assertEqual(
+            sorted(user.id for user in repo.get_all("user")),
+            sorted(user.id for user in kept),
+        )
+
+        # The repository appends after the torn record was dropped
+        user = User("new@journal.com", "first", "last")
+        repo.save(user)
+        self.assertIsNotNone(self.repository().get("user", user.id))
+
+    def test_compaction(self):
+        """The journal is folded into the snapshot past its size limit"""
+        with mock.patch(
+            "src.persistence.file.FILE_JOURNAL_COMPACT_SIZE", 2048
+        ):
+            repo = self.repository()
+            users = []
+
+            while not self.snapshot_users():
+                user = User(f"user{len(users)}@journal.com", "a", "b")
+                repo.save(user)
+                users.append(user)
+
+                with open(self.journal) as file:
+                    self.assertLessEqual(len(file.read()), 2048 + 1024)
+
+            self.assertEqual(os.path.getsize(self.journal), 0)
+            self.assertEqual(len(self.snapshot_users()), len(users))
+
+            # The users saved after the compaction go to the journal
+            user = User("last@journal.com", "a", "b")
+            repo.save(user)
+            users.append(user)
+            self.assertGreater(os.path.getsize(self.journal), 0)
+
+            self.assertEqual(
+                sorted(user.id for user in self.repository().get_all("user")),
+                sorted(user.id for user in users),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
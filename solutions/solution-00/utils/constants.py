@@ -2,5 +2,15 @@
 
 REPOSITORY_ENV_VAR = "REPOSITORY"
 
+DATABASE_URL_ENV_VAR = "DATABASE_URL"
+DEFAULT_DATABASE_URL = "sqlite:///hbnb_dev.db"
+
 FILE_STORAGE_FILENAME = "data.json"
+FILE_JOURNAL_ENV_VAR = "FILE_JOURNAL"
+FILE_JOURNAL_SUFFIX = ".log"
+FILE_JOURNAL_COMPACT_SIZE = 16 * 1024 * 1024  # bytes
+FILE_LAZY_ENV_VAR = "FILE_LAZY"
 PICKLE_STORAGE_FILENAME = "data.pkl"
+
+FLUSH_INTERVAL_ENV_VAR = "FLUSH_INTERVAL_MS"
+FLUSH_EVERY_ENV_VAR = "FLUSH_EVERY"
@@ -16,6 +16,9 @@ def main():
             test_users.test_post_user,
             test_users.test_put_user,
             test_users.test_delete_user,
+            test_users.test_post_users_batch,
+            test_users.test_get_user_by_email,
+            test_users.test_get_users_not_modified,
         ]
     )
 
@@ -30,6 +33,7 @@ def main():
             test_countries.test_post_city,
             test_countries.test_put_city,
             test_countries.test_delete_city,
+            test_countries.test_iso_countries,
         ]
     )
 
@@ -41,6 +45,7 @@ def main():
             test_amenities.test_post_amenity,
             test_amenities.test_put_amenity,
             test_amenities.test_delete_amenity,
+            test_amenities.test_conditional_amenity,
         ]
     )
 
@@ -52,6 +57,14 @@ def main():
             test_places.test_post_place,
             test_places.test_put_place,
             test_places.test_delete_place,
+            test_places.test_search_places,
+            test_places.test_get_nearby_places,
+            test_places.test_place_amenities,
+            test_places.test_get_top_places,
+            test_places.test_full_text_search,
+            test_places.test_delete_place_cascades,
+            test_places.test_stream_places,
+            test_places.test_get_places_fields,
         ]
     )
 
@@ -64,6 +77,9 @@ def main():
             test_reviews.test_post_review,
             test_reviews.test_put_review,
             test_reviews.test_delete_review,
+            test_reviews.test_post_reviews_batch,
+            test_reviews.test_get_place_rating,
+            test_reviews.test_get_reviews_pages,
         ]
     )
 
@@ -119,6 +119,56 @@ def test_delete_amenity():
     ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
 
 
+def test_conditional_amenity():
+    """
+    Test to get and update an amenity with its ETag
+    Gets an amenity again with If-None-Match and If-Modified-Since and expects
+    304, then updates it with a stale If-Match (412) and with its ETag (200).
+    """
+    amenity_id = create_unique_amenity()
+    url = f"{API_URL}/amenities/{amenity_id}"
+
+    response = requests.get(url)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    assert (
+        etag and last_modified
+    ), f"Expected an ETag and a Last-Modified but got {response.headers}"
+
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-Modified-Since": last_modified},
+    ):
+        response = requests.get(url, headers=headers)
+        assert (
+            response.status_code == 304
+        ), f"Expected status code 304 with {headers} but got {response.status_code}. Response: {response.text}"
+
+    response = requests.put(url, json={"name": f"Amenity {uuid.uuid4()}"})
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    new_etag = response.headers.get("ETag")
+    assert new_etag != etag, "Expected a new ETag after the update"
+
+    response = requests.put(
+        url, json={"name": "Stale"}, headers={"If-Match": etag}
+    )
+    assert (
+        response.status_code == 412
+    ), f"Expected status code 412 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.put(
+        url, json={"name": "Fresh"}, headers={"If-Match": new_etag}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert (
+        response.json()["name"] == "Fresh"
+    ), f"Expected the name Fresh but got {response.json()}"
+
+
 if __name__ == "__main__":
     # Run the tests
     test_functions(
@@ -128,5 +178,6 @@ if __name__ == "__main__":
             test_get_amenity,
             test_put_amenity,
             test_delete_amenity,
+            test_conditional_amenity,
         ]
     )
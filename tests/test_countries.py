@@ -128,7 +128,8 @@ def test_put_city():
     """
     Test to update an existing city
     Creates a new city, then sends a PUT request to /cities/{id} with updated city data
-    and checks that the response status is 200 and the returned data matches the updated data.
+    and checks that the response status is 200 and the returned data matches the updated data,
+    then checks that the country can't be updated to one that doesn't exist.
     """
     city_id = test_post_city()
     updated_city = {"name": f"Updated City {uuid.uuid4()}", "country_code": "US"}
@@ -147,6 +148,18 @@ def test_put_city():
     assert "created_at" in city_data, "Created_at not in response"
     assert "updated_at" in city_data, "Updated_at not in response"
 
+    response = requests.put(
+        f"{API_URL}/cities/{city_id}", json={"country_code": "ZZ"}
+    )
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/cities/{city_id}")
+    assert (
+        response.json()["country_code"] == "US"
+    ), f"Expected the country to be unchanged. Response: {response.text}"
+
 
 def test_delete_city():
     """
@@ -163,6 +176,39 @@ def test_delete_city():
     ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
 
 
+def test_iso_countries():
+    """
+    Test to retrieve the ISO 3166-1 countries
+    Checks that GET /countries lists every ISO 3166-1 country, that another
+    country than Uruguay can be retrieved and used by a city, and that an
+    unknown code is not found.
+    """
+    response = requests.get(f"{API_URL}/countries")
+    codes = [country["code"] for country in response.json()]
+    assert len(codes) == 249, f"Expected 249 countries but got {len(codes)}"
+    assert codes == sorted(codes), "Expected the countries ordered by code"
+
+    response = requests.get(f"{API_URL}/countries/FR")
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert response.json() == {
+        "code": "FR", "name": "France"
+    }, f"Unexpected country {response.json()}"
+
+    response = requests.post(
+        f"{API_URL}/cities", json={"name": "Lyon", "country_code": "FR"}
+    )
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/countries/XX")
+    assert (
+        response.status_code == 404
+    ), f"Expected status code 404 but got {response.status_code}. Response: {response.text}"
+
+
 if __name__ == "__main__":
     # Run the tests
     test_functions(
@@ -175,5 +221,6 @@ if __name__ == "__main__":
             test_get_city,
             test_put_city,
             test_delete_city,
+            test_iso_countries,
         ]
     )
@@ -1,5 +1,7 @@
 """ Implement the Places Management Endpoints """
 
+import json
+import random
 import requests
 import uuid
 
@@ -136,7 +138,9 @@ def test_put_place():
     """
     Test to update an existing place
     Creates a new place, then sends a PUT request to /places/{id} with updated place data
-    and checks that the response status is 200 and the returned data matches the updated data.
+    and checks that the response status is 200 and the returned data matches the updated data,
+    then checks that the id and the timestamps can't be updated, nor the host and the city
+    to ones that don't exist.
     """
     city_id = create_city()
     user_id = create_unique_user()
@@ -186,6 +190,28 @@ def test_put_place():
     assert "created_at" in place_data, "Created_at not in response"
     assert "updated_at" in place_data, "Updated_at not in response"
 
+    for read_only in ({"id": "hijack"}, {"created_at": "2020-01-01"}):
+        response = requests.put(
+            f"{API_URL}/places/{place_id}", json=read_only
+        )
+        assert (
+            response.status_code == 400
+        ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    for reference in ({"host_id": "nope"}, {"city_id": "nope"}):
+        response = requests.put(
+            f"{API_URL}/places/{place_id}", json=reference
+        )
+        assert (
+            response.status_code == 400
+        ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/places/{place_id}")
+    assert (
+        response.json()["host_id"] == user_id
+        and response.json()["city_id"] == city_id
+    ), f"Expected the host and the city to be unchanged. Response: {response.text}"
+
 
 def test_delete_place():
     """
@@ -221,6 +247,470 @@ def test_delete_place():
     ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
 
 
+def test_search_places():
+    """
+    Test to search places by city, price and guests
+    Creates two places in a new city, then sends a GET request to /places/search
+    and checks that only the place matching the filters is returned, then checks that
+    a price past 64 bits is found by a price range without a city.
+    """
+    city_id = create_city()
+    user_id = create_unique_user()
+    for price, guests in ((80, 2), (150, 6)):
+        new_place = {
+            "name": "Search Place",
+            "host_id": user_id,
+            "city_id": city_id,
+            "price_per_night": price,
+            "max_guests": guests,
+        }
+        response = requests.post(f"{API_URL}/places", json=new_place)
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(
+        f"{API_URL}/places/search",
+        params={"city_id": city_id, "max_price": 200, "min_guests": 4},
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    places = response.json()
+    assert len(places) == 1, f"Expected 1 place but got {len(places)}"
+    assert (
+        places[0]["price_per_night"] == 150
+    ), f"Expected the place for 6 guests but got {places[0]}"
+
+    response = requests.get(
+        f"{API_URL}/places/search",
+        params={"city_id": city_id, "sort": "-price_per_night", "limit": 1},
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert [p["price_per_night"] for p in response.json()] == [
+        150
+    ], f"Expected the most expensive place but got {response.json()}"
+
+    response = requests.get(f"{API_URL}/places/search", params={"sort": "name"})
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    huge_place = {
+        "name": "Huge Price Place",
+        "host_id": user_id,
+        "city_id": city_id,
+        "price_per_night": 2**70,
+    }
+    response = requests.post(f"{API_URL}/places", json=huge_place)
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    place_id = response.json()["id"]
+
+    response = requests.get(
+        f"{API_URL}/places/search", params={"min_price": 2**69}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert place_id in [
+        p["id"] for p in response.json()
+    ], f"Expected the place priced {2**70} but got {response.json()}"
+    assert all(
+        p["price_per_night"] >= 2**69 for p in response.json()
+    ), f"Expected only places priced from {2**69} but got {response.json()}"
+
+
+def test_get_nearby_places():
+    """
+    Test to retrieve the places around a point
+    Creates two places close to a random point, then sends a GET request to
+    /places/nearby and checks that both are returned nearest first, and that
+    a radius that is not a finite number is rejected.
+    """
+    city_id = create_city()
+    user_id = create_unique_user()
+    lat, lon = random.uniform(-60, 60), random.uniform(-170, 170)
+    place_ids = []
+    for offset in (0.01, 0.001):
+        new_place = {
+            "name": "Nearby Place",
+            "host_id": user_id,
+            "city_id": city_id,
+            "latitude": lat + offset,
+            "longitude": lon,
+        }
+        response = requests.post(f"{API_URL}/places", json=new_place)
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+        place_ids.append(response.json()["id"])
+
+    response = requests.get(
+        f"{API_URL}/places/nearby",
+        params={"lat": lat, "lon": lon, "radius_km": 5},
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    places = response.json()
+    assert [p["id"] for p in places] == place_ids[::-1], (
+        f"Expected the places {place_ids[::-1]} nearest first but got "
+        f"{[p['id'] for p in places]}"
+    )
+    assert (
+        places[0]["distance_km"] < places[1]["distance_km"]
+    ), "Expected the distances in increasing order"
+
+    response = requests.get(
+        f"{API_URL}/places/nearby", params={"lat": lat, "lon": lon, "limit": 1}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert [p["id"] for p in response.json()] == [
+        place_ids[1]
+    ], f"Expected the nearest place but got {response.json()}"
+
+    for radius_km in ("inf", "nan"):
+        response = requests.get(
+            f"{API_URL}/places/nearby",
+            params={"lat": lat, "lon": lon, "radius_km": radius_km},
+        )
+        assert (
+            response.status_code == 400
+        ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+
+def test_place_amenities():
+    """
+    Test to add, list and remove the amenities of a place
+    Links two amenities to a new place, filters the places by amenities with
+    GET /places?amenities=... and removes one of the amenities.
+    """
+    place_id = test_post_place()
+    amenity_ids = []
+    for name in ("Wifi", "Pool"):
+        response = requests.post(
+            f"{API_URL}/amenities", json={"name": f"{name} {uuid.uuid4()}"}
+        )
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+        amenity_ids.append(response.json()["id"])
+
+    for amenity_id in amenity_ids:
+        response = requests.post(
+            f"{API_URL}/places/{place_id}/amenities/{amenity_id}"
+        )
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/places/{place_id}/amenities")
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert [a["id"] for a in response.json()] == amenity_ids, (
+        f"Expected the amenities {amenity_ids} but got {response.json()}"
+    )
+
+    response = requests.get(
+        f"{API_URL}/places", params={"amenities": ",".join(amenity_ids)}
+    )
+    assert [p["id"] for p in response.json()] == [
+        place_id
+    ], f"Expected only the place {place_id} but got {response.json()}"
+
+    response = requests.delete(
+        f"{API_URL}/places/{place_id}/amenities/{amenity_ids[0]}"
+    )
+    assert (
+        response.status_code == 204
+    ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(
+        f"{API_URL}/places", params={"amenities": ",".join(amenity_ids)}
+    )
+    assert (
+        response.json() == []
+    ), f"Expected no places but got {response.json()}"
+
+    response = requests.delete(
+        f"{API_URL}/places/{place_id}/amenities/{amenity_ids[0]}"
+    )
+    assert (
+        response.status_code == 404
+    ), f"Expected status code 404 but got {response.status_code}. Response: {response.text}"
+
+
+def test_get_top_places():
+    """
+    Test to retrieve the best rated and the cheapest places of a city
+    Creates two places in a new city and reviews them, then sends GET requests
+    to /places/top and checks the order of the places.
+    """
+    city_id = create_city()
+    user_id = create_unique_user()
+    place_ids = []
+    for price, rating in ((120, 3.0), (60, 5.0)):
+        new_place = {
+            "name": "Top Place",
+            "host_id": user_id,
+            "city_id": city_id,
+            "price_per_night": price,
+        }
+        response = requests.post(f"{API_URL}/places", json=new_place)
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+        place_ids.append(response.json()["id"])
+        response = requests.post(
+            f"{API_URL}/places/{place_ids[-1]}/reviews",
+            json={"user_id": user_id, "comment": "Ok", "rating": rating},
+        )
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(
+        f"{API_URL}/places/top", params={"by": "rating", "city_id": city_id}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    places = response.json()
+    assert [p["id"] for p in places] == place_ids[::-1], (
+        f"Expected the places {place_ids[::-1]} best rated first but got "
+        f"{[p['id'] for p in places]}"
+    )
+    assert (
+        places[0]["rating"]["mean"] == 5.0
+    ), f"Expected a mean rating of 5 but got {places[0]['rating']}"
+
+    response = requests.get(
+        f"{API_URL}/places/top",
+        params={"by": "price", "city_id": city_id, "k": 1},
+    )
+    assert [p["id"] for p in response.json()] == [
+        place_ids[1]
+    ], f"Expected the cheapest place but got {response.json()}"
+
+    response = requests.get(f"{API_URL}/places/top", params={"by": "name"})
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+
+def test_full_text_search():
+    """
+    Test to search the places and the reviews by their text
+    Creates a place and a review with a unique word, then sends GET requests
+    to /search and checks that they are found with the word in another form.
+    """
+    word = f"word{uuid.uuid4().hex}"
+    city_id = create_city()
+    user_id = create_unique_user()
+    new_place = {
+        "name": "Quiet cottage",
+        "description": f"Cozy houses near the {word} lake",
+        "host_id": user_id,
+        "city_id": city_id,
+    }
+    response = requests.post(f"{API_URL}/places", json=new_place)
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    place_id = response.json()["id"]
+
+    response = requests.post(
+        f"{API_URL}/places/{place_id}/reviews",
+        json={"user_id": user_id, "comment": f"Loved {word}", "rating": 5},
+    )
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    review_id = response.json()["id"]
+
+    response = requests.get(
+        f"{API_URL}/search", params={"q": f"{word.upper()} house"}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    places = response.json()
+    assert (
+        places and places[0]["id"] == place_id
+    ), f"Expected the place {place_id} first but got {places}"
+    assert places[0]["score"] > 0, f"Expected a positive score but got {places[0]}"
+
+    response = requests.get(
+        f"{API_URL}/search", params={"q": word, "type": "review"}
+    )
+    assert [r["id"] for r in response.json()] == [
+        review_id
+    ], f"Expected the review {review_id} but got {response.json()}"
+
+    requests.put(f"{API_URL}/places/{place_id}", json={"description": "Gone"})
+    response = requests.get(f"{API_URL}/search", params={"q": word})
+    assert (
+        response.json() == []
+    ), f"Expected no places after the update but got {response.json()}"
+
+    response = requests.get(f"{API_URL}/search", params={"type": "user"})
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+
+def test_delete_place_cascades():
+    """
+    Test to delete a place with its reviews and amenities
+    Creates a place in a new city with a review and an amenity, checks that the
+    city can't be deleted while the place exists, then deletes the place and
+    checks that the review and the amenity link were deleted with it.
+    """
+    city_id = create_city()
+    user_id = create_unique_user()
+    new_place = {"name": "Cascade Place", "host_id": user_id, "city_id": city_id}
+    response = requests.post(f"{API_URL}/places", json=new_place)
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    place_id = response.json()["id"]
+
+    response = requests.post(
+        f"{API_URL}/places/{place_id}/reviews",
+        json={"user_id": user_id, "comment": "Fine", "rating": 4},
+    )
+    review_id = response.json()["id"]
+    response = requests.post(
+        f"{API_URL}/amenities", json={"name": f"Sauna {uuid.uuid4()}"}
+    )
+    amenity_id = response.json()["id"]
+    requests.post(f"{API_URL}/places/{place_id}/amenities/{amenity_id}")
+
+    response = requests.delete(f"{API_URL}/cities/{city_id}")
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.delete(f"{API_URL}/places/{place_id}")
+    assert (
+        response.status_code == 204
+    ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/reviews/{review_id}")
+    assert (
+        response.status_code == 404
+    ), f"Expected the review to be deleted but got {response.status_code}"
+
+    response = requests.get(
+        f"{API_URL}/places", params={"amenities": amenity_id}
+    )
+    assert (
+        response.json() == []
+    ), f"Expected no places with the amenity but got {response.json()}"
+
+    response = requests.delete(f"{API_URL}/cities/{city_id}")
+    assert (
+        response.status_code == 204
+    ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
+
+
+def test_stream_places():
+    """
+    Test to stream all places
+    Creates a place, then streams /places as NDJSON and with ?stream=1 and
+    checks that both hold every place of the plain list.
+    """
+    new_place = {
+        "name": "Streamed Place",
+        "host_id": create_unique_user(),
+        "city_id": create_city(),
+    }
+    response = requests.post(f"{API_URL}/places", json=new_place)
+    place_id = response.json()["id"]
+
+    expected = {place["id"] for place in requests.get(f"{API_URL}/places").json()}
+    assert place_id in expected, f"Expected the place {place_id} to be listed"
+
+    response = requests.get(
+        f"{API_URL}/places",
+        headers={"Accept": "application/x-ndjson"},
+        stream=True,
+    )
+    assert response.headers["Content-Type"].startswith(
+        "application/x-ndjson"
+    ), f"Expected NDJSON but got {response.headers['Content-Type']}"
+    streamed = [json.loads(line) for line in response.iter_lines() if line]
+    assert expected == {
+        place["id"] for place in streamed
+    }, "Expected the NDJSON stream to hold every place"
+    assert len(streamed) == len(expected), "Expected every place once"
+
+    response = requests.get(f"{API_URL}/places", params={"stream": 1})
+    assert response.headers["Content-Type"].startswith(
+        "application/json"
+    ), f"Expected JSON but got {response.headers['Content-Type']}"
+    assert expected == {
+        place["id"] for place in response.json()
+    }, "Expected the streamed array to hold every place"
+
+
+def test_get_places_fields():
+    """
+    Test to retrieve only some fields of the places
+    Creates a place, then gets /places and /places/<id> with ?fields= and
+    checks that only these fields are returned, and that an unknown field
+    is rejected with 400, even when the list is empty.
+    """
+    new_place = {
+        "name": "Projected Place",
+        "host_id": create_unique_user(),
+        "city_id": create_city(),
+        "price_per_night": 120,
+    }
+    response = requests.post(f"{API_URL}/places", json=new_place)
+    place_id = response.json()["id"]
+
+    fields = "id,name,price_per_night"
+    response = requests.get(f"{API_URL}/places", params={"fields": fields})
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    places = {place["id"]: place for place in response.json()}
+    assert places[place_id] == {
+        "id": place_id,
+        "name": "Projected Place",
+        "price_per_night": 120,
+    }, f"Expected only the requested fields but got {places[place_id]}"
+
+    response = requests.get(
+        f"{API_URL}/places/{place_id}", params={"fields": "name"}
+    )
+    assert response.json() == {
+        "name": "Projected Place"
+    }, f"Expected only the name but got {response.json()}"
+
+    response = requests.get(
+        f"{API_URL}/places/{place_id}", params={"fields": "name,password"}
+    )
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(
+        f"{API_URL}/places/{place_id}/reviews", params={"fields": "bogus"}
+    )
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 for an empty list but got {response.status_code}. Response: {response.text}"
+
+
 if __name__ == "__main__":
     # Run the tests
     test_functions(
@@ -230,5 +720,13 @@ if __name__ == "__main__":
             test_get_place,
             test_put_place,
             test_delete_place,
+            test_search_places,
+            test_get_nearby_places,
+            test_place_amenities,
+            test_get_top_places,
+            test_full_text_search,
+            test_delete_place_cascades,
+            test_stream_places,
+            test_get_places_fields,
         ]
     )
@@ -201,7 +201,8 @@ def test_put_review():
     """
     Test to update an existing review
     Creates a new review, then sends a PUT request to /reviews/{id} with updated review data
-    and checks that the response status is 200 and the returned data matches the updated data.
+    and checks that the response status is 200 and the returned data matches the updated data,
+    then checks that the place and the user can't be updated to ones that don't exist.
     """
     place_id = create_place()
     user_id = create_user()
@@ -236,6 +237,20 @@ def test_put_review():
     assert "created_at" in review_data, "Created_at not in response"
     assert "updated_at" in review_data, "Updated_at not in response"
 
+    for reference in ({"place_id": "nope"}, {"user_id": "nope"}):
+        response = requests.put(
+            f"{API_URL}/reviews/{review_id}", json=reference
+        )
+        assert (
+            response.status_code == 400
+        ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(f"{API_URL}/reviews/{review_id}")
+    assert (
+        response.json()["place_id"] == place_id
+        and response.json()["user_id"] == user_id
+    ), f"Expected the place and the user to be unchanged. Response: {response.text}"
+
 
 def test_delete_review():
     """
@@ -263,6 +278,122 @@ def test_delete_review():
     ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
 
 
+def test_post_reviews_batch():
+    """
+    Test to create several reviews for a place at once
+    Sends a POST request to /places/{place_id}/reviews/batch and checks that
+    the response status is 201 and the reviews are listed for the place.
+    """
+    place_id = create_place()
+    user_id = create_user()
+    new_reviews = [
+        {"user_id": user_id, "comment": f"Review {i}", "rating": 4.0}
+        for i in range(3)
+    ]
+    response = requests.post(
+        f"{API_URL}/places/{place_id}/reviews/batch", json=new_reviews
+    )
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    review_ids = {r["data"]["id"] for r in response.json()}
+
+    response = requests.get(f"{API_URL}/places/{place_id}/reviews")
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert review_ids == {
+        review["id"] for review in response.json()
+    }, f"Expected reviews {review_ids} to be in response but got {response.text}"
+
+
+def test_get_place_rating():
+    """
+    Test to retrieve the rating aggregates of a place
+    Creates three reviews for a new place, updates and deletes one of them, and
+    checks the aggregates returned by /places/{place_id}/rating after each step.
+    """
+    place_id = create_place()
+    user_id = create_user()
+    review_ids = []
+    for rating in (5.0, 4.5, 2.0):
+        response = requests.post(
+            f"{API_URL}/places/{place_id}/reviews",
+            json={"user_id": user_id, "comment": "Nice", "rating": rating},
+        )
+        assert (
+            response.status_code == 201
+        ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+        review_ids.append(response.json()["id"])
+
+    response = requests.get(f"{API_URL}/places/{place_id}/rating")
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    rating = response.json()
+    assert rating["count"] == 3, f"Expected 3 ratings but got {rating}"
+    assert rating["mean"] == 11.5 / 3, f"Expected a mean of 11.5/3 but got {rating}"
+    assert (rating["min"], rating["max"]) == (2.0, 5.0), f"Unexpected {rating}"
+    assert rating["histogram"] == {
+        "1": 0, "2": 1, "3": 0, "4": 1, "5": 1
+    }, f"Unexpected histogram {rating['histogram']}"
+
+    requests.put(f"{API_URL}/reviews/{review_ids[0]}", json={"rating": 1.0})
+    requests.delete(f"{API_URL}/reviews/{review_ids[1]}")
+
+    rating = requests.get(f"{API_URL}/places/{place_id}/rating").json()
+    assert (rating["count"], rating["sum"], rating["max"]) == (
+        2, 3.0, 2.0
+    ), f"Expected 2 ratings adding up to 3 but got {rating}"
+
+
+def test_get_reviews_pages():
+    """
+    Test to retrieve the reviews of a place page by page
+    Creates five reviews for a new place and follows the X-Next-Cursor of
+    /places/{place_id}/reviews?limit=2, expecting every review exactly once.
+    """
+    place_id = create_place()
+    user_id = create_user()
+    new_reviews = [
+        {"user_id": user_id, "comment": f"Review {i}", "rating": 3.0}
+        for i in range(5)
+    ]
+    response = requests.post(
+        f"{API_URL}/places/{place_id}/reviews/batch", json=new_reviews
+    )
+    review_ids = {r["data"]["id"] for r in response.json()}
+
+    url = f"{API_URL}/places/{place_id}/reviews"
+    params = {"limit": 2}
+    pages = []
+    while True:
+        response = requests.get(url, params=params)
+        assert (
+            response.status_code == 200
+        ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+        assert (
+            response.headers.get("X-Total-Count") == "5"
+        ), f"Expected an X-Total-Count of 5 but got {response.headers}"
+        pages.append([review["id"] for review in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    assert [len(ids) for ids in pages] == [
+        2, 2, 1
+    ], f"Expected pages of 2, 2 and 1 reviews but got {pages}"
+    assert review_ids == {
+        review_id for ids in pages for review_id in ids
+    }, f"Expected reviews {review_ids} in the pages but got {pages}"
+
+    response = requests.get(url, params={"cursor": "not a cursor"})
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+
 if __name__ == "__main__":
     # Run the tests
     test_functions(
@@ -273,5 +404,8 @@ if __name__ == "__main__":
             test_get_review,
             test_put_review,
             test_delete_review,
+            test_post_reviews_batch,
+            test_get_place_rating,
+            test_get_reviews_pages,
         ]
     )
@@ -45,7 +45,8 @@ def test_post_user():
     """
     Test to create a new user
     Sends a POST request to /users with new user data and checks that the
-    response status is 201 and the returned data matches the sent data.
+    response status is 201 and the returned data matches the sent data,
+    then that another user with the same ID is refused with 409.
     """
     unique_email = f"test.user.{uuid.uuid4()}@example.com"
     new_user = {
@@ -70,6 +71,19 @@ def test_post_user():
     assert "id" in user_data, "User ID not in response"
     assert "created_at" in user_data, "Created_at not in response"
     assert "updated_at" in user_data, "Updated_at not in response"
+
+    response = requests.post(
+        f"{API_URL}/users",
+        json=new_user
+        | {"id": user_data["id"], "email": f"{uuid.uuid4()}@example.com"},
+    )
+    assert (
+        response.status_code == 409
+    ), f"Expected status code 409 but got {response.status_code}. Response: {response.text}"
+    response = requests.get(f"{API_URL}/users/{user_data['id']}")
+    assert (
+        response.json()["email"] == unique_email
+    ), f"Expected the first user to be kept but got {response.json()}"
     return user_data["id"]  # Return the ID of the created user for further tests
 
 
@@ -145,6 +159,114 @@ def test_delete_user():
     ), f"Expected status code 204 but got {response.status_code}. Response: {response.text}"
 
 
+def test_post_users_batch():
+    """
+    Test to create several users at once
+    Sends a POST request to /users/batch with a valid user and a user
+    without email and checks that the response status is 207 and that
+    every item has its own result.
+    """
+    unique_email = f"test.user.{uuid.uuid4()}@example.com"
+    new_users = [
+        {"email": unique_email, "first_name": "John", "last_name": "Doe"},
+        {"first_name": "Jane", "last_name": "Doe"},
+    ]
+    response = requests.post(f"{API_URL}/users/batch", json=new_users)
+    assert (
+        response.status_code == 207
+    ), f"Expected status code 207 but got {response.status_code}. Response: {response.text}"
+    results = response.json()
+    assert [r["status"] for r in results] == [
+        201,
+        400,
+    ], f"Expected the items to have status 201 and 400 but got {results}"
+
+    user_id = results[0]["data"]["id"]
+    response = requests.get(f"{API_URL}/users/{user_id}")
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+
+
+def test_get_user_by_email():
+    """
+    Test to retrieve a user by email and to keep the emails unique
+    Creates a user with a mixed case email, looks it up with GET /users?email=
+    in lower case and checks that the same email in another case is refused.
+    """
+    unique_email = f"Test.User.{uuid.uuid4()}@Example.com"
+    new_user = {"email": unique_email, "first_name": "Ann", "last_name": "Lee"}
+    response = requests.post(f"{API_URL}/users", json=new_user)
+    assert (
+        response.status_code == 201
+    ), f"Expected status code 201 but got {response.status_code}. Response: {response.text}"
+    user_id = response.json()["id"]
+
+    response = requests.get(
+        f"{API_URL}/users", params={"email": unique_email.lower()}
+    )
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert [u["id"] for u in response.json()] == [
+        user_id
+    ], f"Expected the user {user_id} but got {response.json()}"
+
+    response = requests.post(
+        f"{API_URL}/users", json=new_user | {"email": unique_email.upper()}
+    )
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    other_id = create_unique_user()
+    response = requests.put(
+        f"{API_URL}/users/{other_id}", json={"email": unique_email.lower()}
+    )
+    assert (
+        response.status_code == 400
+    ), f"Expected status code 400 but got {response.status_code}. Response: {response.text}"
+
+    response = requests.get(
+        f"{API_URL}/users", params={"email": f"{uuid.uuid4()}@example.com"}
+    )
+    assert (
+        response.json() == []
+    ), f"Expected no users but got {response.json()}"
+
+
+def test_get_users_not_modified():
+    """
+    Test to poll the users with their ETag
+    Gets the users twice with If-None-Match, expects a 304 until a user is
+    created and then the new list with another ETag.
+    """
+    response = requests.get(f"{API_URL}/users")
+    etag = response.headers.get("ETag")
+    assert etag, f"Expected an ETag but got {response.headers}"
+
+    response = requests.get(f"{API_URL}/users", headers={"If-None-Match": etag})
+    assert (
+        response.status_code == 304
+    ), f"Expected status code 304 but got {response.status_code}. Response: {response.text}"
+    assert (
+        response.headers.get("ETag") == etag
+    ), f"Expected the ETag {etag} but got {response.headers.get('ETag')}"
+
+    user_id = create_unique_user()
+
+    response = requests.get(f"{API_URL}/users", headers={"If-None-Match": etag})
+    assert (
+        response.status_code == 200
+    ), f"Expected status code 200 but got {response.status_code}. Response: {response.text}"
+    assert (
+        response.headers.get("ETag") != etag
+    ), "Expected a new ETag after a user was created"
+    assert user_id in [
+        u["id"] for u in response.json()
+    ], f"Expected the user {user_id} in {response.json()}"
+
+
 if __name__ == "__main__":
     # Run the tests
     test_functions(
@@ -154,5 +276,8 @@ if __name__ == "__main__":
             test_get_user,
             test_put_user,
             test_delete_user,
+            test_post_users_batch,
+            test_get_user_by_email,
+            test_get_users_not_modified,
         ]
     )